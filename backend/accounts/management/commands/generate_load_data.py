@@ -0,0 +1,514 @@
+"""
+Django management command to generate a large synthetic dataset for benchmarking.
+Run with: python manage.py generate_load_data [--scale 0.01] [--batch-size 5000] [--copy]
+
+At --scale 1 it creates about 1k companies, 100k projects, 10M tasks,
+10M time entries, 6M pins and 10M notifications. Rows are written with
+bulk_create in batches; with --copy on PostgreSQL the largest tables are
+loaded with COPY instead.
+"""
+import io
+import math
+import random
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from accounts.models import User, Company, Contractor
+from departments.models import Department
+from documents.models import Document
+from notifications.models import Notification
+from projects.models import Project, Blueprint, Pin, PinCluster, ProjectProgress
+from projects.spatial import cell_for
+from search.models import SearchEntry
+from sync.models import Change
+from tasks.models import Task, TimeEntry
+from utils.cache_versions import invalidate_all_tenants
+
+# Volumes at --scale 1
+COMPANIES = 1000
+PROJECTS = 100_000
+
+# Per-company shape
+CONTRACTORS_PER_COMPANY = 3
+DEPARTMENTS = ['Civil', 'Electrical', 'Plumbing', 'HVAC']
+WORKERS_PER_DEPARTMENT = 6
+
+# Tasks per project follow a log-normal distribution: most projects are
+# small, a few are very large
+TASKS_PER_PROJECT = 100
+TASKS_PER_PROJECT_SIGMA = 1.0
+MAX_TASKS_PER_PROJECT = 5000
+
+# Share of projects with a blueprint, and of their tasks placed on it as a pin
+BLUEPRINT_RATIO = 0.8
+PIN_RATIO = 0.75
+PIN_CLUSTERS = (2, 8)
+
+DOCUMENTS_PER_PROJECT = (0, 10)
+NOTIFICATIONS_PER_USER = 125
+
+# Weighted choices as (values, weights)
+PROJECT_STATUSES = (['PLANNING', 'IN_PROGRESS', 'ON_HOLD', 'COMPLETED', 'CANCELLED'], [10, 45, 5, 35, 5])
+TASK_STATUSES = (['PENDING', 'IN_PROGRESS', 'COMPLETED', 'DELAYED'], [25, 20, 45, 10])
+TASK_PRIORITIES = (['LOW', 'MEDIUM', 'HIGH', 'URGENT'], [20, 50, 22, 8])
+DOCUMENT_STATUSES = (['PENDING', 'APPROVED', 'REJECTED', 'MODIFICATION_REQUESTED'], [30, 50, 10, 10])
+# Time entries per task that has been worked on
+TIME_ENTRY_COUNTS = ([1, 2, 3, 4], [75, 18, 5, 2])
+NOTIFICATION_TYPES = (
+    ['TASK_ASSIGNED', 'TASK_STATUS_CHANGED', 'COMMENT_ADDED', 'DEADLINE_APPROACHING',
+     'NEW_DOCUMENT', 'DOCUMENT_STATUS_CHANGED', 'NEW_TASK', 'NEW_PROJECT'],
+    [30, 25, 15, 10, 8, 6, 4, 2]
+)
+
+# Days of history the timestamps are spread over
+HISTORY_DAYS = 3 * 365
+
+
+def _copy_value(value):
+    """Format a value for COPY's text format."""
+    if value is None:
+        return '\\N'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+@contextmanager
+def explicit_timestamps(models):
+    """
+    Let bulk_create keep the created_at/updated_at values set on the rows
+    instead of overwriting them with the current time.
+    """
+    fields = [
+        field
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class RowWriter:
+    """
+    Insert rows (dicts of field attnames to values) in batches.
+    Tables written with copy=True use COPY when enabled, with primary keys
+    reserved from the table's sequence so children can reference them.
+    """
+
+    def __init__(self, batch_size, use_copy=False):
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.counts = Counter()
+
+    def write(self, model, rows, copy=False):
+        """Insert rows and return their primary keys, in order."""
+        if not rows:
+            return []
+        self.counts[model._meta.verbose_name_plural] += len(rows)
+        if copy and self.use_copy:
+            return self._copy(model, rows)
+        objs = [model(**row) for row in rows]
+        model.objects.bulk_create(objs, batch_size=self.batch_size)
+        return [obj.pk for obj in objs]
+
+    def _reserve_ids(self, model, count):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+                [model._meta.db_table, model._meta.pk.column, count]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def _copy(self, model, rows):
+        ids = self._reserve_ids(model, len(rows))
+        fields = model._meta.concrete_fields
+        quote = connection.ops.quote_name
+        sql = 'COPY {} ({}) FROM STDIN'.format(
+            quote(model._meta.db_table),
+            ', '.join(quote(field.column) for field in fields)
+        )
+        pk_name = model._meta.pk.attname
+        # Columns left out of a row get the model default; COPY does not apply it
+        defaults = {field.attname: field.get_default() for field in fields}
+
+        for start in range(0, len(rows), self.batch_size):
+            buffer = io.StringIO()
+            for pk, row in zip(ids[start:start + self.batch_size], rows[start:start + self.batch_size]):
+                row = {**defaults, **row, pk_name: pk}
+                buffer.write('\t'.join(_copy_value(row[field.attname]) for field in fields))
+                buffer.write('\n')
+            buffer.seek(0)
+            with connection.cursor() as cursor:
+                cursor.copy_expert(sql, buffer)
+        return ids
+
+
+class Command(BaseCommand):
+    help = 'Generate a large synthetic dataset for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=0.001,
+            help='Dataset size; 1 is ~1k companies, 100k projects and 10M tasks (default: 0.001)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows inserted per query (default: 5000)'
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Load pins, tasks, time entries and notifications with COPY (PostgreSQL only)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed, so the same dataset can be generated again (default: 42)'
+        )
+        parser.add_argument(
+            '--prefix',
+            default='load',
+            help='Prefix of generated usernames and emails (default: load)'
+        )
+        parser.add_argument(
+            '--password',
+            help='Password of every generated user (default: unusable password)'
+        )
+
+    def handle(self, *args, **options):
+        scale = options['scale']
+        if scale <= 0:
+            raise CommandError('--scale must be positive.')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy requires PostgreSQL.')
+
+        self.prefix = options['prefix']
+        if Company.objects.filter(email__startswith=f'{self.prefix}-').exists():
+            raise CommandError(
+                f"Data with prefix '{self.prefix}' already exists; use a different --prefix."
+            )
+
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.password = make_password(options['password'])
+        self.writer = RowWriter(max(1, options['batch_size']), use_copy=options['copy'])
+
+        companies = max(1, round(COMPANIES * scale))
+        projects = max(1, round(PROJECTS * scale))
+        self.stdout.write(f'Generating {companies} companies with {projects} projects...')
+
+        models = [Company, Contractor, Department, User, Project, Blueprint, Pin,
+                  Task, TimeEntry, Document, Notification, SearchEntry, Change]
+        with explicit_timestamps(models):
+            for index in range(companies):
+                # Spread the projects evenly over the companies
+                company_projects = projects // companies + (index < projects % companies)
+                with transaction.atomic():
+                    self.generate_company(index, company_projects)
+                self.stdout.write(f'  company {index + 1}/{companies}')
+
+        # Rows were inserted in bulk, without model signals
+        invalidate_all_tenants(['projects', 'tasks', 'documents', 'reports'])
+
+        for name, count in sorted(self.writer.counts.items()):
+            self.stdout.write(f'  {name}: {count}')
+        self.stdout.write(self.style.SUCCESS('Load data generated.'))
+
+    # Helpers
+
+    def choice(self, weighted):
+        values, weights = weighted
+        return self.rng.choices(values, weights)[0]
+
+    def moment(self, after=None):
+        """A random time between `after` (default: the start of history) and now."""
+        start = after or self.now - timedelta(days=HISTORY_DAYS)
+        return start + (self.now - start) * self.rng.random()
+
+    def task_count(self):
+        # Mean of the log-normal distribution is TASKS_PER_PROJECT
+        mu = math.log(TASKS_PER_PROJECT) - TASKS_PER_PROJECT_SIGMA ** 2 / 2
+        count = round(self.rng.lognormvariate(mu, TASKS_PER_PROJECT_SIGMA))
+        return min(MAX_TASKS_PER_PROJECT, max(1, count))
+
+    def index(self, model, rows):
+        """Search entries of new objects, as the search signals would add them: rows of (id, title, body)."""
+        self.writer.write(SearchEntry, [
+            {'model': model, 'object_id': object_id, 'title': title, 'body': body, 'updated_at': self.now}
+            for object_id, title, body in rows
+        ], copy=True)
+
+    def log_changes(self, model, rows):
+        """Sync change log of new objects, as the sync signals would write it: rows of (id, tenants)."""
+        self.writer.write(Change, [
+            {'tenant': tenant, 'model': model, 'object_id': object_id, 'deleted': False, 'created_at': self.now}
+            for object_id, tenants in rows for tenant in tenants if tenant
+        ], copy=True)
+
+    def user_row(self, username, role, created_at, **fields):
+        return {
+            'username': username,
+            'email': f'{username}@example.com',
+            'password': self.password,
+            'role': role,
+            'date_joined': created_at,
+            'created_at': created_at,
+            'updated_at': created_at,
+            **fields,
+        }
+
+    # Generators
+
+    def generate_company(self, index, project_count):
+        name = f'{self.prefix}-{index}'
+        created_at = self.moment()
+        write = self.writer.write
+
+        company_id, = write(Company, [{
+            'name': f'Company {name}', 'email': f'{name}@company.example.com',
+            'created_at': created_at, 'updated_at': created_at,
+        }])
+
+        contractor_ids = write(Contractor, [{
+            'company_id': company_id, 'name': f'Contractor {name}-{number}',
+            'email': f'{name}-{number}@contractor.example.com',
+            'created_at': created_at, 'updated_at': created_at,
+        } for number in range(CONTRACTORS_PER_COMPANY)])
+
+        department_rows = [
+            {'contractor_id': contractor_id, 'name': department,
+             'created_at': created_at, 'updated_at': created_at}
+            for contractor_id in contractor_ids for department in DEPARTMENTS
+        ]
+        department_ids = write(Department, department_rows)
+
+        staff = [
+            self.user_row(f'{name}-admin', 'COMPANY_ADMIN', created_at, company_id=company_id),
+            self.user_row(f'{name}-pm-0', 'PROJECT_MANAGER', created_at, company_id=company_id),
+            self.user_row(f'{name}-pm-1', 'PROJECT_MANAGER', created_at, company_id=company_id),
+            self.user_row(f'{name}-docs', 'DOCUMENT_CONTROLLER', created_at, company_id=company_id),
+            self.user_row(f'{name}-consultant', 'CONSULTANT', created_at, company_id=company_id),
+        ]
+        staff += [
+            self.user_row(f'{name}-contractor-{number}', 'CONTRACTOR', created_at,
+                          company_id=company_id, contractor_id=contractor_id)
+            for number, contractor_id in enumerate(contractor_ids)
+        ]
+        admin_id, pm_id, _, docs_id, consultant_id, *_ = staff_ids = write(User, staff)
+
+        worker_rows = [
+            self.user_row(f'{name}-worker-{department_id}-{number}', 'WORKER', created_at,
+                          company_id=company_id, contractor_id=row['contractor_id'],
+                          department_id=department_id)
+            for department_id, row in zip(department_ids, department_rows)
+            for number in range(WORKERS_PER_DEPARTMENT)
+        ]
+        worker_ids = write(User, worker_rows)
+
+        # Departments and workers of each contractor
+        crews = {contractor_id: [] for contractor_id in contractor_ids}
+        for worker_id, row in zip(worker_ids, worker_rows):
+            crews[row['contractor_id']].append((row['department_id'], worker_id))
+
+        project_ids = []
+        for number in range(project_count):
+            contractor_id = self.rng.choice(contractor_ids)
+            project_ids.append(self.generate_project(
+                f'{name}-{number}', company_id, contractor_id, crews[contractor_id],
+                creator_id=self.rng.choice([admin_id, pm_id]),
+                consultant_id=consultant_id if self.rng.random() < 0.5 else None,
+                reviewer_id=docs_id,
+            ))
+
+        # bulk_create skips the Project post_save that creates the rollup
+        for start in range(0, len(project_ids), 500):
+            ProjectProgress.rebuild(project_ids[start:start + 500])
+
+        self.generate_notifications(staff_ids + worker_ids, created_at)
+
+    def generate_project(self, name, company_id, contractor_id, crew, creator_id,
+                         consultant_id, reviewer_id):
+        write = self.writer.write
+        rng = self.rng
+        created_at = self.moment()
+        status = self.choice(PROJECT_STATUSES)
+        budget = Decimal(rng.randrange(50_000, 50_000_000, 1000))
+
+        project_id, = write(Project, [{
+            'company_id': company_id, 'contractor_id': contractor_id,
+            'consultant_id': consultant_id, 'created_by_id': creator_id,
+            'name': f'Project {name}', 'address': f'Site {name}', 'status': status,
+            'start_date': created_at.date(),
+            'end_date': (created_at + timedelta(days=rng.randint(90, 900))).date(),
+            'estimated_budget': budget,
+            'actual_budget': (budget * Decimal(rng.uniform(0.2, 1.3))).quantize(Decimal('0.01')),
+            'created_at': created_at, 'updated_at': self.moment(created_at),
+        }])
+
+        task_count = self.task_count()
+
+        # Pins gather around a few areas of the plan (rooms, floors)
+        pin_ids = []
+        if rng.random() < BLUEPRINT_RATIO:
+            blueprint_id, = write(Blueprint, [{
+                'project_id': project_id, 'file': f'blueprints/{self.prefix}/plan.png',
+                'file_type': 'png', 'width': 7000, 'height': 5000,
+                'review_status': 'APPROVED' if status != 'PLANNING' else 'PENDING',
+                'uploaded_by_id': creator_id, 'uploaded_at': created_at,
+            }])
+            centers = [(rng.random(), rng.random()) for _ in range(rng.randint(*PIN_CLUSTERS))]
+            pin_rows = []
+            for number in range(round(task_count * PIN_RATIO)):
+                cx, cy = rng.choice(centers)
+                x = min(1.0, max(0.0, rng.gauss(cx, 0.05)))
+                y = min(1.0, max(0.0, rng.gauss(cy, 0.05)))
+                pin_rows.append({
+                    'blueprint_id': blueprint_id,
+                    'x': x,
+                    'y': y,
+                    # Pin.save() is bypassed, so the quadtree cell is set here
+                    'cell': cell_for(x, y),
+                    'label': f'P{number + 1}',
+                    'created_at': self.moment(created_at),
+                })
+            pin_ids = write(Pin, pin_rows, copy=True)
+
+        tenants = [f'company:{company_id}', f'contractor:{contractor_id}']
+        self.generate_tasks(project_id, tenants, status, created_at, task_count, pin_ids, crew, creator_id)
+        if pin_ids:
+            # Likewise the Pin and Task signals maintaining the clusters
+            PinCluster.rebuild(blueprint_id)
+
+        document_rows = []
+        for number in range(rng.randint(*DOCUMENTS_PER_PROJECT)):
+            uploaded_at = self.moment(created_at)
+            document_status = self.choice(DOCUMENT_STATUSES)
+            reviewed = document_status != 'PENDING'
+            document_rows.append({
+                'project_id': project_id, 'contractor_id': contractor_id,
+                'company_id': company_id, 'side': rng.choice(['CONTRACTOR', 'COMPANY']),
+                'title': f'Document {number + 1}', 'file': f'documents/{self.prefix}/spec.pdf',
+                'file_name': 'spec.pdf', 'file_type': 'pdf', 'status': document_status,
+                'uploaded_by_id': creator_id, 'uploaded_at': uploaded_at,
+                'review_deadline': uploaded_at + timedelta(days=14),
+                'reviewed_by_id': reviewer_id if reviewed else None,
+                'reviewed_at': self.moment(uploaded_at) if reviewed else None,
+            })
+        document_ids = write(Document, document_rows)
+        self.index('document', [(document_id, row['title'], '') for document_id, row in zip(document_ids, document_rows)])
+
+        return project_id
+
+    def generate_tasks(self, project_id, tenants, project_status, project_created_at, count,
+                       pin_ids, crew, creator_id):
+        rng = self.rng
+        task_rows = []
+        entries = []
+        for number in range(count):
+            if project_status == 'COMPLETED':
+                status = 'COMPLETED'
+            elif project_status == 'PLANNING':
+                status = 'PENDING'
+            else:
+                status = self.choice(TASK_STATUSES)
+
+            created_at = self.moment(project_created_at)
+            department_id, worker_id = rng.choice(crew)
+            if rng.random() < 0.1:
+                worker_id = None
+            estimated = Decimal(rng.randint(1, 80)) if rng.random() < 0.8 else None
+
+            started_at = completed_at = None
+            task_entries = []
+            if status != 'PENDING':
+                started_at = self.moment(created_at)
+                if status == 'COMPLETED':
+                    completed_at = self.moment(started_at)
+                if worker_id:
+                    # One entry per day, as TimeEntry is unique per task, user and date
+                    start = started_at.date()
+                    for day in range(self.choice(TIME_ENTRY_COUNTS)):
+                        hours = Decimal(rng.randint(1, 16)) / 2
+                        task_entries.append((worker_id, start + timedelta(days=day), hours, started_at))
+
+            task_rows.append({
+                'project_id': project_id,
+                'pin_id': pin_ids[number] if number < len(pin_ids) else None,
+                'department_id': department_id, 'assigned_to_id': worker_id,
+                'created_by_id': creator_id,
+                'title': f'Task {number + 1}', 'status': status,
+                'priority': self.choice(TASK_PRIORITIES),
+                'estimated_hours': estimated,
+                'actual_hours': sum(entry[2] for entry in task_entries) if task_entries else None,
+                'due_date': created_at + timedelta(days=rng.randint(3, 120)),
+                'started_at': started_at, 'completed_at': completed_at,
+                'created_at': created_at, 'updated_at': completed_at or started_at or created_at,
+            })
+            entries.append(task_entries)
+
+        task_ids = self.writer.write(Task, task_rows, copy=True)
+        self.index('task', [(task_id, row['title'], '') for task_id, row in zip(task_ids, task_rows)])
+        entry_ids = self.writer.write(TimeEntry, [
+            {'task_id': task_id, 'user_id': user_id, 'date': date, 'hours': hours,
+             'created_at': created_at}
+            for task_id, task_entries in zip(task_ids, entries)
+            for user_id, date, hours, created_at in task_entries
+        ], copy=True)
+
+        # Tasks, their pins and time entries are synced to the project's
+        # tenants, and to the assignee or author
+        assignee_tenants = [row['assigned_to_id'] and f"user:{row['assigned_to_id']}" for row in task_rows]
+        self.log_changes('task', [
+            (task_id, [*tenants, user_tenant]) for task_id, user_tenant in zip(task_ids, assignee_tenants)
+        ])
+        self.log_changes('pin', [
+            (row['pin_id'], [*tenants, user_tenant])
+            for row, user_tenant in zip(task_rows, assignee_tenants) if row['pin_id']
+        ])
+        entry_users = [user_id for task_entries in entries for user_id, *_ in task_entries]
+        self.log_changes('time_entry', [
+            (entry_id, [*tenants, f'user:{user_id}']) for entry_id, user_id in zip(entry_ids, entry_users)
+        ])
+
+    def generate_notifications(self, user_ids, since):
+        rng = self.rng
+        mu = math.log(NOTIFICATIONS_PER_USER) - 0.5
+        recent = self.now - timedelta(days=7)
+        rows = []
+        for user_id in user_ids:
+            for _ in range(round(rng.lognormvariate(mu, 1.0))):
+                created_at = self.moment(since)
+                notification_type = self.choice(NOTIFICATION_TYPES)
+                rows.append({
+                    'user_id': user_id, 'notification_type': notification_type,
+                    'title': notification_type.replace('_', ' ').title(),
+                    'message': 'Generated notification',
+                    # Older notifications have mostly been read
+                    'is_read': rng.random() < (0.3 if created_at > recent else 0.9),
+                    'created_at': created_at,
+                })
+        notification_ids = self.writer.write(Notification, rows, copy=True)
+        self.log_changes('notification', [
+            (notification_id, [f"user:{row['user_id']}"]) for notification_id, row in zip(notification_ids, rows)
+        ])
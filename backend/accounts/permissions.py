@@ -149,4 +149,40 @@ class IsOwnerOrAdminOrSuperAdmin(permissions.BasePermission):
         elif obj == request.user:
             return True
         
-        return False
\ No newline at end of file
+        return False
+
+
+class HasRolePermission(permissions.BasePermission):
+    """
+    Permission check against the RolePermission table (category/action).
+    Falls back to `default_roles` when no permissions are stored for the role.
+    """
+    category = None
+    action = None
+    default_roles = []
+    
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        if user.is_superuser:
+            return True
+        
+        from .models import RolePermission
+        stored = RolePermission.objects.filter(role=user.role)
+        if not stored.exists():
+            return user.role in self.default_roles
+        return stored.filter(
+            category=self.category,
+            action=self.action,
+            is_allowed=True
+        ).exists()
+
+
+class CanExportReports(HasRolePermission):
+    """
+    Permission check for the reports/export role permission.
+    """
+    category = 'reports'
+    action = 'export'
+    default_roles = ['COMPANY_ADMIN']
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from utils.cache_versions import invalidate_all_tenants
+from .models import User, Company, Contractor
+
+# Names of users, companies and contractors appear in these cached responses
+NAME_DEPENDENT_NAMESPACES = ['projects', 'tasks', 'documents']
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_responses(sender, instance, created, **kwargs):
+    # New users are not referenced yet; logins only touch last_login
+    update_fields = kwargs.get('update_fields')
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    invalidate_all_tenants(NAME_DEPENDENT_NAMESPACES)
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_save, sender=Contractor)
+def invalidate_account_responses(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_all_tenants(NAME_DEPENDENT_NAMESPACES)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Company)
+@receiver(post_delete, sender=Contractor)
+def invalidate_deleted_account_responses(sender, instance, **kwargs):
+    invalidate_all_tenants(NAME_DEPENDENT_NAMESPACES)
@@ -168,3 +168,59 @@ class TestUserManagementAPI:
         })
         assert response.status_code == status.HTTP_201_CREATED
 
+
+
+@pytest.mark.django_db
+class TestGenerateLoadData:
+    """Test the generate_load_data management command."""
+    
+    def generate(self, **options):
+        from io import StringIO
+        from django.core.management import call_command
+        call_command('generate_load_data', scale=0.00003, stdout=StringIO(), **options)
+    
+    def test_generates_consistent_dataset(self):
+        """Rows reference each other, and the rollups, search index and change log match them."""
+        from documents.models import Document
+        from projects.models import Project, ProjectProgress
+        from notifications.models import Notification
+        from search.models import SearchEntry
+        from sync.models import Change
+        from tasks.models import Task, TimeEntry
+        
+        self.generate()
+        
+        assert Company.objects.filter(email__startswith='load-').count() == 1
+        projects = Project.objects.all()
+        assert projects.count() == 3
+        for project in projects:
+            progress = ProjectProgress.objects.get(project=project)
+            assert progress.total_tasks == project.tasks.count()
+        assert Task.objects.exclude(project__company=projects[0].company).count() == 0
+        assert TimeEntry.objects.exists()
+        # Timestamps are spread over the history rather than all set to now
+        assert Task.objects.values('created_at').distinct().count() > 1
+        assert SearchEntry.objects.filter(model='task').count() == Task.objects.count()
+        assert SearchEntry.objects.filter(model='document').count() == Document.objects.count()
+        # Every task is in the change log of its company
+        company_changes = Change.objects.filter(model='task', tenant=f'company:{projects[0].company_id}')
+        assert company_changes.count() == Task.objects.count()
+        assert Change.objects.filter(model='notification').count() == Notification.objects.count()
+    
+    def test_same_seed_generates_same_data(self):
+        """Datasets are reproducible from their seed."""
+        from tasks.models import Task
+        
+        self.generate(prefix='first')
+        first = list(Task.objects.order_by('id').values_list('title', 'status', 'priority'))
+        self.generate(prefix='second')
+        second = list(Task.objects.order_by('id').values_list('title', 'status', 'priority'))
+        assert second[len(first):] == first
+    
+    def test_existing_prefix_is_rejected(self):
+        """Generating twice with the same prefix fails instead of colliding."""
+        from django.core.management.base import CommandError
+        
+        self.generate()
+        with pytest.raises(CommandError):
+            self.generate()
@@ -103,18 +103,19 @@ class UserViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.is_superuser:
             # Super admin sees all users
-            return User.objects.all()
+            queryset = User.objects.all()
         elif user.is_company_admin:
             # Company admin sees all users in their company
-            return User.objects.filter(company=user.company)
+            queryset = User.objects.filter(company=user.company)
         elif user.is_contractor:
             # Contractor sees workers in their departments
-            return User.objects.filter(
+            queryset = User.objects.filter(
                 Q(contractor=user.contractor) | Q(id=user.id)
             )
         else:
             # Worker sees only themselves
-            return User.objects.filter(id=user.id)
+            queryset = User.objects.filter(id=user.id)
+        return queryset.select_related('company', 'contractor', 'department')
     
     def get_permissions(self):
         if self.action == 'create':
@@ -191,12 +192,14 @@ class ContractorViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.is_superuser:
             # Super admin sees all contractors
-            return Contractor.objects.all()
+            queryset = Contractor.objects.all()
         elif user.is_company_admin:
-            return Contractor.objects.filter(company=user.company)
+            queryset = Contractor.objects.filter(company=user.company)
         elif user.is_contractor:
-            return Contractor.objects.filter(id=user.contractor.id)
-        return Contractor.objects.none()
+            queryset = Contractor.objects.filter(id=user.contractor.id)
+        else:
+            return Contractor.objects.none()
+        return queryset.select_related('company')
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -400,8 +403,17 @@ class SuperAdminViewSet(viewsets.GenericViewSet):
             )
         
         # Assign workers to department
+        previous_department_ids = set(workers.values_list('department_id', flat=True))
         workers.update(department=department)
         
+        # Queryset updates skip signals, so invalidate the member counts here
+        from reports.cache import invalidate_reports
+        from utils.cache_versions import department_tenants
+        tenants = department_tenants(department.id)
+        for department_id in previous_department_ids - {department.id}:
+            tenants += department_tenants(department_id)
+        invalidate_reports(*tenants)
+        
         return Response({
             "message": f"Assigned {workers.count()} workers to department.",
             "assigned_count": workers.count()
@@ -0,0 +1,16 @@
+from django.contrib import admin
+from .models import Blob, UploadSession
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'size', 'ref_count', 'created_at', 'unreferenced_at']
+    search_fields = ['sha256']
+    readonly_fields = ['sha256', 'file', 'size', 'ref_count', 'created_at', 'unreferenced_at']
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['file_name', 'user', 'size', 'received', 'status', 'created_at', 'expires_at']
+    list_filter = ['status']
+    search_fields = ['file_name', 'sha256']
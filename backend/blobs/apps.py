@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class BlobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'blobs'
+    
+    def ready(self):
+        import blobs.signals  # noqa
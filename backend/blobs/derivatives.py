@@ -0,0 +1,111 @@
+"""
+Downscaled renditions (derivatives) of uploaded images.
+
+Each image gets a thumbnail for lists and a preview for detail screens,
+so phones do not download full-size photos to show them. Derivatives are
+named after their source file: blobs by their SHA-256, so every reference
+to the same photo shares them, and other files by a hash of their storage
+name. They are rendered in the background after upload, and on request
+when one is missing.
+"""
+import hashlib
+import io
+import logging
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.fields.files import FieldFile
+from PIL import Image, ImageOps, features
+from utils.file_responses import BLOB_NAME
+
+logger = logging.getLogger(__name__)
+
+# Longest side of each derivative in pixels
+DERIVATIVE_SIZES = {
+    'thumbnail': 256,
+    'preview': 1024,
+}
+DERIVATIVE_QUALITY = 80
+
+# file_type values of the images derivatives are made for
+IMAGE_FILE_TYPES = {'jpg', 'jpeg', 'png', 'gif', 'webp'}
+
+
+def derivative_format():
+    """WebP, or JPEG when Pillow was built without WebP support."""
+    return 'webp' if features.check('webp') else 'jpeg'
+
+
+def derivatives_prefix(source_name):
+    match = BLOB_NAME.match(source_name)
+    key = match.group('sha256') if match else hashlib.sha256(source_name.encode()).hexdigest()
+    return f'derivatives/{key[:2]}/{key}'
+
+
+def derivative_name(source_name, variant):
+    """Storage name of a derivative; it includes the size, so resized variants are rendered anew."""
+    return f'{derivatives_prefix(source_name)}/{variant}-{DERIVATIVE_SIZES[variant]}.{derivative_format()}'
+
+
+def render_derivatives(source_name):
+    """
+    Render the missing derivatives of an image.
+
+    Returns:
+        bool: False if the source is not a readable image
+    """
+    missing = [
+        variant for variant in DERIVATIVE_SIZES
+        if not default_storage.exists(derivative_name(source_name, variant))
+    ]
+    if not missing:
+        return True
+
+    file_format = derivative_format()
+    try:
+        with default_storage.open(source_name, 'rb') as source:
+            image = Image.open(source)
+            # JPEGs are decoded at a reduced scale when that is enough
+            largest = max(DERIVATIVE_SIZES[variant] for variant in missing)
+            image.draft('RGB', (largest, largest))
+            image = ImageOps.exif_transpose(image)
+            image = image.convert('RGBA' if 'A' in image.getbands() and file_format == 'webp' else 'RGB')
+    except Exception as e:
+        logger.warning(f"Cannot render derivatives of {source_name}: {e}")
+        return False
+
+    # Largest first, each downscaled from the previous one
+    for variant in sorted(missing, key=DERIVATIVE_SIZES.get, reverse=True):
+        size = DERIVATIVE_SIZES[variant]
+        if max(image.size) > size:
+            image = image.copy()
+            image.thumbnail((size, size), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, file_format.upper(), quality=DERIVATIVE_QUALITY)
+        name = derivative_name(source_name, variant)
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(output.getvalue()))
+    return True
+
+
+def derivative_file(field_file, variant):
+    """
+    A derivative of a stored image, rendered now if it is missing.
+
+    Returns:
+        FieldFile or None: None if the file is not a readable image
+    """
+    name = derivative_name(field_file.name, variant)
+    if not default_storage.exists(name) and not render_derivatives(field_file.name):
+        return None
+    return FieldFile(field_file.instance, field_file.field, name)
+
+
+def delete_derivatives(source_name):
+    """Delete every derivative of a file."""
+    prefix = derivatives_prefix(source_name)
+    try:
+        _, files = default_storage.listdir(prefix)
+    except FileNotFoundError:
+        return
+    for name in files:
+        default_storage.delete(f'{prefix}/{name}')
@@ -0,0 +1,35 @@
+"""
+Django management command to delete unreferenced blobs.
+Run with: python manage.py collect_blobs [--grace-hours N] [--recount]
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from blobs.models import Blob, UploadSession
+
+
+class Command(BaseCommand):
+    help = 'Delete blobs that no upload has referenced for longer than the grace period, and expired upload sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=float,
+            default=getattr(settings, 'BLOB_GC_GRACE_HOURS', 24),
+            help='Hours an unreferenced blob is kept (default: BLOB_GC_GRACE_HOURS)'
+        )
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Recompute the reference counts from the referencing tables first'
+        )
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            corrected = Blob.recount()
+            self.stdout.write(f'Corrected the reference count of {corrected} blob(s).')
+
+        deleted = Blob.collect(timedelta(hours=options['grace_hours']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} unreferenced blob(s).'))
+        expired = UploadSession.expire()
+        self.stdout.write(self.style.SUCCESS(f'Discarded {expired} expired upload session(s).'))
@@ -0,0 +1,51 @@
+"""
+Django management command to remove stored files no model references.
+Run with: python manage.py collect_orphaned_media [--grace-hours N] [--quarantine] [--dry-run]
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from blobs.orphans import collect_orphans, ORPHAN_BATCH_SIZE, QUARANTINE_PREFIX
+
+
+class Command(BaseCommand):
+    help = 'Delete (or quarantine) stored media files that no model references'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=float,
+            default=getattr(settings, 'ORPHAN_MEDIA_GRACE_HOURS', 24),
+            help='Hours a file is kept after it was written (default: ORPHAN_MEDIA_GRACE_HOURS)'
+        )
+        parser.add_argument(
+            '--quarantine',
+            action='store_true',
+            help=f'Move orphans under {QUARANTINE_PREFIX}/ instead of deleting them'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the orphans'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=ORPHAN_BATCH_SIZE,
+            help='Orphans removed per batch'
+        )
+
+    def handle(self, *args, **options):
+        count, reclaimed = collect_orphans(
+            timedelta(hours=options['grace_hours']),
+            quarantine_files=options['quarantine'],
+            dry_run=options['dry_run'],
+            batch_size=options['batch_size']
+        )
+        if options['dry_run']:
+            self.stdout.write(f'Found {count} orphaned file(s), {reclaimed} bytes.')
+        else:
+            verb = 'Quarantined' if options['quarantine'] else 'Deleted'
+            self.stdout.write(self.style.SUCCESS(
+                f'{verb} {count} orphaned file(s), reclaimed {reclaimed} bytes.'
+            ))
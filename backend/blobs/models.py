@@ -0,0 +1,308 @@
+import hashlib
+import os
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+# Bytes copied per read when streaming files
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+def blob_name(digest, file_name):
+    """Storage name of a blob: its SHA-256, fanned out by the first byte."""
+    extension = os.path.splitext(file_name or '')[1].lower()
+    return f'blobs/{digest[:2]}/{digest}{extension}'
+
+
+def file_digest(file):
+    """SHA-256 of an uploaded file, read in chunks."""
+    sha256 = hashlib.sha256()
+    for chunk in file.chunks(COPY_CHUNK_SIZE):
+        sha256.update(chunk)
+    file.seek(0)
+    return sha256.hexdigest()
+
+
+class Blob(models.Model):
+    """
+    Content-addressed file shared by every upload with the same contents.
+
+    Models referencing blobs inherit BlobReference; blobs/signals.py keeps
+    ref_count up to date, and blobs left unreferenced for longer than
+    BLOB_GC_GRACE_HOURS are deleted by Blob.collect().
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(max_length=255)
+    size = models.BigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Start of the grace period of an unreferenced blob; None while referenced
+    unreferenced_at = models.DateTimeField(null=True, blank=True, default=timezone.now, db_index=True)
+
+    class Meta:
+        db_table = 'blobs'
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes, {self.ref_count} references)"
+
+    @classmethod
+    def store(cls, upload, digest=None):
+        """
+        Blob with the contents of an uploaded file, stored only if no blob
+        has the same contents yet. The caller references it by assigning
+        it to a BlobReference model.
+
+        Args:
+            upload: Django UploadedFile
+            digest: SHA-256 of the upload if known (UploadInfo.sha256); otherwise
+                the one set by the upload handlers, or computed
+
+        Returns:
+            Blob
+        """
+        from django.core.files.storage import default_storage
+
+        digest = digest or getattr(upload, 'sha256', None) or file_digest(upload)
+        blob = cls.objects.filter(sha256=digest).first()
+        if blob:
+            if blob.ref_count > 0:
+                return blob
+            # Restart the grace period so the collector leaves it to this upload
+            if cls.objects.filter(id=blob.id).update(unreferenced_at=timezone.now()):
+                return blob
+
+        upload.seek(0)
+        name = default_storage.save(blob_name(digest, upload.name), upload)
+        blob, created = cls.objects.get_or_create(
+            sha256=digest, defaults={'file': name, 'size': upload.size}
+        )
+        if not created and blob.file.name != name:
+            # Stored concurrently by another upload of the same file
+            default_storage.delete(name)
+        return blob
+
+    @classmethod
+    def acquire(cls, blob_id):
+        if blob_id:
+            cls.objects.filter(id=blob_id).update(
+                ref_count=models.F('ref_count') + 1, unreferenced_at=None
+            )
+
+    @classmethod
+    def release(cls, blob_id):
+        if not blob_id:
+            return
+        cls.objects.filter(id=blob_id).update(ref_count=models.F('ref_count') - 1)
+        cls.objects.filter(id=blob_id, ref_count__lte=0, unreferenced_at=None).update(
+            unreferenced_at=timezone.now()
+        )
+
+    @classmethod
+    def recount(cls):
+        """
+        Recompute ref_count from the BlobReference models, e.g. after rows
+        were written without model signals.
+
+        Returns:
+            int: Number of blobs whose count was corrected
+        """
+        from collections import Counter
+        from django.apps import apps
+        from django.db.models import Count
+
+        counts = Counter()
+        for model in apps.get_models():
+            if issubclass(model, BlobReference):
+                rows = model.objects.exclude(blob=None).values('blob').annotate(references=Count('id'))
+                counts.update({row['blob']: row['references'] for row in rows})
+
+        corrected = 0
+        now = timezone.now()
+        for blob in cls.objects.only('id', 'ref_count', 'unreferenced_at').iterator():
+            references = counts.get(blob.id, 0)
+            if references != blob.ref_count:
+                cls.objects.filter(id=blob.id).update(
+                    ref_count=references,
+                    unreferenced_at=None if references else (blob.unreferenced_at or now)
+                )
+                corrected += 1
+        return corrected
+
+    @classmethod
+    def collect(cls, grace):
+        """
+        Delete the blobs unreferenced for longer than a grace period, and
+        their files.
+
+        Args:
+            grace: timedelta an unreferenced blob is kept, so that uploads
+                between Blob.store() and saving their reference are safe
+
+        Returns:
+            int: Number of blobs deleted
+        """
+        from django.core.files.storage import default_storage
+        from django.db.models import ProtectedError
+        from .derivatives import delete_derivatives
+
+        cutoff = timezone.now() - grace
+        deleted = 0
+        for blob in cls.objects.filter(ref_count__lte=0, unreferenced_at__lt=cutoff).iterator():
+            try:
+                # Re-checked in the DELETE, in case the blob was referenced meanwhile
+                removed, _ = cls.objects.filter(
+                    id=blob.id, ref_count__lte=0, unreferenced_at__lt=cutoff
+                ).delete()
+            except ProtectedError:
+                # The count drifted below the real references; recount() repairs it
+                continue
+            if removed:
+                default_storage.delete(blob.file.name)
+                delete_derivatives(blob.file.name)
+                deleted += 1
+        return deleted
+
+
+class BlobReference(models.Model):
+    """
+    Abstract base of models whose file is stored as a blob. `file` keeps
+    the blob's storage name, so the file field works as before.
+    """
+    blob = models.ForeignKey(
+        Blob,
+        on_delete=models.PROTECT,
+        related_name='+',
+        null=True,
+        blank=True,
+        editable=False
+    )
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored blob so the reference counters can follow replacements
+        instance._loaded_blob_id = instance.__dict__.get('blob_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save receivers have counted the new reference
+        self._loaded_blob_id = self.blob_id
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload: the client declares the file, PUTs byte ranges that
+    are written straight to a part file under UPLOAD_SESSION_ROOT, and
+    finalizes it once complete. A finalized session is then passed as
+    `upload` to the regular upload endpoints instead of a `file`.
+    """
+    STATUS_CHOICES = [
+        ('OPEN', 'Open'),
+        ('COMPLETE', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.CASCADE,
+        related_name='upload_sessions'
+    )
+    file_name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64, help_text="Expected SHA-256 of the whole file")
+    # Contiguous bytes written from the start of the file
+    received = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='OPEN')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'upload_sessions'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.file_name} ({self.received}/{self.size} bytes)"
+
+    def save(self, *args, **kwargs):
+        if not self.expires_at:
+            hours = getattr(settings, 'UPLOAD_SESSION_HOURS', 24)
+            self.expires_at = timezone.now() + timedelta(hours=hours)
+        super().save(*args, **kwargs)
+
+    @property
+    def path(self):
+        return os.path.join(settings.UPLOAD_SESSION_ROOT, f'{self.id.hex}.part')
+
+    def write(self, stream, start, length):
+        """
+        Copy `length` bytes of a request stream into the part file at `start`,
+        in COPY_CHUNK_SIZE pieces so the body is never held in memory.
+
+        Returns:
+            int: Bytes written
+        """
+        os.makedirs(settings.UPLOAD_SESSION_ROOT, exist_ok=True)
+        written = 0
+        with open(self.path, 'r+b' if os.path.exists(self.path) else 'wb') as part:
+            part.seek(start)
+            while written < length:
+                chunk = stream.read(min(COPY_CHUNK_SIZE, length - written))
+                if not chunk:
+                    break
+                part.write(chunk)
+                written += len(chunk)
+        # A short body still extends the contiguous range by what arrived
+        self.received = max(self.received, start + written)
+        self.save(update_fields=['received'])
+        return written
+
+    def verify(self):
+        """Hash the assembled file; a match completes the session."""
+        sha256 = hashlib.sha256()
+        with open(self.path, 'rb') as part:
+            for chunk in iter(lambda: part.read(COPY_CHUNK_SIZE), b''):
+                sha256.update(chunk)
+        if sha256.hexdigest() != self.sha256:
+            return False
+        self.status = 'COMPLETE'
+        self.save(update_fields=['status'])
+        return True
+
+    def open(self):
+        """The assembled file, as an upload the file validators and Blob.store() accept."""
+        from django.core.files.uploadedfile import UploadedFile
+        upload = UploadedFile(open(self.path, 'rb'), name=self.file_name, size=self.size)
+        # Verified by finalize, so it is not hashed again
+        upload.sha256 = self.sha256
+        self._upload = upload
+        return upload
+
+    def discard(self):
+        """Delete the session and its part file."""
+        if getattr(self, '_upload', None):
+            self._upload.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self.delete()
+
+    @classmethod
+    def expire(cls):
+        """
+        Discard the sessions past their expiry.
+
+        Returns:
+            int: Number of sessions discarded
+        """
+        expired = 0
+        for session in cls.objects.filter(expires_at__lt=timezone.now()).iterator():
+            session.discard()
+            expired += 1
+        return expired
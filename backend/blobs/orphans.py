@@ -0,0 +1,147 @@
+"""
+Collection of orphaned media: stored files no model references anymore,
+such as files of deleted rows or replaced uploads that predate blobs.
+
+A file is referenced when a FileField holds its name, or when it lies in
+the directory of a derived file set whose source still exists (the tiles
+of a published blueprint pyramid, the derivatives of an image). Only the
+referenced names are held in memory; storage is walked lazily and files
+newer than the grace period are left alone, as they may belong to an
+upload or tiling still in progress.
+"""
+import logging
+import posixpath
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.db import models
+from django.utils import timezone
+from .derivatives import derivatives_prefix
+
+logger = logging.getLogger(__name__)
+
+# Orphans are moved here instead of deleted when quarantining
+QUARANTINE_PREFIX = 'quarantine'
+
+# Default number of orphans deleted or moved per batch
+ORPHAN_BATCH_SIZE = 500
+
+
+def referenced_files():
+    """
+    Names and directory prefixes of the referenced files.
+
+    Returns:
+        tuple: (set of file names, set of directory prefixes)
+    """
+    from projects.models import Blueprint
+    from projects.tiles import tiles_prefix
+
+    names = set()
+    for model in apps.get_models():
+        fields = [
+            field.attname for field in model._meta.concrete_fields
+            if isinstance(field, models.FileField)
+        ]
+        if fields:
+            rows = model._base_manager.values_list(*fields).iterator(chunk_size=2000)
+            names.update(name for row in rows for name in row if name)
+
+    prefixes = {derivatives_prefix(name) for name in names}
+    blueprints = Blueprint.objects.exclude(tile_version='').values_list('id', 'tile_version')
+    prefixes.update(tiles_prefix(blueprint_id, version) for blueprint_id, version in blueprints.iterator())
+    return names, prefixes
+
+
+def is_referenced(name, names, prefixes):
+    if name in names:
+        return True
+    directory = posixpath.dirname(name)
+    while directory:
+        if directory in prefixes:
+            return True
+        directory = posixpath.dirname(directory)
+    return False
+
+
+def walk_storage(prefix=''):
+    """Yield the name of every stored file under a prefix, quarantine excluded."""
+    try:
+        directories, files = default_storage.listdir(prefix)
+    except FileNotFoundError:
+        return
+    for name in files:
+        yield posixpath.join(prefix, name) if prefix else name
+    for name in directories:
+        path = posixpath.join(prefix, name) if prefix else name
+        if path != QUARANTINE_PREFIX:
+            yield from walk_storage(path)
+
+
+def find_orphans(grace):
+    """
+    Yield the orphaned files older than a grace period.
+
+    Yields:
+        tuple: (name, size in bytes)
+    """
+    names, prefixes = referenced_files()
+    cutoff = timezone.now() - grace
+    for name in walk_storage():
+        if is_referenced(name, names, prefixes):
+            continue
+        try:
+            if default_storage.get_modified_time(name) >= cutoff:
+                continue
+            size = default_storage.size(name)
+        except FileNotFoundError:
+            continue  # Removed while walking
+        yield name, size
+
+
+def quarantine(name, stamp):
+    """Move a file under QUARANTINE_PREFIX/<stamp>/, keeping its path."""
+    with default_storage.open(name, 'rb') as source:
+        default_storage.save(posixpath.join(QUARANTINE_PREFIX, stamp, name), source)
+    default_storage.delete(name)
+
+
+def collect_orphans(grace, quarantine_files=False, dry_run=False, batch_size=ORPHAN_BATCH_SIZE):
+    """
+    Delete, or move to quarantine, the orphaned files older than a grace period.
+
+    Args:
+        grace: timedelta files are kept after they were last written
+        quarantine_files: Move orphans under QUARANTINE_PREFIX instead of deleting them
+        dry_run: Only count the orphans
+        batch_size: Orphans removed per batch
+
+    Returns:
+        tuple: (number of orphaned files, their total size in bytes)
+    """
+    stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+    count, reclaimed = 0, 0
+    batch = []
+
+    def flush():
+        for name in batch:
+            if quarantine_files:
+                quarantine(name, stamp)
+            else:
+                default_storage.delete(name)
+        batch.clear()
+
+    for name, size in find_orphans(grace):
+        count += 1
+        reclaimed += size
+        if dry_run:
+            continue
+        batch.append(name)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    logger.info(
+        f"{'Found' if dry_run else 'Quarantined' if quarantine_files else 'Deleted'} "
+        f"{count} orphaned file(s), {reclaimed} bytes"
+    )
+    return count, reclaimed
@@ -0,0 +1,28 @@
+from rest_framework import serializers
+from utils.file_validators import MAX_BLUEPRINT_SIZE_MB
+from .models import UploadSession
+
+# Largest file an upload session accepts; the target endpoint applies its own limit
+MAX_UPLOAD_SESSION_MB = MAX_BLUEPRINT_SIZE_MB
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received', read_only=True)
+    
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'file_name', 'size', 'sha256', 'offset', 'status', 'created_at', 'expires_at']
+        read_only_fields = ['id', 'status', 'created_at', 'expires_at']
+    
+    def validate_size(self, value):
+        if not 0 < value <= MAX_UPLOAD_SESSION_MB * 1024 * 1024:
+            raise serializers.ValidationError(
+                f"Size must be between 1 byte and {MAX_UPLOAD_SESSION_MB}MB."
+            )
+        return value
+    
+    def validate_sha256(self, value):
+        value = value.lower()
+        if len(value) != 64 or any(char not in '0123456789abcdef' for char in value):
+            raise serializers.ValidationError("sha256 must be 64 hexadecimal digits.")
+        return value
@@ -0,0 +1,26 @@
+from django.apps import apps
+from django.db.models.signals import post_save, post_delete
+from .models import Blob, BlobReference
+
+
+def count_blob_reference_on_save(sender, instance, created, **kwargs):
+    """Move the reference when a model is saved with a new blob."""
+    if kwargs.get('raw'):
+        return
+    previous = getattr(instance, '_loaded_blob_id', None)
+    if previous == instance.blob_id:
+        return
+    Blob.acquire(instance.blob_id)
+    Blob.release(previous)
+
+
+def count_blob_reference_on_delete(sender, instance, **kwargs):
+    """Release the blob of a deleted model, cascades included."""
+    Blob.release(getattr(instance, '_loaded_blob_id', instance.blob_id))
+
+
+# Connected per model: a receiver for every sender would disable fast deletes everywhere
+for model in apps.get_models():
+    if issubclass(model, BlobReference):
+        post_save.connect(count_blob_reference_on_save, sender=model)
+        post_delete.connect(count_blob_reference_on_delete, sender=model)
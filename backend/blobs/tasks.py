@@ -0,0 +1,52 @@
+try:
+    from celery import shared_task
+    CELERY_AVAILABLE = True
+except ImportError:
+    CELERY_AVAILABLE = False
+    # Fallback decorator if celery is not available
+    def shared_task(func):
+        return func
+
+import logging
+from datetime import timedelta
+from django.conf import settings
+from .derivatives import render_derivatives
+from .models import Blob, UploadSession
+from .orphans import collect_orphans
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def collect_unreferenced_blobs():
+    """Periodic Celery task deleting the blobs no model references anymore."""
+    grace = timedelta(hours=getattr(settings, 'BLOB_GC_GRACE_HOURS', 24))
+    deleted = Blob.collect(grace)
+    logger.info(f"Deleted {deleted} unreferenced blob(s)")
+    expired = UploadSession.expire()
+    logger.info(f"Discarded {expired} expired upload session(s)")
+    return deleted
+
+
+@shared_task
+def collect_orphaned_media():
+    """Periodic Celery task removing stored files no model references."""
+    grace = timedelta(hours=getattr(settings, 'ORPHAN_MEDIA_GRACE_HOURS', 24))
+    count, reclaimed = collect_orphans(
+        grace, quarantine_files=getattr(settings, 'ORPHAN_MEDIA_QUARANTINE', False)
+    )
+    return {'files': count, 'bytes': reclaimed}
+
+
+@shared_task
+def generate_derivatives(source_name):
+    """Celery task rendering the thumbnail and preview of an uploaded image."""
+    render_derivatives(source_name)
+
+
+def enqueue_derivatives(source_name):
+    """Send an image to the Celery queue, or render it inline when Celery is unavailable."""
+    if CELERY_AVAILABLE and hasattr(generate_derivatives, 'delay'):
+        generate_derivatives.delay(source_name)
+    else:
+        generate_derivatives(source_name)
@@ -0,0 +1,405 @@
+"""
+Unit tests for blobs app.
+"""
+import hashlib
+import pytest
+from datetime import timedelta
+from io import BytesIO, StringIO
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from .models import Blob
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestBlobs:
+    """Test uploads are stored once per content and reference-counted."""
+
+    @pytest.fixture
+    def api_client(self):
+        """Create API client."""
+        return APIClient()
+
+    @pytest.fixture
+    def admin_user(self):
+        """Create company admin."""
+        from accounts.models import Company
+        company = Company.objects.create(name='Blob Co', email='blobs@example.com')
+        return User.objects.create_user(
+            username='blob_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+
+    @pytest.fixture
+    def tasks(self, settings, admin_user):
+        """Create two tasks of a project."""
+        from projects.models import Project
+        from tasks.models import Task
+        project = Project.objects.create(company=admin_user.company, name='Tower', address='Site 1')
+        return [Task.objects.create(project=project, title=f'Task {number}') for number in range(2)]
+
+    def photo(self, name='photo.png', color='white'):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+        output = BytesIO()
+        Image.new('RGB', (32, 32), color).save(output, 'PNG')
+        return SimpleUploadedFile(name, output.getvalue(), content_type='image/png')
+
+    def attach(self, api_client, task, photo):
+        return api_client.post(f'/api/tasks/{task.id}/upload_attachment/', {'file': photo}, format='multipart')
+
+    def test_identical_uploads_share_a_blob(self, api_client, admin_user, tasks, media_root):
+        """Test the same file attached twice is stored once, under its SHA-256."""
+        from tasks.models import TaskAttachment
+        api_client.force_authenticate(user=admin_user)
+        first = self.photo('site-a.png')
+        assert self.attach(api_client, tasks[0], first).status_code == status.HTTP_201_CREATED
+        assert self.attach(api_client, tasks[1], self.photo('site-b.png')).status_code == status.HTTP_201_CREATED
+
+        blob = Blob.objects.get()
+        first.seek(0)
+        assert blob.sha256 == hashlib.sha256(first.read()).hexdigest()
+        assert blob.ref_count == 2 and blob.unreferenced_at is None
+        assert blob.file.name == f'blobs/{blob.sha256[:2]}/{blob.sha256}.png'
+        assert len(list((media_root / 'blobs' / blob.sha256[:2]).iterdir())) == 1
+        # Each attachment keeps its own name
+        assert sorted(TaskAttachment.objects.values_list('file_name', flat=True)) == ['site-a.png', 'site-b.png']
+        assert set(TaskAttachment.objects.values_list('file', flat=True)) == {blob.file.name}
+
+        self.attach(api_client, tasks[0], self.photo(color='black'))
+        assert Blob.objects.count() == 2
+
+    def test_unreferenced_blobs_are_collected(self, api_client, admin_user, tasks, media_root):
+        """Test a blob is deleted once its last reference is gone and the grace period is over."""
+        from tasks.models import TaskAttachment
+        api_client.force_authenticate(user=admin_user)
+        for task in tasks:
+            self.attach(api_client, task, self.photo())
+        blob = Blob.objects.get()
+        path = media_root / blob.file.name
+
+        TaskAttachment.objects.filter(task=tasks[0]).get().delete()
+        assert Blob.objects.get().ref_count == 1
+        # Cascades release their blobs too
+        tasks[1].delete()
+        blob = Blob.objects.get()
+        assert blob.ref_count == 0 and blob.unreferenced_at is not None
+
+        assert Blob.collect(timedelta(hours=1)) == 0
+        assert path.exists()
+        assert Blob.collect(timedelta(0)) == 1
+        assert not Blob.objects.exists()
+        assert not path.exists()
+
+    def test_replaced_blueprint_keeps_shared_file(self, api_client, admin_user, tasks, media_root,
+                                                   django_capture_on_commit_callbacks):
+        """Test replacing a blueprint releases its blob instead of deleting a file others use."""
+        api_client.force_authenticate(user=admin_user)
+        project = tasks[0].project
+        self.attach(api_client, tasks[0], self.photo('plan.png'))
+        url = f'/api/projects/{project.id}/upload_blueprint/'
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post(url, {'file': self.photo('plan.png')}, format='multipart')
+        assert response.status_code == status.HTTP_201_CREATED
+        shared = Blob.objects.get()
+        assert shared.ref_count == 2
+
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.post(url, {'file': self.photo('plan-v2.png', color='gray')}, format='multipart')
+        shared.refresh_from_db()
+        assert shared.ref_count == 1
+        assert (media_root / shared.file.name).exists()
+        project.blueprint.refresh_from_db()
+        assert project.blueprint.blob.ref_count == 1
+
+    def test_recount_and_command(self, api_client, admin_user, tasks, media_root):
+        """Test the command repairs drifted counts before collecting."""
+        from django.core.management import call_command
+        api_client.force_authenticate(user=admin_user)
+        self.attach(api_client, tasks[0], self.photo())
+        Blob.objects.update(ref_count=0, unreferenced_at=Blob.objects.get().created_at - timedelta(days=2))
+
+        out = StringIO()
+        call_command('collect_blobs', '--recount', stdout=out)
+        assert 'Corrected the reference count of 1 blob(s)' in out.getvalue()
+        assert 'Deleted 0 unreferenced blob(s)' in out.getvalue()
+        assert Blob.objects.get().ref_count == 1
+
+    def test_upload_handler_hashes_while_receiving(self):
+        """Test the upload handler sets the SHA-256 of the received file."""
+        from django.core.files.uploadhandler import StopFutureHandlers
+        from .uploadhandlers import HashingMemoryFileUploadHandler
+        handler = HashingMemoryFileUploadHandler()
+        handler.handle_raw_input(None, {}, content_length=10, boundary=b'x')
+        with pytest.raises(StopFutureHandlers):
+            handler.new_file('file', 'notes.txt', 'text/plain', 10)
+        for start, chunk in [(0, b'hello '), (6, b'site')]:
+            handler.receive_data_chunk(chunk, start)
+        upload = handler.file_complete(10)
+        assert upload.sha256 == hashlib.sha256(b'hello site').hexdigest()
+
+
+@pytest.mark.django_db
+class TestUploadSessions:
+    """Test resumable uploads are assembled on disk and handed to the upload endpoints."""
+
+    @pytest.fixture
+    def api_client(self, admin_user):
+        """Create API client authenticated as the admin."""
+        client = APIClient()
+        client.force_authenticate(user=admin_user)
+        return client
+
+    @pytest.fixture
+    def admin_user(self):
+        """Create company admin."""
+        from accounts.models import Company
+        company = Company.objects.create(name='Upload Co', email='uploads@example.com')
+        return User.objects.create_user(
+            username='upload_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+
+    @pytest.fixture
+    def task(self, settings, admin_user, media_root, tmp_path):
+        """Create a task, with upload sessions kept under tmp_path."""
+        from django.test import override_settings
+        from projects.models import Project
+        from tasks.models import Task
+        project = Project.objects.create(company=admin_user.company, name='Tower', address='Site 1')
+        with override_settings(UPLOAD_SESSION_ROOT=str(tmp_path / 'sessions')):
+            yield Task.objects.create(project=project, title='Task')
+
+    @pytest.fixture
+    def data(self):
+        from PIL import Image
+        output = BytesIO()
+        Image.new('RGB', (64, 64), 'white').save(output, 'PNG')
+        return output.getvalue()
+
+    def start(self, api_client, data, sha256=None):
+        response = api_client.post('/api/uploads/', {
+            'file_name': 'site.png',
+            'size': len(data),
+            'sha256': sha256 or hashlib.sha256(data).hexdigest(),
+        }, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['offset'] == 0
+        return response.data['id']
+
+    def put(self, api_client, upload_id, data, start, end):
+        return api_client.generic(
+            'PUT', f'/api/uploads/{upload_id}/', data[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(data)}'
+        )
+
+    def test_resumable_attachment(self, api_client, task, data):
+        """Test ranges are written in order, verified, and attached as a blob."""
+        from .models import UploadSession
+        from tasks.models import TaskAttachment
+        upload_id = self.start(api_client, data)
+        middle = len(data) // 2
+        assert self.put(api_client, upload_id, data, 0, middle - 1).data['offset'] == middle
+        # The client resumes from the offset it is told
+        assert api_client.get(f'/api/uploads/{upload_id}/').data['offset'] == middle
+        response = self.put(api_client, upload_id, data, middle, len(data) - 1)
+        assert response.data['offset'] == len(data)
+
+        response = api_client.post(f'/api/uploads/{upload_id}/finalize/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['status'] == 'COMPLETE'
+
+        response = api_client.post(
+            f'/api/tasks/{task.id}/upload_attachment/', {'upload': upload_id}, format='multipart'
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        attachment = TaskAttachment.objects.get()
+        assert attachment.file_name == 'site.png'
+        assert attachment.blob.sha256 == hashlib.sha256(data).hexdigest()
+        assert not UploadSession.objects.exists()
+
+    def test_gap_and_incomplete(self, api_client, task, data):
+        """Test a range past the offset and an early finalize are conflicts."""
+        upload_id = self.start(api_client, data)
+        response = self.put(api_client, upload_id, data, 10, 19)
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.data['offset'] == 0
+        response = api_client.post(f'/api/uploads/{upload_id}/finalize/')
+        assert response.status_code == status.HTTP_409_CONFLICT
+        # An unfinished session cannot be handed to an endpoint
+        response = api_client.post(
+            f'/api/tasks/{task.id}/upload_attachment/', {'upload': upload_id}, format='multipart'
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_hash_mismatch(self, api_client, task, data):
+        """Test a file not matching its declared SHA-256 is rejected and restarted."""
+        upload_id = self.start(api_client, data, sha256='0' * 64)
+        self.put(api_client, upload_id, data, 0, len(data) - 1)
+        response = api_client.post(f'/api/uploads/{upload_id}/finalize/')
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert api_client.get(f'/api/uploads/{upload_id}/').data['offset'] == 0
+
+    def test_expire(self, api_client, task, data):
+        """Test expired sessions and their part files are discarded."""
+        import os
+        from django.utils import timezone
+        from .models import UploadSession
+        upload_id = self.start(api_client, data)
+        self.put(api_client, upload_id, data, 0, 9)
+        session = UploadSession.objects.get()
+        assert os.path.exists(session.path)
+        UploadSession.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        assert UploadSession.expire() == 1
+        assert not os.path.exists(session.path)
+
+
+@pytest.mark.django_db
+class TestDerivatives:
+    """Test thumbnails and previews of uploaded images."""
+
+    @pytest.fixture
+    def api_client(self):
+        """Create API client."""
+        return APIClient()
+
+    @pytest.fixture
+    def task(self, settings, media_root):
+        """Create a task and authenticate its company admin."""
+        from accounts.models import Company
+        from projects.models import Project
+        from tasks.models import Task
+        company = Company.objects.create(name='Photo Co', email='photos@example.com')
+        admin = User.objects.create_user(
+            username='photo_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+        project = Project.objects.create(company=company, name='Tower', address='Site 1')
+        task = Task.objects.create(project=project, title='Task')
+        task.admin = admin
+        return task
+
+    def attach(self, api_client, task, upload, capture):
+        api_client.force_authenticate(user=task.admin)
+        with capture(execute=True):
+            response = api_client.post(
+                f'/api/tasks/{task.id}/upload_attachment/', {'file': upload}, format='multipart'
+            )
+        assert response.status_code == status.HTTP_201_CREATED
+        return response.data
+
+    def photo(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+        output = BytesIO()
+        Image.new('RGB', (2000, 1000), 'navy').save(output, 'JPEG')
+        return SimpleUploadedFile('site.jpg', output.getvalue(), content_type='image/jpeg')
+
+    def test_rendered_after_upload(self, api_client, task, media_root, django_capture_on_commit_callbacks):
+        """Test both derivatives are rendered in the background and served downscaled."""
+        from PIL import Image
+        from .derivatives import DERIVATIVE_SIZES, derivative_name
+        data = self.attach(api_client, task, self.photo(), django_capture_on_commit_callbacks)
+        blob = Blob.objects.get()
+        for variant, size in DERIVATIVE_SIZES.items():
+            assert (media_root / derivative_name(blob.file.name, variant)).exists()
+            response = api_client.get(data[f'{variant}_url'])
+            assert response.status_code == status.HTTP_200_OK
+            image = Image.open(BytesIO(b''.join(response.streaming_content)))
+            assert image.size == (size, size // 2)
+            assert response['Content-Disposition'].startswith('inline')
+
+    def test_missing_derivative_is_rendered_on_request(self, api_client, task, media_root,
+                                                       django_capture_on_commit_callbacks):
+        """Test a derivative deleted from storage is rendered again when requested."""
+        from .derivatives import derivative_name
+        data = self.attach(api_client, task, self.photo(), django_capture_on_commit_callbacks)
+        path = media_root / derivative_name(Blob.objects.get().file.name, 'thumbnail')
+        path.unlink()
+        assert api_client.get(data['thumbnail_url']).status_code == status.HTTP_200_OK
+        assert path.exists()
+
+    def test_not_an_image(self, api_client, task, django_capture_on_commit_callbacks):
+        """Test other files have no derivatives."""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        data = self.attach(
+            api_client, task, SimpleUploadedFile('notes.txt', b'level 3 slab'), django_capture_on_commit_callbacks
+        )
+        assert data['thumbnail_url'] is None and data['preview_url'] is None
+        response = api_client.get(f"{data['download_url']}?variant=thumbnail")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        response = api_client.get(f"{data['download_url']}?variant=poster")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_collected_with_blob(self, api_client, task, media_root, django_capture_on_commit_callbacks):
+        """Test derivatives are deleted with their blob."""
+        from tasks.models import TaskAttachment
+        from .derivatives import derivatives_prefix
+        self.attach(api_client, task, self.photo(), django_capture_on_commit_callbacks)
+        prefix = media_root / derivatives_prefix(Blob.objects.get().file.name)
+        assert any(prefix.iterdir())
+        TaskAttachment.objects.get().delete()
+        Blob.collect(timedelta(0))
+        assert not any(prefix.iterdir())
+
+
+@pytest.mark.django_db
+class TestOrphanedMedia:
+    """Test stored files no model references are found and removed."""
+
+    @pytest.fixture
+    def files(self, media_root):
+        """Store referenced, derived and orphaned files, all written two days ago."""
+        import os
+        import time
+        from accounts.models import Company
+        from projects.models import Project, Blueprint
+        from projects.tiles import tiles_prefix
+        from .derivatives import derivatives_prefix
+        company = Company.objects.create(name='Orphan Co', email='orphans@example.com')
+        project = Project.objects.create(company=company, name='Tower', address='Site 1')
+        blueprint = Blueprint.objects.create(project=project, file='blueprints/plan.png', tile_version='v2')
+        names = {
+            'referenced': ['blueprints/plan.png', f'{tiles_prefix(blueprint.id, "v2")}/0/0_0.webp',
+                           f'{derivatives_prefix("blueprints/plan.png")}/thumbnail-256.webp'],
+            'orphaned': ['blueprints/old-plan.png', f'{tiles_prefix(blueprint.id, "v1")}/0/0_0.webp',
+                         'task_attachments/deleted.txt'],
+        }
+        old = time.time() - 2 * 24 * 3600
+        for name in names['referenced'] + names['orphaned']:
+            path = media_root / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b'12345')
+            os.utime(path, (old, old))
+        return names
+
+    def test_collect(self, files, media_root):
+        """Test only old, unreferenced files are deleted and their size reported."""
+        from .orphans import collect_orphans
+        (media_root / 'task_attachments' / 'uploading.txt').write_bytes(b'new')
+        assert collect_orphans(timedelta(hours=24), batch_size=2) == (3, 15)
+        for name in files['referenced']:
+            assert (media_root / name).exists()
+        for name in files['orphaned']:
+            assert not (media_root / name).exists()
+        # Within the grace period
+        assert (media_root / 'task_attachments' / 'uploading.txt').exists()
+
+    def test_quarantine_and_dry_run(self, files, media_root):
+        """Test the command reports orphans, and quarantines them instead of deleting."""
+        from django.core.management import call_command
+        out = StringIO()
+        call_command('collect_orphaned_media', '--dry-run', stdout=out)
+        assert 'Found 3 orphaned file(s), 15 bytes' in out.getvalue()
+        assert all((media_root / name).exists() for name in files['orphaned'])
+
+        call_command('collect_orphaned_media', '--quarantine', stdout=out)
+        assert 'Quarantined 3 orphaned file(s), reclaimed 15 bytes' in out.getvalue()
+        quarantined = [path for path in (media_root / 'quarantine').rglob('*') if path.is_file()]
+        assert sorted(path.name for path in quarantined) == ['0_0.webp', 'deleted.txt', 'old-plan.png']
+        # Quarantined files are not collected again
+        call_command('collect_orphaned_media', '--dry-run', stdout=out)
+        assert 'Found 0 orphaned file(s)' in out.getvalue()
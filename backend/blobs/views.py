@@ -0,0 +1,140 @@
+import os
+import re
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import viewsets, mixins, status, permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from utils.file_responses import serve_file
+from .derivatives import DERIVATIVE_SIZES, IMAGE_FILE_TYPES, derivative_file
+from .models import UploadSession
+from .serializers import UploadSessionSerializer
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+def request_upload(request):
+    """
+    The file of an upload request: the multipart `file`, or the assembled
+    file of a finalized upload session whose id is passed as `upload`.
+    The session is discarded by the caller once the file is stored.
+    
+    Returns:
+        tuple: (file or None, UploadSession or None)
+        
+    Raises:
+        ValidationError: If `upload` is not a finalized upload of the user
+    """
+    file = request.FILES.get('file')
+    upload_id = request.data.get('upload')
+    if file or not upload_id:
+        return file, None
+    
+    try:
+        session = UploadSession.objects.filter(id=upload_id, user=request.user).first()
+    except DjangoValidationError:
+        session = None  # Not a UUID
+    if not session or session.status != 'COMPLETE':
+        raise ValidationError({"upload": "Not a finalized upload of this user."})
+    return session.open(), session
+
+
+def serve_derivative(request, field_file, file_name, file_type, variant):
+    """
+    Response sending the thumbnail or preview of an image the caller has
+    already authorized, rendering it first if it is missing.
+    """
+    if variant not in DERIVATIVE_SIZES:
+        return Response(
+            {"error": f"variant must be one of: {', '.join(DERIVATIVE_SIZES)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    derivative = derivative_file(field_file, variant) if file_type in IMAGE_FILE_TYPES else None
+    if not derivative:
+        return Response(
+            {"error": "No preview available for this file."},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    base = os.path.splitext(file_name)[0]
+    extension = os.path.splitext(derivative.name)[1]
+    return serve_file(request, derivative, f'{base}-{variant}{extension}', as_attachment=False)
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable uploads: create a session, PUT byte ranges, finalize, then
+    pass the session id as `upload` to an upload endpoint.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+    
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+    
+    def perform_destroy(self, instance):
+        instance.discard()
+    
+    def update(self, request, *args, **kwargs):
+        """
+        Write the byte range given by `Content-Range: bytes start-end/size`.
+        Ranges may overlap what was received but not leave a gap; the
+        response `offset` is where the next range starts.
+        """
+        session = self.get_object()
+        if session.status != 'OPEN':
+            return Response(
+                {"error": "This upload is already finalized."},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        match = CONTENT_RANGE.match(request.headers.get('Content-Range', ''))
+        if not match:
+            return Response(
+                {"error": "A Content-Range header of the form 'bytes start-end/size' is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        start, end, total = (int(value) for value in match.groups())
+        length = end - start + 1
+        if total != session.size or length <= 0 or end >= session.size:
+            return Response(
+                {"error": f"The range must lie within the {session.size} bytes of the file."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if int(request.headers.get('Content-Length') or 0) != length:
+            return Response(
+                {"error": "The body length does not match the Content-Range."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start > session.received:
+            return Response(
+                {"error": "Ranges must continue from the current offset.", "offset": session.received},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        # Read from the stream, never request.data, so the body is not buffered
+        session.write(request.stream, start, length)
+        return Response(self.get_serializer(session).data)
+    
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        """Check the file is complete and matches its SHA-256."""
+        session = self.get_object()
+        if session.status == 'OPEN':
+            if session.received < session.size:
+                return Response(
+                    {"error": "The upload is incomplete.", "offset": session.received},
+                    status=status.HTTP_409_CONFLICT
+                )
+            if not session.verify():
+                # Start over: the assembled bytes are not the declared file
+                session.received = 0
+                session.save(update_fields=['received'])
+                return Response(
+                    {"error": "The uploaded file does not match its sha256.", "offset": 0},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+        return Response(self.get_serializer(session).data)
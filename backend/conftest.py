@@ -20,6 +20,17 @@ def enable_db_access_for_all_tests(db):
 @pytest.fixture
 def settings():
     """Override settings for tests."""
+    from mukhattat import celery_app
+    
+    # The Celery app reads its config once, so eager mode is set on it directly
+    previous = {}
+    if celery_app is not None:
+        previous = {
+            'task_always_eager': celery_app.conf.task_always_eager,
+            'task_eager_propagates': celery_app.conf.task_eager_propagates,
+        }
+        celery_app.conf.update(task_always_eager=True, task_eager_propagates=True)
+    
     with override_settings(
         CACHES={
             'default': {
@@ -30,4 +41,26 @@ def settings():
         CELERY_TASK_EAGER_PROPAGATES=True,
     ):
         yield
+    
+    if celery_app is not None:
+        celery_app.conf.update(**previous)
 
+
+
+@pytest.fixture
+def locmem_cache():
+    """Use a real (local memory) cache, emptied for the test."""
+    from django.core.cache import cache
+    
+    with override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    ):
+        cache.clear()
+        yield cache
+
+
+@pytest.fixture
+def media_root(tmp_path):
+    """Store uploaded and generated files in a temporary directory."""
+    with override_settings(MEDIA_ROOT=str(tmp_path)):
+        yield tmp_path
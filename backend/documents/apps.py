@@ -4,4 +4,6 @@ from django.apps import AppConfig
 class DocumentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'documents'
-
+    
+    def ready(self):
+        import documents.signals  # noqa
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0002_document_blob_documentversion_blob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['-uploaded_at', '-id'], name='documents_uploade_f15991_idx'),
+        ),
+    ]
@@ -3,9 +3,10 @@ from django.utils import timezone
 from django.conf import settings
 from accounts.models import Company, Contractor
 from projects.models import Project
+from blobs.models import BlobReference
 
 
-class Document(models.Model):
+class Document(BlobReference):
     """
     Document model for project-related documents.
     """
@@ -69,10 +70,30 @@ class Document(models.Model):
     class Meta:
         db_table = 'documents'
         ordering = ['-uploaded_at']
+        indexes = [
+            # Keyset pages of the document list
+            models.Index(fields=['-uploaded_at', '-id']),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.project.name}"
     
+    @classmethod
+    def visible_to(cls, user):
+        """
+        Documents a user can see: their company's, their contractor's, or
+        their own uploads and those of the projects they have tasks in.
+        """
+        if user.is_company_admin:
+            return cls.objects.filter(project__company=user.company)
+        if user.is_contractor:
+            return cls.objects.filter(
+                models.Q(contractor=user.contractor) | models.Q(project__contractor=user.contractor)
+            )
+        return cls.objects.filter(
+            models.Q(uploaded_by=user) | models.Q(project__tasks__assigned_to=user)
+        ).distinct()
+    
     def save(self, *args, **kwargs):
         # Set review deadline on upload
         if not self.review_deadline and self.status == 'PENDING':
@@ -95,7 +116,7 @@ class Document(models.Model):
         return None
 
 
-class DocumentVersion(models.Model):
+class DocumentVersion(BlobReference):
     """
     Document version model for tracking document modifications.
     """
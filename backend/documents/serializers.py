@@ -1,17 +1,25 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 from .models import Document, DocumentVersion
 from projects.serializers import ProjectSerializer
 from accounts.serializers import UserSerializer
+from blobs.derivatives import IMAGE_FILE_TYPES
 
 
 class DocumentVersionSerializer(serializers.ModelSerializer):
     uploaded_by_name = serializers.CharField(source='uploaded_by.get_full_name', read_only=True)
+    download_url = serializers.SerializerMethodField()
     
     class Meta:
         model = DocumentVersion
-        fields = ['id', 'document', 'file', 'version_number', 'change_notes',
+        fields = ['id', 'document', 'file', 'download_url', 'version_number', 'change_notes',
                   'uploaded_by', 'uploaded_by_name', 'uploaded_at']
         read_only_fields = ['id', 'uploaded_at']
+    
+    def get_download_url(self, obj):
+        request = self.context.get('request')
+        url = f'/api/documents/{obj.document_id}/versions/{obj.id}/download/'
+        return request.build_absolute_uri(url) if request else url
 
 
 class DocumentSerializer(serializers.ModelSerializer):
@@ -23,23 +31,54 @@ class DocumentSerializer(serializers.ModelSerializer):
     versions = DocumentVersionSerializer(many=True, read_only=True)
     is_overdue = serializers.SerializerMethodField()
     days_until_deadline = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Document
         fields = ['id', 'project', 'project_name', 'contractor', 'contractor_name',
                   'company', 'company_name', 'side', 'title', 'description', 'file',
-                  'file_name', 'file_type', 'status', 'uploaded_by', 'uploaded_by_name',
+                  'download_url', 'thumbnail_url', 'preview_url', 'file_name', 'file_type', 'status', 'uploaded_by', 'uploaded_by_name',
                   'reviewed_by', 'reviewed_by_name', 'review_notes', 'uploaded_at',
                   'review_deadline', 'reviewed_at', 'versions', 'is_overdue',
                   'days_until_deadline']
         read_only_fields = ['id', 'uploaded_at', 'file_type', 'side', 'file_name', 
                            'uploaded_by', 'contractor', 'company', 'status']
+        # Checked by the view, which also accepts a resumable `upload` instead
+        extra_kwargs = {'file': {'required': False}}
+    
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load the related rows and versions in a fixed number of queries."""
+        return queryset.select_related(
+            'project', 'contractor', 'company', 'uploaded_by', 'reviewed_by'
+        ).prefetch_related(
+            Prefetch('versions', queryset=DocumentVersion.objects.select_related('uploaded_by'))
+        )
     
     def get_is_overdue(self, obj):
         return obj.is_overdue()
     
     def get_days_until_deadline(self, obj):
         return obj.days_until_deadline()
+    
+    def get_download_url(self, obj):
+        request = self.context.get('request')
+        url = f'/api/documents/{obj.id}/download/'
+        return request.build_absolute_uri(url) if request else url
+    
+    def get_thumbnail_url(self, obj):
+        return self.derivative_url(obj, 'thumbnail')
+    
+    def get_preview_url(self, obj):
+        return self.derivative_url(obj, 'preview')
+    
+    def derivative_url(self, obj, variant):
+        """Download URL of a thumbnail or preview; only images have them."""
+        if obj.file_type not in IMAGE_FILE_TYPES:
+            return None
+        return f'{self.get_download_url(obj)}?variant={variant}'
 
 
 class DocumentListSerializer(serializers.ModelSerializer):
@@ -51,4 +90,7 @@ class DocumentListSerializer(serializers.ModelSerializer):
         model = Document
         fields = ['id', 'project_name', 'title', 'side', 'status', 'status_display',
                   'uploaded_at', 'review_deadline']
-
+    
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('project')
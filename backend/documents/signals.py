@@ -0,0 +1,31 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from utils.cache_versions import invalidate, project_tenants
+from .models import Document, DocumentVersion
+
+
+@receiver([post_save, post_delete], sender=Document)
+def invalidate_document_responses(sender, instance, **kwargs):
+    invalidate(
+        ['documents'],
+        *project_tenants(instance.project_id),
+        instance.company_id and f"company:{instance.company_id}",
+        instance.contractor_id and f"contractor:{instance.contractor_id}"
+    )
+
+
+@receiver([post_save, post_delete], sender=DocumentVersion)
+def invalidate_document_version_responses(sender, instance, **kwargs):
+    document = Document.objects.filter(id=instance.document_id).values_list(
+        'project_id', 'company_id', 'contractor_id'
+    ).first()
+    if not document:
+        invalidate(['documents'])
+        return
+    project_id, company_id, contractor_id = document
+    invalidate(
+        ['documents'],
+        *project_tenants(project_id),
+        company_id and f"company:{company_id}",
+        contractor_id and f"contractor:{contractor_id}"
+    )
@@ -2,28 +2,38 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
-from django.db.models import Q
+from django.db import transaction
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Document, DocumentVersion
 from .serializers import DocumentSerializer, DocumentListSerializer, DocumentVersionSerializer
 from accounts.permissions import IsCompanyAdmin, IsContractorOrAdmin, IsDocumentController
+from utils.response_cache import CachedResponseMixin
+from utils.file_responses import serve_file
+from utils.pagination import OptionalKeysetPagination
+from search.filters import FullTextSearchFilter
+from blobs.models import Blob
+from blobs.tasks import enqueue_derivatives
+from blobs.views import request_upload, serve_derivative
 from utils.file_validators import (
-    validate_file_size, validate_mime_type, validate_image_file,
-    get_file_type_from_mime, is_image_file, MAX_ATTACHMENT_SIZE_MB,
-    ALLOWED_DOCUMENT_MIME_TYPES, ALLOWED_IMAGE_MIME_TYPES
+    inspect_upload, MAX_ATTACHMENT_SIZE_MB, ALLOWED_DOCUMENT_MIME_TYPES, ALLOWED_IMAGE_MIME_TYPES
 )
 import os
 
 
-class DocumentViewSet(viewsets.ModelViewSet):
+class DocumentViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """
     ViewSet for Document management.
     """
     queryset = Document.objects.all()
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend]
+    cache_namespace = 'documents'
+    cache_timeouts = {'list': 60, 'retrieve': 60}
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = ('-uploaded_at', '-id')
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_fields = ['project', 'status', 'side', 'contractor', 'company']
+    search_model = 'document'
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -31,17 +41,10 @@ class DocumentViewSet(viewsets.ModelViewSet):
         return DocumentSerializer
     
     def get_queryset(self):
-        user = self.request.user
-        if user.is_company_admin:
-            return Document.objects.filter(project__company=user.company)
-        elif user.is_contractor:
-            return Document.objects.filter(
-                Q(contractor=user.contractor) | Q(project__contractor=user.contractor)
-            )
-        else:
-            return Document.objects.filter(
-                Q(uploaded_by=user) | Q(project__tasks__assigned_to=user)
-            ).distinct()
+        queryset = Document.visible_to(self.request.user)
+        if self.action in ('download', 'download_version'):
+            return queryset
+        return self.get_serializer_class().setup_eager_loading(queryset)
     
     def get_permissions(self):
         if self.action in ['approve', 'reject', 'request_modification']:
@@ -50,7 +53,8 @@ class DocumentViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         user = self.request.user
-        file = self.request.FILES.get('file')
+        # A multipart file, or a finalized resumable upload
+        file, session = request_upload(self.request)
         
         if not file:
             raise ValidationError({"file": "No file provided."})
@@ -60,32 +64,31 @@ class DocumentViewSet(viewsets.ModelViewSet):
         if not project:
             raise ValidationError({"project": "Project is required."})
         
-        # Validate file size (documents use attachment limit)
-        validate_file_size(file, MAX_ATTACHMENT_SIZE_MB)
-        
-        # Validate MIME type (documents can be PDF, DOCX, images, etc.)
-        allowed_mime_types = ALLOWED_DOCUMENT_MIME_TYPES + ALLOWED_IMAGE_MIME_TYPES
-        validate_mime_type(file, allowed_mime_types)
-        
-        # If it's an image, validate it's a real image
-        if is_image_file(file):
-            validate_image_file(file)
-        
-        # Get file type from MIME
-        file_type = get_file_type_from_mime(file)
+        # Documents can be PDF, DOCX, images, etc. and use the attachment limit
+        info = inspect_upload(file, ALLOWED_DOCUMENT_MIME_TYPES + ALLOWED_IMAGE_MIME_TYPES, MAX_ATTACHMENT_SIZE_MB)
         
         # Determine side
         side = 'CONTRACTOR' if user.is_contractor else 'COMPANY'
         
+        # Identical files are stored once
+        blob = Blob.store(file, digest=info.sha256)
+        if session:
+            session.discard()
+        
         serializer.save(
             project=project,
+            file=blob.file.name,
+            blob=blob,
             uploaded_by=user,
-            file_name=file.name,
-            file_type=file_type,
+            file_name=info.name,
+            file_type=info.file_type,
             side=side,
             contractor=user.contractor if user.is_contractor else None,
             company=user.company if user.is_company_admin else None
         )
+        if info.is_image:
+            # Thumbnails and previews are rendered in the background
+            transaction.on_commit(lambda: enqueue_derivatives(blob.file.name))
     
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
@@ -130,7 +133,7 @@ class DocumentViewSet(viewsets.ModelViewSet):
     def upload_version(self, request, pk=None):
         """Upload a new version of the document."""
         document = self.get_object()
-        file = request.FILES.get('file')
+        file, session = request_upload(request)
         
         if not file:
             return Response(
@@ -138,24 +141,19 @@ class DocumentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Validate file size
-        validate_file_size(file, MAX_ATTACHMENT_SIZE_MB)
-        
-        # Validate MIME type
-        allowed_mime_types = ALLOWED_DOCUMENT_MIME_TYPES + ALLOWED_IMAGE_MIME_TYPES
-        validate_mime_type(file, allowed_mime_types)
-        
-        # If it's an image, validate it's a real image
-        if is_image_file(file):
-            validate_image_file(file)
+        info = inspect_upload(file, ALLOWED_DOCUMENT_MIME_TYPES + ALLOWED_IMAGE_MIME_TYPES, MAX_ATTACHMENT_SIZE_MB)
         
         # Get next version number
         last_version = document.versions.order_by('-version_number').first()
         version_number = (last_version.version_number + 1) if last_version else 1
         
+        blob = Blob.store(file, digest=info.sha256)
+        if session:
+            session.discard()
         version = DocumentVersion.objects.create(
             document=document,
-            file=file,
+            file=blob.file.name,
+            blob=blob,
             version_number=version_number,
             change_notes=request.data.get('change_notes', ''),
             uploaded_by=request.user
@@ -168,6 +166,29 @@ class DocumentViewSet(viewsets.ModelViewSet):
         serializer = DocumentVersionSerializer(version)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Download the document file, or with `variant` the thumbnail or preview of an image."""
+        document = self.get_object()
+        variant = request.query_params.get('variant')
+        if variant:
+            return serve_derivative(request, document.file, document.file_name, document.file_type, variant)
+        return serve_file(request, document.file, document.file_name)
+    
+    @action(detail=True, methods=['get'], url_path=r'versions/(?P<version_id>[0-9]+)/download')
+    def download_version(self, request, version_id, pk=None):
+        """Download a version of the document."""
+        document = self.get_object()
+        version = document.versions.filter(id=version_id).first()
+        if not version:
+            return Response(
+                {"error": "Version not found."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        base, extension = os.path.splitext(document.file_name)
+        extension = os.path.splitext(version.file.name)[1] or extension
+        return serve_file(request, version.file, f'{base} v{version.version_number}{extension}')
+    
     @action(detail=False, methods=['get'])
     def pending_review(self, request):
         """Get documents pending review."""
@@ -189,6 +210,7 @@ class DocumentViewSet(viewsets.ModelViewSet):
         else:
             documents = Document.objects.none()
         
+        documents = self.get_serializer_class().setup_eager_loading(documents)
         serializer = self.get_serializer(documents, many=True)
         return Response(serializer.data)
     
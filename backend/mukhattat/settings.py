@@ -58,15 +58,16 @@ if DEBUG:
     'subscriptions',
     'reports',
     'audit',
+    'blobs',
+    'sync',
+    'search',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.cache.UpdateCacheMiddleware',  # Cache middleware
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.cache.FetchFromCacheMiddleware',  # Cache middleware
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -161,6 +162,12 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Hash uploads while they are received, for the content-addressed blobs
+FILE_UPLOAD_HANDLERS = [
+    'blobs.uploadhandlers.HashingMemoryFileUploadHandler',
+    'blobs.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -217,6 +224,20 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'collect-unreferenced-blobs': {
+        'task': 'blobs.tasks.collect_unreferenced_blobs',
+        'schedule': timedelta(hours=6),
+    },
+    'collect-orphaned-media': {
+        'task': 'blobs.tasks.collect_orphaned_media',
+        'schedule': timedelta(days=1),
+    },
+    'prune-sync-tombstones': {
+        'task': 'sync.tasks.prune_tombstones',
+        'schedule': timedelta(days=1),
+    },
+}
 
 # Email Configuration
 EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
@@ -240,6 +261,36 @@ if USE_S3:
 # Document Review Timer (in days)
 DOCUMENT_REVIEW_TIMER_DAYS = env.int('DOCUMENT_REVIEW_TIMER_DAYS', default=10)
 
+# Blueprint tile pyramid image format ('webp' or 'jpeg')
+BLUEPRINT_TILE_FORMAT = env('BLUEPRINT_TILE_FORMAT', default='webp')
+
+# Hours an unreferenced upload blob is kept before it is deleted
+BLOB_GC_GRACE_HOURS = env.int('BLOB_GC_GRACE_HOURS', default=24)
+
+# Stored files no model references are removed once older than this;
+# with ORPHAN_MEDIA_QUARANTINE they are moved under quarantine/ instead
+ORPHAN_MEDIA_GRACE_HOURS = env.int('ORPHAN_MEDIA_GRACE_HOURS', default=24)
+ORPHAN_MEDIA_QUARANTINE = env.bool('ORPHAN_MEDIA_QUARANTINE', default=False)
+
+# Resumable uploads: where their parts are assembled, and how long an unfinished one is kept
+UPLOAD_SESSION_ROOT = env('UPLOAD_SESSION_ROOT', default=os.path.join(BASE_DIR, 'upload_sessions'))
+UPLOAD_SESSION_HOURS = env.int('UPLOAD_SESSION_HOURS', default=24)
+
+# Download endpoints hand the file transfer to the front proxy: 'accel' (nginx
+# X-Accel-Redirect to an internal location serving MEDIA_ROOT under
+# FILE_DOWNLOAD_ACCEL_PREFIX) or 'sendfile' (X-Sendfile); empty sends files from Django
+FILE_DOWNLOAD_OFFLOAD = env('FILE_DOWNLOAD_OFFLOAD', default='')
+FILE_DOWNLOAD_ACCEL_PREFIX = env('FILE_DOWNLOAD_ACCEL_PREFIX', default='/protected-media/')
+
+# Offline sync (/api/sync/): changes per response, and days tombstones of
+# deleted objects are kept; clients with older tokens sync from scratch.
+# Changes logged within SYNC_OVERLAP_SECONDS before a token are read again,
+# as their transaction may have committed after it; keep it above the
+# longest request or task writing to the change log
+SYNC_BATCH_SIZE = env.int('SYNC_BATCH_SIZE', default=500)
+SYNC_TOMBSTONE_DAYS = env.int('SYNC_TOMBSTONE_DAYS', default=30)
+SYNC_OVERLAP_SECONDS = env.int('SYNC_OVERLAP_SECONDS', default=300)
+
 # Channels Configuration (for WebSocket)
 CHANNEL_LAYERS = {
     'default': {
@@ -267,11 +318,6 @@ CACHES = {
     }
 }
 
-# Cache settings
-CACHE_MIDDLEWARE_ALIAS = 'default'
-CACHE_MIDDLEWARE_SECONDS = 300  # 5 minutes
-CACHE_MIDDLEWARE_KEY_PREFIX = 'mukhattat'
-
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -21,6 +21,9 @@ urlpatterns = [
     path('api/notifications/', include('notifications.urls')),
     path('api/subscriptions/', include('subscriptions.urls')),
     path('api/reports/', include('reports.urls')),
+    path('api/uploads/', include('blobs.urls')),
+    path('api/sync/', include('sync.urls')),
+    path('api/search/', include('search.urls')),
     
     # API Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
@@ -57,6 +57,8 @@ class Notification(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'is_read']),
+            # Keyset pages of a user's notifications
+            models.Index(fields=['user', '-created_at', '-id']),
         ]
     
     def __str__(self):
@@ -42,7 +42,7 @@ def company_created_or_updated(sender, instance, created, **kwargs):
             f'A new company "{instance.name}" has been registered in the system.',
             instance
         )
-    elif 'is_active' in kwargs.get('update_fields', []):
+    elif 'is_active' in (kwargs.get('update_fields') or []):
         if instance.is_active:
             notify_super_admins(
                 'COMPANY_ACTIVATED',
@@ -74,7 +74,7 @@ def user_created_or_updated(sender, instance, created, **kwargs):
             f'A new user "{instance.username}" ({instance.get_role_display()}) has been created.',
             instance
         )
-    elif 'role' in kwargs.get('update_fields', []) and not instance.is_superuser:
+    elif 'role' in (kwargs.get('update_fields') or []) and not instance.is_superuser:
         notify_super_admins(
             'USER_ROLE_CHANGED',
             f'User Role Changed: {instance.username}',
@@ -156,7 +156,7 @@ def task_created_for_super_admin(sender, instance, created, **kwargs):
             f'A new task "{instance.title}" has been created in project "{instance.project.name if instance.project else "Unknown"}".',
             instance
         )
-    elif 'status' in kwargs.get('update_fields', []):
+    elif 'status' in (kwargs.get('update_fields') or []):
         notify_super_admins(
             'TASK_STATUS_CHANGED',
             f'Task Status Changed: {instance.title}',
@@ -180,7 +180,7 @@ def document_created_for_super_admin(sender, instance, created, **kwargs):
             f'A new document "{instance.title}" has been uploaded for project "{instance.project.name if instance.project else "Unknown"}".',
             instance
         )
-    elif 'status' in kwargs.get('update_fields', []):
+    elif 'status' in (kwargs.get('update_fields') or []):
         notify_super_admins(
             'DOCUMENT_STATUS_CHANGED',
             f'Document Status Changed: {instance.title}',
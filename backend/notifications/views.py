@@ -1,9 +1,12 @@
+from django.db import transaction
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import Notification, EmailNotification
 from .serializers import NotificationSerializer, EmailNotificationSerializer
+from sync.changes import record_changes
+from utils.pagination import OptionalKeysetPagination
 
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
@@ -13,6 +16,7 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
     
     def get_queryset(self):
         queryset = Notification.objects.filter(user=self.request.user)
@@ -36,7 +40,13 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
         """Mark all notifications as read."""
-        Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        with transaction.atomic():
+            unread = list(
+                Notification.objects.filter(user=request.user, is_read=False).values_list('id', flat=True)
+            )
+            Notification.objects.filter(id__in=unread).update(is_read=True)
+            # update() sends no post_save
+            record_changes('notification', [(notification_id, None, request.user.id) for notification_id in unread])
         return Response({"message": "All notifications marked as read."})
     
     @action(detail=False, methods=['get'])
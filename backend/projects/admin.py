@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Project, Blueprint, Pin
+from .models import Project, ProjectProgress, Blueprint, Pin
 
 
 @admin.register(Project)
@@ -20,3 +20,9 @@ class PinAdmin(admin.ModelAdmin):
     list_display = ['blueprint', 'x', 'y', 'label', 'created_at']
     list_filter = ['blueprint']
 
+
+
+@admin.register(ProjectProgress)
+class ProjectProgressAdmin(admin.ModelAdmin):
+    list_display = ['project', 'total_tasks', 'completed_tasks', 'last_task_change_at']
+    readonly_fields = ['last_task_change_at', 'updated_at']
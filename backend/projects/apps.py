@@ -4,4 +4,6 @@ from django.apps import AppConfig
 class ProjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'projects'
-
+    
+    def ready(self):
+        import projects.signals  # noqa
@@ -0,0 +1,75 @@
+"""
+Side effects of tasks created in bulk.
+
+bulk_create() sends no model signals, so the notifications, cache
+invalidation, sync change log and search index entries the Task receivers
+would do one row at a time are done here once per batch.
+"""
+from search.models import SearchEntry
+from sync.changes import record_changes
+from utils.cache_versions import invalidate, project_tenants, department_tenants
+
+
+def notify_bulk_tasks(project, tasks):
+    """
+    Notify the assignees of each task and the super admins of the batch,
+    with one insert for all notifications.
+    """
+    from django.contrib.contenttypes.models import ContentType
+    from accounts.models import User
+    from notifications.models import Notification
+    from tasks.models import Task
+
+    task_type = ContentType.objects.get_for_model(Task)
+    notifications = [
+        Notification(
+            user_id=task.assigned_to_id,
+            notification_type='TASK_ASSIGNED',
+            title=f'New Task Assigned: {task.title}',
+            message=f'You have been assigned a new task: {task.title}',
+            content_type=task_type,
+            object_id=task.id
+        )
+        for task in tasks if task.assigned_to_id
+    ]
+
+    # One summary per super admin instead of one notification per task
+    project_type = ContentType.objects.get_for_model(project)
+    notifications += [
+        Notification(
+            user_id=admin_id,
+            notification_type='NEW_TASK',
+            title=f'{len(tasks)} New Tasks Created: {project.name}',
+            message=f'{len(tasks)} tasks have been created from blueprint locations in project "{project.name}".',
+            content_type=project_type,
+            object_id=project.id
+        )
+        for admin_id in User.objects.filter(is_superuser=True).values_list('id', flat=True)
+    ]
+    notifications = Notification.objects.bulk_create(notifications)
+    record_changes('notification', [(n.id, None, n.user_id) for n in notifications])
+
+
+def log_bulk_tasks(project, tasks):
+    """Log the new tasks and their pins for offline sync."""
+    record_changes('task', [(task.id, project.id, task.assigned_to_id) for task in tasks])
+    record_changes('pin', [(task.pin_id, project.id, task.assigned_to_id) for task in tasks])
+
+
+def index_bulk_tasks(tasks):
+    """Add the new tasks to the search index."""
+    SearchEntry.index('task', [(task.id, task.title, task.description) for task in tasks])
+
+
+def invalidate_bulk_tasks(project, tasks):
+    """Invalidate the cached responses the new pins and tasks appear in."""
+    from reports.cache import invalidate_reports
+
+    tenants = project_tenants(project.id)
+    invalidate(['tasks', 'projects'], *tenants)
+    # Document visibility of assignees follows their tasks
+    invalidate(['documents'])
+
+    for department_id in {task.department_id for task in tasks if task.department_id}:
+        tenants += department_tenants(department_id)
+    invalidate_reports(*tenants)
@@ -0,0 +1,32 @@
+"""
+Django management command to backfill or rebuild the pin cluster aggregates.
+Run with: python manage.py rebuild_pin_clusters [--blueprint ID ...]
+"""
+from django.core.management.base import BaseCommand
+from projects.models import Blueprint, PinCluster
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the pre-aggregated pin clusters of every zoom level from the pins and tasks tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--blueprint',
+            type=int,
+            action='append',
+            dest='blueprints',
+            help='Only rebuild the given blueprint id (can be repeated)'
+        )
+
+    def handle(self, *args, **options):
+        blueprints = Blueprint.objects.filter(pins__isnull=False).distinct().order_by('pk')
+        if options['blueprints']:
+            blueprints = Blueprint.objects.filter(pk__in=options['blueprints']).order_by('pk')
+
+        written = 0
+        count = 0
+        for blueprint_id in blueprints.values_list('pk', flat=True).iterator():
+            written += PinCluster.rebuild(blueprint_id)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} cluster(s) of {count} blueprint(s).'))
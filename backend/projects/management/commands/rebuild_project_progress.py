@@ -0,0 +1,53 @@
+"""
+Django management command to backfill or rebuild project progress rollups.
+Run with: python manage.py rebuild_project_progress [--company ID] [--project ID ...]
+"""
+from django.core.management.base import BaseCommand
+from projects.models import Project, ProjectProgress
+from utils.cache_versions import invalidate_all_tenants
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the pre-aggregated project progress rollup from the tasks table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--project',
+            type=int,
+            action='append',
+            dest='projects',
+            help='Only rebuild the given project id (can be repeated)'
+        )
+        parser.add_argument(
+            '--company',
+            type=int,
+            help='Only rebuild projects of the given company id'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of projects aggregated per query (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        projects = Project.objects.order_by('pk')
+        if options['projects']:
+            projects = projects.filter(pk__in=options['projects'])
+        if options['company']:
+            projects = projects.filter(company_id=options['company'])
+
+        batch_size = max(1, options['batch_size'])
+        batch = []
+        written = 0
+        for project_id in projects.values_list('pk', flat=True).iterator(chunk_size=batch_size):
+            batch.append(project_id)
+            if len(batch) >= batch_size:
+                written += ProjectProgress.rebuild(batch)
+                batch = []
+        written += ProjectProgress.rebuild(batch)
+
+        # Rollups are written in bulk, without model signals
+        invalidate_all_tenants(['projects', 'reports'])
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt progress for {written} project(s).'))
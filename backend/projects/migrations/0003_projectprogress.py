@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_blueprint_review_deadline_blueprint_review_notes_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectProgress',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='progress', serialize=False, to='projects.project')),
+                ('total_tasks', models.PositiveIntegerField(default=0)),
+                ('pending_tasks', models.PositiveIntegerField(default=0)),
+                ('in_progress_tasks', models.PositiveIntegerField(default=0)),
+                ('completed_tasks', models.PositiveIntegerField(default=0)),
+                ('delayed_tasks', models.PositiveIntegerField(default=0)),
+                ('estimated_hours', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('actual_hours', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('estimated_task_count', models.PositiveIntegerField(default=0, help_text='Tasks with an estimate (used for averages)')),
+                ('actual_task_count', models.PositiveIntegerField(default=0, help_text='Tasks with logged actual hours (used for averages)')),
+                ('last_task_change_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Project progress',
+                'db_table': 'project_progress',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_projectprogress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blueprint',
+            name='tile_format',
+            field=models.CharField(blank=True, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='blueprint',
+            name='tile_levels',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='blueprint',
+            name='tile_status',
+            field=models.CharField(choices=[('NONE', 'Not Tiled'), ('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('READY', 'Ready'), ('FAILED', 'Failed')], default='NONE', max_length=15),
+        ),
+        migrations.AddField(
+            model_name='blueprint',
+            name='tile_version',
+            field=models.CharField(blank=True, help_text='Token of the current tile pyramid, part of its tile URLs', max_length=32),
+        ),
+    ]
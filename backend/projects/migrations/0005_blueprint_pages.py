@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_blueprint_tiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blueprint',
+            name='page_count',
+            field=models.PositiveIntegerField(blank=True, help_text='Pages of a PDF blueprint', null=True),
+        ),
+        migrations.CreateModel(
+            name='BlueprintPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(help_text='Page number, from 1')),
+                ('width', models.FloatField(help_text='Page width in PDF points')),
+                ('height', models.FloatField(help_text='Page height in PDF points')),
+                ('thumbnail_image', models.ImageField(upload_to='blueprints/pages/')),
+                ('screen_image', models.ImageField(upload_to='blueprints/pages/')),
+                ('print_image', models.ImageField(upload_to='blueprints/pages/')),
+                ('blueprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='projects.blueprint')),
+            ],
+            options={
+                'db_table': 'blueprint_pages',
+                'ordering': ['number'],
+                'unique_together': {('blueprint', 'number')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:40
+
+from django.db import migrations, models
+
+
+def fill_cells(apps, schema_editor):
+    from projects.spatial import cell_for
+    Pin = apps.get_model('projects', 'Pin')
+    batch = []
+    for pin in Pin.objects.only('id', 'x', 'y').iterator(chunk_size=2000):
+        pin.cell = cell_for(pin.x, pin.y)
+        batch.append(pin)
+        if len(batch) >= 2000:
+            Pin.objects.bulk_update(batch, ['cell'])
+            batch = []
+    Pin.objects.bulk_update(batch, ['cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_blueprint_pages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pin',
+            name='cell',
+            field=models.BigIntegerField(default=0, help_text='Quadtree cell of (x, y), kept in sync on save (see projects/spatial.py)'),
+        ),
+        migrations.AddIndex(
+            model_name='pin',
+            index=models.Index(fields=['blueprint', 'cell'], name='pins_bluepri_b5216d_idx'),
+        ),
+        migrations.RunPython(fill_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_pin_cell'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PinCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.PositiveSmallIntegerField()),
+                ('cell', models.BigIntegerField(help_text='Quadtree cell at this level')),
+                ('pin_count', models.IntegerField(default=0)),
+                ('sum_x', models.FloatField(default=0)),
+                ('sum_y', models.FloatField(default=0)),
+                ('task_count', models.IntegerField(default=0)),
+                ('pending_tasks', models.IntegerField(default=0)),
+                ('in_progress_tasks', models.IntegerField(default=0)),
+                ('completed_tasks', models.IntegerField(default=0)),
+                ('delayed_tasks', models.IntegerField(default=0)),
+                ('low_priority_tasks', models.IntegerField(default=0)),
+                ('medium_priority_tasks', models.IntegerField(default=0)),
+                ('high_priority_tasks', models.IntegerField(default=0)),
+                ('urgent_tasks', models.IntegerField(default=0)),
+                ('blueprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='clusters', to='projects.blueprint')),
+            ],
+            options={
+                'db_table': 'pin_clusters',
+                'unique_together': {('blueprint', 'level', 'cell')},
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blobs', '0001_initial'),
+        ('projects', '0007_pin_clusters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blueprint',
+            name='blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='blobs.blob'),
+        ),
+    ]
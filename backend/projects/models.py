@@ -1,6 +1,7 @@
 from django.db import models
 from django.core.validators import FileExtensionValidator
 from accounts.models import Company, Contractor
+from blobs.models import BlobReference
 
 
 class Project(models.Model):
@@ -58,9 +59,37 @@ class Project(models.Model):
     
     def __str__(self):
         return f"{self.name} ({self.company.name})"
+    
+    @classmethod
+    def visible_to(cls, user):
+        """
+        Projects a user can see: their company's (admins and project
+        managers), their contractor's, or, for workers, those they have tasks in.
+        """
+        if user.is_company_admin or user.is_project_manager:
+            return cls.objects.filter(company=user.company)
+        if user.is_contractor:
+            return cls.objects.filter(contractor=user.contractor)
+        if user.is_worker:
+            from tasks.models import Task
+            return cls.objects.filter(id__in=Task.objects.filter(assigned_to=user).values('project_id'))
+        return cls.objects.none()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored company and contractor so signal receivers can follow moves
+        instance._loaded_company_id = instance.__dict__.get('company_id')
+        instance._loaded_contractor_id = instance.__dict__.get('contractor_id')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_company_id = self.company_id
+        self._loaded_contractor_id = self.contractor_id
 
 
-class Blueprint(models.Model):
+class Blueprint(BlobReference):
     """
     Blueprint model for project blueprints (PDF/JPG/PNG).
     """
@@ -72,6 +101,14 @@ class Blueprint(models.Model):
         ('EXPIRED', 'Review Expired'),
     ]
     
+    TILE_STATUS_CHOICES = [
+        ('NONE', 'Not Tiled'),
+        ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing'),
+        ('READY', 'Ready'),
+        ('FAILED', 'Failed'),
+    ]
+    
     project = models.OneToOneField(
         Project,
         on_delete=models.CASCADE,
@@ -108,6 +145,16 @@ class Blueprint(models.Model):
         related_name='uploaded_blueprints'
     )
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Deep-zoom tile pyramid, built in the background (see projects/tiles.py)
+    tile_status = models.CharField(max_length=15, choices=TILE_STATUS_CHOICES, default='NONE')
+    tile_version = models.CharField(
+        max_length=32,
+        blank=True,
+        help_text="Token of the current tile pyramid, part of its tile URLs"
+    )
+    tile_format = models.CharField(max_length=10, blank=True)
+    tile_levels = models.PositiveIntegerField(default=0)
+    page_count = models.PositiveIntegerField(null=True, blank=True, help_text="Pages of a PDF blueprint")
     
     class Meta:
         db_table = 'blueprints'
@@ -131,6 +178,31 @@ class Blueprint(models.Model):
         return None
 
 
+class BlueprintPage(models.Model):
+    """
+    Raster renditions of one page of a PDF blueprint (see projects/rasterize.py).
+    """
+    blueprint = models.ForeignKey(
+        Blueprint,
+        on_delete=models.CASCADE,
+        related_name='pages'
+    )
+    number = models.PositiveIntegerField(help_text="Page number, from 1")
+    width = models.FloatField(help_text="Page width in PDF points")
+    height = models.FloatField(help_text="Page height in PDF points")
+    thumbnail_image = models.ImageField(upload_to='blueprints/pages/')
+    screen_image = models.ImageField(upload_to='blueprints/pages/')
+    print_image = models.ImageField(upload_to='blueprints/pages/')
+    
+    class Meta:
+        db_table = 'blueprint_pages'
+        ordering = ['number']
+        unique_together = ['blueprint', 'number']
+    
+    def __str__(self):
+        return f"Page {self.number} of {self.blueprint}"
+
+
 class Pin(models.Model):
     """
     Pin model representing a task location on the blueprint.
@@ -142,13 +214,387 @@ class Pin(models.Model):
     )
     x = models.FloatField(help_text="X coordinate (0-1 normalized)")
     y = models.FloatField(help_text="Y coordinate (0-1 normalized)")
+    cell = models.BigIntegerField(
+        default=0,
+        help_text="Quadtree cell of (x, y), kept in sync on save (see projects/spatial.py)"
+    )
     label = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         db_table = 'pins'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['blueprint', 'cell']),
+        ]
     
     def __str__(self):
         return f"Pin ({self.x}, {self.y}) - {self.label or 'No label'}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored position so cluster receivers can follow moves
+        instance._loaded_position = instance.position()
+        return instance
+    
+    def position(self):
+        return (self.__dict__.get('blueprint_id'), self.__dict__.get('cell'),
+                self.__dict__.get('x'), self.__dict__.get('y'))
+    
+    def save(self, *args, **kwargs):
+        from .spatial import cell_for
+        self.cell = cell_for(self.x, self.y)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'x', 'y'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'cell'}
+        super().save(*args, **kwargs)
+        # post_save receivers have seen the move; the new position is now the stored one
+        self._loaded_position = self.position()
+
+
+
+class ProjectProgress(models.Model):
+    """
+    Pre-aggregated task rollup for a project.
+    Kept up to date from Task save/delete signals so progress can be read
+    with a single lookup instead of counting tasks on every request.
+    """
+    project = models.OneToOneField(
+        Project,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='progress'
+    )
+    total_tasks = models.PositiveIntegerField(default=0)
+    pending_tasks = models.PositiveIntegerField(default=0)
+    in_progress_tasks = models.PositiveIntegerField(default=0)
+    completed_tasks = models.PositiveIntegerField(default=0)
+    delayed_tasks = models.PositiveIntegerField(default=0)
+    estimated_hours = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    actual_hours = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    estimated_task_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Tasks with an estimate (used for averages)"
+    )
+    actual_task_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Tasks with logged actual hours (used for averages)"
+    )
+    last_task_change_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'project_progress'
+        verbose_name_plural = 'Project progress'
+    
+    def __str__(self):
+        return f"Progress for project #{self.project_id}: {self.progress_percentage}%"
+    
+    @property
+    def progress_percentage(self):
+        if self.total_tasks == 0:
+            return 0
+        return round((self.completed_tasks / self.total_tasks) * 100, 2)
+    
+    @property
+    def avg_estimated_hours(self):
+        if self.estimated_task_count == 0:
+            return 0
+        return self.estimated_hours / self.estimated_task_count
+    
+    @property
+    def avg_actual_hours(self):
+        if self.actual_task_count == 0:
+            return 0
+        return self.actual_hours / self.actual_task_count
+    
+    @staticmethod
+    def aggregates():
+        """Aggregate expressions used to (re)build a rollup from the tasks table."""
+        from django.db.models import Count, Sum, Q
+        # The counts must come before the sums they share a column name with
+        return {
+            'total_tasks': Count('id'),
+            'pending_tasks': Count('id', filter=Q(status='PENDING')),
+            'in_progress_tasks': Count('id', filter=Q(status='IN_PROGRESS')),
+            'completed_tasks': Count('id', filter=Q(status='COMPLETED')),
+            'delayed_tasks': Count('id', filter=Q(status='DELAYED')),
+            'estimated_task_count': Count('estimated_hours'),
+            'actual_task_count': Count('actual_hours'),
+            'estimated_hours': Sum('estimated_hours'),
+            'actual_hours': Sum('actual_hours'),
+        }
+    
+    @classmethod
+    def _values(cls, totals):
+        return {name: totals.get(name) or 0 for name in cls.aggregates()}
+    
+    @classmethod
+    def recalculate(cls, project_id, create=True):
+        """
+        Recompute the rollup of a single project with one aggregate query.
+        
+        Args:
+            project_id: Project primary key
+            create: Create the rollup row if it does not exist yet. Disabled
+                from delete handlers so a project being deleted is not revived.
+        
+        Returns:
+            ProjectProgress: The row if it was created, None if an existing
+                one was updated (or none exists and create is False)
+        """
+        from django.utils import timezone
+        from django.db.models import Max
+        from tasks.models import Task
+        
+        totals = Task.objects.filter(project_id=project_id).aggregate(
+            last_change=Max('updated_at'), **cls.aggregates()
+        )
+        values = cls._values(totals)
+        values['last_task_change_at'] = totals['last_change']
+        
+        updated = cls.objects.filter(project_id=project_id).update(
+            updated_at=timezone.now(), **values
+        )
+        if not updated and create:
+            progress, _ = cls.objects.update_or_create(project_id=project_id, defaults=values)
+            return progress
+        return None
+    
+    @classmethod
+    def rebuild(cls, project_ids):
+        """
+        Rebuild rollups for a batch of projects with one grouped query.
+        
+        Args:
+            project_ids: Iterable of project primary keys
+            
+        Returns:
+            int: Number of rollup rows written
+        """
+        from django.utils import timezone
+        from django.db.models import Max
+        from tasks.models import Task
+        
+        project_ids = list(project_ids)
+        if not project_ids:
+            return 0
+        
+        rows = (
+            Task.objects.filter(project_id__in=project_ids)
+            .order_by()
+            .values('project_id')
+            .annotate(last_change=Max('updated_at'), **cls.aggregates())
+        )
+        stats = {row['project_id']: row for row in rows}
+        
+        now = timezone.now()
+        objs = []
+        for project_id in project_ids:
+            row = stats.get(project_id, {})
+            objs.append(cls(
+                project_id=project_id,
+                last_task_change_at=row.get('last_change'),
+                updated_at=now,
+                **cls._values(row)
+            ))
+        
+        update_fields = list(cls.aggregates()) + ['last_task_change_at', 'updated_at']
+        cls.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=['project'],
+            update_fields=update_fields,
+        )
+        return len(objs)
+    
+    @classmethod
+    def for_project(cls, project):
+        """
+        Return the rollup for a project, building it on first access.
+        Uses the cached relation when the queryset was select_related('progress').
+        """
+        try:
+            return project.progress
+        except cls.DoesNotExist:
+            # A concurrent request may have created the row in the meantime,
+            # in which case it was updated rather than created
+            return cls.recalculate(project.pk) or cls.objects.get(project_id=project.pk)
 
+
+class PinCluster(models.Model):
+    """
+    Pre-aggregated pins and tasks of one quadtree cell of a blueprint, for
+    every level up to MAX_LEVEL (see projects/spatial.py).
+    Kept up to date from Pin and Task signals with in-place increments, so
+    a zoomed-out overview is read with one query whatever the pin count.
+    """
+    MAX_LEVEL = 8
+    
+    STATUS_FIELDS = {
+        'PENDING': 'pending_tasks',
+        'IN_PROGRESS': 'in_progress_tasks',
+        'COMPLETED': 'completed_tasks',
+        'DELAYED': 'delayed_tasks',
+    }
+    # Highest priority first, so it wins ties for the dominant priority
+    PRIORITY_FIELDS = {
+        'URGENT': 'urgent_tasks',
+        'HIGH': 'high_priority_tasks',
+        'MEDIUM': 'medium_priority_tasks',
+        'LOW': 'low_priority_tasks',
+    }
+    
+    blueprint = models.ForeignKey(
+        Blueprint,
+        on_delete=models.CASCADE,
+        related_name='clusters'
+    )
+    level = models.PositiveSmallIntegerField()
+    cell = models.BigIntegerField(help_text="Quadtree cell at this level")
+    pin_count = models.IntegerField(default=0)
+    # Coordinate sums give the centroid without reading the pins
+    sum_x = models.FloatField(default=0)
+    sum_y = models.FloatField(default=0)
+    task_count = models.IntegerField(default=0)
+    pending_tasks = models.IntegerField(default=0)
+    in_progress_tasks = models.IntegerField(default=0)
+    completed_tasks = models.IntegerField(default=0)
+    delayed_tasks = models.IntegerField(default=0)
+    low_priority_tasks = models.IntegerField(default=0)
+    medium_priority_tasks = models.IntegerField(default=0)
+    high_priority_tasks = models.IntegerField(default=0)
+    urgent_tasks = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'pin_clusters'
+        unique_together = ['blueprint', 'level', 'cell']
+    
+    def __str__(self):
+        return f"Cluster {self.level}/{self.cell} of blueprint #{self.blueprint_id}: {self.pin_count} pins"
+    
+    @property
+    def center(self):
+        if self.pin_count <= 0:
+            return None, None
+        return self.sum_x / self.pin_count, self.sum_y / self.pin_count
+    
+    @property
+    def dominant_priority(self):
+        counts = {priority: getattr(self, field) for priority, field in self.PRIORITY_FIELDS.items()}
+        priority = max(counts, key=counts.get)
+        return priority if counts[priority] > 0 else None
+    
+    @classmethod
+    def task_aggregates(cls):
+        """Aggregate expressions of the task counters, for a queryset of tasks."""
+        from django.db.models import Count, Q
+        aggregates = {'task_count': Count('id')}
+        for status, field in cls.STATUS_FIELDS.items():
+            aggregates[field] = Count('id', filter=Q(status=status))
+        for priority, field in cls.PRIORITY_FIELDS.items():
+            aggregates[field] = Count('id', filter=Q(priority=priority))
+        return aggregates
+    
+    @classmethod
+    def task_delta(cls, status, priority, sign=1):
+        """Counter changes for one task with the given status and priority."""
+        delta = {'task_count': sign}
+        if status in cls.STATUS_FIELDS:
+            delta[cls.STATUS_FIELDS[status]] = sign
+        if priority in cls.PRIORITY_FIELDS:
+            delta[cls.PRIORITY_FIELDS[priority]] = sign
+        return delta
+    
+    @classmethod
+    def pin_delta(cls, pin_id, x, y, sign=1):
+        """Counter changes for a pin and its tasks, with one aggregate query."""
+        from tasks.models import Task
+        
+        delta = {'pin_count': sign, 'sum_x': sign * x, 'sum_y': sign * y}
+        totals = Task.objects.filter(pin_id=pin_id).aggregate(**cls.task_aggregates())
+        for field, value in totals.items():
+            if value:
+                delta[field] = sign * value
+        return delta
+    
+    @classmethod
+    def apply_task(cls, pin_id, status, priority, sign=1):
+        """Count a task in (or, with sign=-1, out of) the clusters of its pin."""
+        if not pin_id:
+            return
+        pin = Pin.objects.filter(id=pin_id).values('blueprint_id', 'cell').first()
+        if pin:
+            cls.apply(pin['blueprint_id'], pin['cell'], cls.task_delta(status, priority, sign))
+    
+    @classmethod
+    def apply(cls, blueprint_id, cell, delta):
+        """
+        Add counter changes to the clusters containing a cell at every level.
+        
+        Args:
+            blueprint_id: Blueprint primary key
+            cell: Full-depth quadtree cell (Pin.cell)
+            delta: Mapping of counter field to the amount added
+        """
+        from django.db.models import F, Q
+        from .spatial import cell_divisor
+        
+        delta = {field: value for field, value in delta.items() if value}
+        if not delta:
+            return
+        keys = [(level, cell // cell_divisor(level)) for level in range(cls.MAX_LEVEL + 1)]
+        if delta.get('pin_count', 0) > 0:
+            cls.objects.bulk_create(
+                [cls(blueprint_id=blueprint_id, level=level, cell=key) for level, key in keys],
+                ignore_conflicts=True
+            )
+        
+        match = Q()
+        for level, key in keys:
+            match |= Q(level=level, cell=key)
+        clusters = cls.objects.filter(match, blueprint_id=blueprint_id)
+        clusters.update(**{field: F(field) + value for field, value in delta.items()})
+        if delta.get('pin_count', 0) < 0:
+            clusters.filter(pin_count__lte=0).delete()
+    
+    @classmethod
+    def rebuild(cls, blueprint_id):
+        """
+        Rebuild the clusters of a blueprint from its pins and tasks, with two
+        grouped queries per level.
+        
+        Returns:
+            int: Number of cluster rows written
+        """
+        from django.db.models import Count, Sum, F, Value, BigIntegerField, ExpressionWrapper
+        from tasks.models import Task
+        from .spatial import cell_divisor
+        
+        def group(queryset, cell_field, level):
+            divisor = Value(cell_divisor(level), output_field=BigIntegerField())
+            return queryset.order_by().annotate(
+                group=ExpressionWrapper(F(cell_field) / divisor, output_field=BigIntegerField())
+            ).values('group')
+        
+        pins = Pin.objects.filter(blueprint_id=blueprint_id)
+        tasks = Task.objects.filter(pin__blueprint_id=blueprint_id)
+        objs = []
+        for level in range(cls.MAX_LEVEL + 1):
+            task_rows = {
+                row.pop('group'): row
+                for row in group(tasks, 'pin__cell', level).annotate(**cls.task_aggregates())
+            }
+            for row in group(pins, 'cell', level).annotate(
+                pin_count=Count('id'), sum_x=Sum('x'), sum_y=Sum('y')
+            ):
+                key = row.pop('group')
+                objs.append(cls(
+                    blueprint_id=blueprint_id, level=level, cell=key,
+                    **row, **task_rows.get(key, {})
+                ))
+        
+        cls.objects.filter(blueprint_id=blueprint_id).delete()
+        cls.objects.bulk_create(objs)
+        return len(objs)
@@ -0,0 +1,82 @@
+"""
+Rasterization of PDF blueprints.
+
+Each page is rendered once at print resolution and downscaled into the
+other renditions, so a plan can be shown (and tiled, see projects/tiles.py)
+without the client downloading and rendering the PDF.
+"""
+import io
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+# Points per inch in PDF page sizes
+PDF_POINTS_PER_INCH = 72
+
+PRINT_DPI = 150
+# Longest side of each rendition in pixels; an A0 sheet at PRINT_DPI is ~7000px
+RENDITION_SIZES = {
+    'print': 8192,
+    'screen': 2048,
+    'thumbnail': 256,
+}
+
+
+class RasterizationUnavailable(Exception):
+    """Raised when no PDF renderer is installed."""
+
+
+def page_scale(width, height):
+    """Render scale (pixels per point) of the print rendition of a page."""
+    scale = PRINT_DPI / PDF_POINTS_PER_INCH
+    return min(scale, RENDITION_SIZES['print'] / max(width, height))
+
+
+def render_pages(data):
+    """
+    Render every page of a PDF.
+
+    Args:
+        data: PDF file contents
+
+    Yields:
+        tuple: (page number from 1, width and height in points, print-size PIL image)
+    """
+    if pdfium is None:
+        raise RasterizationUnavailable("pypdfium2 is required to rasterize PDF blueprints.")
+
+    pdf = pdfium.PdfDocument(data)
+    try:
+        for index in range(len(pdf)):
+            page = pdf[index]
+            width, height = page.get_size()
+            image = page.render(scale=page_scale(width, height)).to_pil()
+            page.close()
+            yield index + 1, width, height, image
+    finally:
+        pdf.close()
+
+
+def save_renditions(image, prefix, number):
+    """
+    Store the renditions of a rendered page as PNG files under a prefix.
+
+    Returns:
+        dict: Storage name of each rendition
+    """
+    names = {}
+    for rendition, size in RENDITION_SIZES.items():
+        if max(image.size) > size:
+            image = image.copy()
+            image.thumbnail((size, size), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, 'PNG', optimize=True)
+        names[rendition] = default_storage.save(
+            f'{prefix}/pages/{number}-{rendition}.png', ContentFile(output.getvalue())
+        )
+    return names
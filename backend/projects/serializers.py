@@ -1,8 +1,13 @@
+from django.db.models import Count, Prefetch
 from rest_framework import serializers
-from .models import Project, Blueprint, Pin
+from .models import Project, ProjectProgress, Blueprint, BlueprintPage, Pin
 from accounts.serializers import CompanySerializer, ContractorSerializer
 
 
+# Tasks embedded in each serialized pin
+PIN_TASK_PREVIEW_SIZE = 5
+
+
 class PinSerializer(serializers.ModelSerializer):
     task_count = serializers.SerializerMethodField()
     tasks = serializers.SerializerMethodField()
@@ -12,36 +17,84 @@ class PinSerializer(serializers.ModelSerializer):
         fields = ['id', 'blueprint', 'x', 'y', 'label', 'task_count', 'tasks', 'created_at']
         read_only_fields = ['id', 'created_at']
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Annotate task counts and prefetch the first tasks of every pin, so a
+        list of pins is serialized with a fixed number of queries.
+        """
+        from tasks.models import Task
+        preview = Task.objects.select_related('project', 'department', 'assigned_to')
+        return queryset.annotate(task_count=Count('tasks')).prefetch_related(
+            # Sliced prefetches are limited per pin with a window function
+            Prefetch('tasks', queryset=preview[:PIN_TASK_PREVIEW_SIZE], to_attr='preview_tasks')
+        )
+    
     def get_task_count(self, obj):
+        if hasattr(obj, 'task_count'):
+            return obj.task_count
         return obj.tasks.count()
     
     def get_tasks(self, obj):
         from tasks.serializers import TaskListSerializer
-        tasks = obj.tasks.all()[:5]  # Limit to 5 tasks to avoid large payloads
+        tasks = getattr(obj, 'preview_tasks', None)
+        if tasks is None:
+            tasks = obj.tasks.all()[:PIN_TASK_PREVIEW_SIZE]  # Limit tasks to avoid large payloads
         return TaskListSerializer(tasks, many=True).data
 
 
+class BlueprintPageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BlueprintPage
+        fields = ['number', 'width', 'height', 'thumbnail_image', 'screen_image', 'print_image']
+        read_only_fields = fields
+
+
 class BlueprintSerializer(serializers.ModelSerializer):
     pins = PinSerializer(many=True, read_only=True)
+    pages = BlueprintPageSerializer(many=True, read_only=True)
     project_name = serializers.CharField(source='project.name', read_only=True)
     uploaded_by_name = serializers.CharField(source='uploaded_by.get_full_name', read_only=True)
     reviewed_by_name = serializers.CharField(source='reviewed_by.get_full_name', read_only=True)
     is_overdue = serializers.SerializerMethodField()
     days_until_deadline = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Blueprint
-        fields = ['id', 'project', 'project_name', 'file', 'file_type', 'width', 'height',
+        fields = ['id', 'project', 'project_name', 'file', 'download_url', 'file_type', 'width', 'height',
                   'review_status', 'review_deadline', 'reviewed_by', 'reviewed_by_name',
                   'reviewed_at', 'review_notes', 'uploaded_by', 'uploaded_by_name',
-                  'uploaded_at', 'pins', 'is_overdue', 'days_until_deadline']
-        read_only_fields = ['id', 'uploaded_at', 'file_type', 'reviewed_at']
+                  'uploaded_at', 'tile_status', 'page_count', 'pages', 'pins', 'is_overdue',
+                  'days_until_deadline']
+        read_only_fields = ['id', 'uploaded_at', 'file_type', 'reviewed_at', 'tile_status', 'page_count']
+    
+    @staticmethod
+    def setup_eager_loading(queryset, prefix=''):
+        """
+        Load the related rows shown by this serializer.
+        
+        Args:
+            queryset: Blueprint queryset, or a queryset of a model pointing to
+                blueprints when `prefix` is given (e.g. 'blueprint__')
+        """
+        return queryset.select_related(
+            f'{prefix}project', f'{prefix}uploaded_by', f'{prefix}reviewed_by'
+        ).prefetch_related(
+            Prefetch(f'{prefix}pins', queryset=PinSerializer.setup_eager_loading(Pin.objects.all())),
+            f'{prefix}pages'
+        )
     
     def get_is_overdue(self, obj):
         return obj.is_overdue()
     
     def get_days_until_deadline(self, obj):
         return obj.days_until_deadline()
+    
+    def get_download_url(self, obj):
+        request = self.context.get('request')
+        url = f'/api/projects/{obj.project_id}/download_blueprint/'
+        return request.build_absolute_uri(url) if request else url
 
 
 class ProjectSerializer(serializers.ModelSerializer):
@@ -63,18 +116,23 @@ class ProjectSerializer(serializers.ModelSerializer):
                   'completed_task_count', 'progress_percentage', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load the related rows, blueprint pins and task counts in a fixed number of queries."""
+        queryset = queryset.select_related(
+            'company', 'contractor', 'consultant', 'created_by', 'progress', 'blueprint'
+        )
+        return BlueprintSerializer.setup_eager_loading(queryset, prefix='blueprint__')
+    
+    # Task counts come from the pre-aggregated progress rollup
     def get_task_count(self, obj):
-        return obj.tasks.count()
+        return ProjectProgress.for_project(obj).total_tasks
     
     def get_completed_task_count(self, obj):
-        return obj.tasks.filter(status='COMPLETED').count()
+        return ProjectProgress.for_project(obj).completed_tasks
     
     def get_progress_percentage(self, obj):
-        total = self.get_task_count(obj)
-        if total == 0:
-            return 0
-        completed = self.get_completed_task_count(obj)
-        return round((completed / total) * 100, 2)
+        return ProjectProgress.for_project(obj).progress_percentage
 
 
 class ProjectListSerializer(serializers.ModelSerializer):
@@ -89,9 +147,50 @@ class ProjectListSerializer(serializers.ModelSerializer):
                   'start_date', 'end_date', 'progress_percentage', 'created_at']
     
     def get_progress_percentage(self, obj):
-        total = obj.tasks.count()
-        if total == 0:
-            return 0
-        completed = obj.tasks.filter(status='COMPLETED').count()
-        return round((completed / total) * 100, 2)
+        return ProjectProgress.for_project(obj).progress_percentage
+    
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('company', 'contractor', 'progress')
+
+
+# Locations accepted by one bulk create_task_from_location request
+MAX_BULK_LOCATIONS = 500
 
+
+class LocationTaskSerializer(serializers.Serializer):
+    """A task placed at a blueprint location, as created by create_tasks_from_locations."""
+    x = serializers.FloatField(min_value=0, max_value=1)
+    y = serializers.FloatField(min_value=0, max_value=1)
+    pin_label = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False, allow_blank=True, default='')
+    priority = serializers.ChoiceField(choices=['LOW', 'MEDIUM', 'HIGH', 'URGENT'], default='MEDIUM')
+    status = serializers.ChoiceField(choices=['PENDING', 'IN_PROGRESS', 'COMPLETED', 'DELAYED'], default='PENDING')
+    # Plain ids, checked for the whole batch at once by BulkLocationTaskSerializer
+    department = serializers.IntegerField(required=False, allow_null=True, default=None)
+    assigned_to = serializers.IntegerField(required=False, allow_null=True, default=None)
+    estimated_hours = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0, required=False, allow_null=True, default=None
+    )
+    due_date = serializers.DateTimeField(required=False, allow_null=True, default=None)
+
+
+class BulkLocationTaskSerializer(serializers.Serializer):
+    locations = LocationTaskSerializer(many=True, allow_empty=False, max_length=MAX_BULK_LOCATIONS)
+    
+    def validate_locations(self, locations):
+        """Check the referenced departments and users with one query each."""
+        from departments.models import Department
+        from accounts.models import User
+        
+        errors = {}
+        for field, model in [('department', Department), ('assigned_to', User)]:
+            ids = {location[field] for location in locations if location[field] is not None}
+            found = set(model.objects.filter(id__in=ids).values_list('id', flat=True))
+            for index, location in enumerate(locations):
+                if location[field] is not None and location[field] not in found:
+                    errors.setdefault(index, {})[field] = [f'Invalid pk "{location[field]}" - object does not exist.']
+        if errors:
+            raise serializers.ValidationError(errors)
+        return locations
@@ -0,0 +1,76 @@
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from utils.cache_versions import invalidate, project_tenants
+from .models import Project, ProjectProgress, Blueprint, Pin, PinCluster
+from .tiles import delete_tiles, tiles_prefix
+
+
+@receiver(post_save, sender=Project)
+def create_project_progress(sender, instance, created, **kwargs):
+    """Start every project with an empty rollup so reads never have to build one."""
+    if created and not kwargs.get('raw'):
+        ProjectProgress.objects.get_or_create(project=instance)
+
+
+@receiver([post_save, post_delete], sender=Project)
+def invalidate_project_responses(sender, instance, **kwargs):
+    """Project fields are shown by the project, task and document endpoints."""
+    invalidate(
+        ['projects', 'tasks', 'documents'],
+        f"company:{instance.company_id}",
+        instance.contractor_id and f"contractor:{instance.contractor_id}"
+    )
+
+
+@receiver([post_save, post_delete], sender=Blueprint)
+def invalidate_blueprint_responses(sender, instance, **kwargs):
+    invalidate(['projects'], *project_tenants(instance.project_id))
+
+
+@receiver(post_delete, sender=Blueprint)
+def delete_blueprint_tiles(sender, instance, **kwargs):
+    """Tiles are not a file field, so nothing else removes them with the blueprint."""
+    if instance.tile_version:
+        prefix = tiles_prefix(instance.id, instance.tile_version)
+        transaction.on_commit(lambda: delete_tiles(prefix))
+
+
+@receiver([post_save, post_delete], sender=Pin)
+def invalidate_pin_responses(sender, instance, **kwargs):
+    """Pins are nested in project details and tasks."""
+    project_id = Blueprint.objects.filter(id=instance.blueprint_id).values_list('project_id', flat=True).first()
+    invalidate(['projects', 'tasks'], *project_tenants(project_id))
+
+
+@receiver(post_save, sender=Pin)
+def update_pin_clusters_on_save(sender, instance, created, **kwargs):
+    """Count a new pin in its clusters, or move a relocated one with its tasks."""
+    if kwargs.get('raw'):
+        return
+    if created:
+        PinCluster.apply(instance.blueprint_id, instance.cell, PinCluster.pin_delta(instance.id, instance.x, instance.y))
+        return
+    # Without the stored position a move cannot be followed; rebuild_pin_clusters repairs it
+    previous = getattr(instance, '_loaded_position', None)
+    if not previous or previous == instance.position():
+        return
+    blueprint_id, cell, x, y = previous
+    PinCluster.apply(blueprint_id, cell, PinCluster.pin_delta(instance.id, x, y, sign=-1))
+    PinCluster.apply(instance.blueprint_id, instance.cell, PinCluster.pin_delta(instance.id, instance.x, instance.y))
+
+
+@receiver(pre_delete, sender=Pin)
+def collect_pin_cluster_delta(sender, instance, **kwargs):
+    """The tasks are unlinked before post_delete, so count them while they still point at the pin."""
+    origin = kwargs.get('origin')
+    if isinstance(origin, Pin) or getattr(origin, 'model', None) is Pin:
+        instance._cluster_delta = PinCluster.pin_delta(instance.id, instance.x, instance.y, sign=-1)
+
+
+@receiver(post_delete, sender=Pin)
+def update_pin_clusters_on_delete(sender, instance, **kwargs):
+    # Cascades from a blueprint delete remove its clusters as well
+    delta = getattr(instance, '_cluster_delta', None)
+    if delta:
+        PinCluster.apply(instance.blueprint_id, instance.cell, delta)
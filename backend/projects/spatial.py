@@ -0,0 +1,182 @@
+"""
+Quadtree index over normalized blueprint coordinates.
+
+Every pin stores the Z-order (Morton) code of the cell that contains it on
+a 2^QUADTREE_DEPTH grid. A quadtree cell at any coarser level is a
+contiguous range of codes, so viewport queries become a few range scans on
+the (blueprint, cell) index, and clustering at a level is a GROUP BY on
+`cell // 4 ** (QUADTREE_DEPTH - level)`.
+"""
+import math
+from django.db.models import (
+    Q, F, Value, Avg, Count, Max, Min, BigIntegerField, ExpressionWrapper
+)
+from rest_framework.exceptions import ValidationError
+
+QUADTREE_DEPTH = 16
+
+# Quadtree cells a viewport is split into for its index range scans
+MAX_COVER_CELLS = 16
+
+WHOLE_BLUEPRINT = (0.0, 0.0, 1.0, 1.0)
+
+
+def _interleave(col, row, bits):
+    code = 0
+    for bit in range(bits):
+        code |= ((col >> bit) & 1) << (2 * bit)
+        code |= ((row >> bit) & 1) << (2 * bit + 1)
+    return code
+
+
+def _grid_index(value, size):
+    return min(size - 1, max(0, int(value * size)))
+
+
+def cell_for(x, y):
+    """Morton code of the finest quadtree cell containing a normalized point."""
+    size = 1 << QUADTREE_DEPTH
+    return _interleave(_grid_index(x, size), _grid_index(y, size), QUADTREE_DEPTH)
+
+
+def cell_divisor(level):
+    """Divide a cell code by this to get its ancestor at a quadtree level."""
+    return 4 ** (QUADTREE_DEPTH - max(0, min(level, QUADTREE_DEPTH)))
+
+
+def cover_ranges(bbox):
+    """
+    Cell code ranges [start, end) covering a bounding box, using the finest
+    quadtree level at which it spans at most MAX_COVER_CELLS cells.
+    """
+    x0, y0, x1, y1 = bbox
+    level = 0
+    for candidate in range(QUADTREE_DEPTH + 1):
+        size = 1 << candidate
+        cols = _grid_index(x1, size) - _grid_index(x0, size) + 1
+        rows = _grid_index(y1, size) - _grid_index(y0, size) + 1
+        if cols * rows > MAX_COVER_CELLS:
+            break
+        level = candidate
+
+    size = 1 << level
+    span = cell_divisor(level)
+    codes = sorted(
+        _interleave(col, row, level)
+        for col in range(_grid_index(x0, size), _grid_index(x1, size) + 1)
+        for row in range(_grid_index(y0, size), _grid_index(y1, size) + 1)
+    )
+    ranges = []
+    for code in codes:
+        if ranges and ranges[-1][1] == code * span:
+            ranges[-1][1] = (code + 1) * span
+        else:
+            ranges.append([code * span, (code + 1) * span])
+    return [tuple(item) for item in ranges]
+
+
+def level_ranges(bbox, level):
+    """Ranges [start, end) of the cells at a quadtree level overlapping a bounding box."""
+    span = cell_divisor(level)
+    ranges = []
+    for start, end in cover_ranges(bbox):
+        start, end = start // span, -(-end // span)
+        if ranges and ranges[-1][1] >= start:
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([start, end])
+    return [tuple(item) for item in ranges]
+
+
+def within_bbox(queryset, bbox):
+    """Filter pins to a bounding box, through the cell index."""
+    if tuple(bbox) == WHOLE_BLUEPRINT:
+        return queryset
+    x0, y0, x1, y1 = bbox
+    in_cells = Q()
+    for start, end in cover_ranges(bbox):
+        in_cells |= Q(cell__gte=start, cell__lt=end)
+    # The cells cover slightly more than the box; the exact bounds trim it
+    return queryset.filter(in_cells).filter(x__gte=x0, x__lte=x1, y__gte=y0, y__lte=y1)
+
+
+def parse_bbox(value):
+    """
+    Parse `x0,y0,x1,y1` in normalized coordinates.
+
+    Raises:
+        ValidationError: If it is not four numbers within 0-1 with x0 <= x1 and y0 <= y1
+    """
+    if value in (None, ''):
+        return WHOLE_BLUEPRINT
+    try:
+        bbox = tuple(float(part) for part in value.split(','))
+    except ValueError:
+        raise ValidationError({"bbox": "bbox must be four numbers: x0,y0,x1,y1."})
+    if len(bbox) != 4:
+        raise ValidationError({"bbox": "bbox must be four numbers: x0,y0,x1,y1."})
+    x0, y0, x1, y1 = bbox
+    if not all(0 <= value <= 1 for value in bbox) or x0 > x1 or y0 > y1:
+        raise ValidationError({"bbox": "bbox must lie within 0-1 with x0 <= x1 and y0 <= y1."})
+    return bbox
+
+
+def parse_zoom(value):
+    """
+    Parse the zoom level: the viewport spans about 1/2^zoom of the blueprint.
+
+    Raises:
+        ValidationError: If it is not an integer between 0 and QUADTREE_DEPTH
+    """
+    if value in (None, ''):
+        return 0
+    try:
+        zoom = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({"zoom": "zoom must be an integer."})
+    if not 0 <= zoom <= QUADTREE_DEPTH:
+        raise ValidationError({"zoom": f"zoom must be between 0 and {QUADTREE_DEPTH}."})
+    return zoom
+
+
+# Viewports with more pins than this are returned as clusters
+MAX_VIEWPORT_PINS = 200
+
+# Clusters are cells of a grid 2^CLUSTER_GRID_BITS times finer than the view,
+# i.e. at most 9 x 9 clusters per viewport
+CLUSTER_GRID_BITS = 3
+
+
+def cluster_level(bbox, zoom):
+    """
+    Quadtree level pins are clustered at. The view is the smaller of the
+    zoom and the bbox, so a wide bbox at a high zoom still has few clusters.
+    """
+    x0, y0, x1, y1 = bbox
+    span = max(x1 - x0, y1 - y0)
+    bbox_zoom = QUADTREE_DEPTH if span <= 0 else int(math.floor(math.log2(1 / span)))
+    return min(QUADTREE_DEPTH, min(zoom, bbox_zoom) + CLUSTER_GRID_BITS)
+
+
+def cluster_pins(queryset, level):
+    """Group pins by their cell at a quadtree level, with count, centroid and extent."""
+    divisor = Value(cell_divisor(level), output_field=BigIntegerField())
+    rows = (
+        queryset.order_by()
+        .annotate(cluster=ExpressionWrapper(F('cell') / divisor, output_field=BigIntegerField()))
+        .values('cluster')
+        .annotate(
+            pin_count=Count('id'), center_x=Avg('x'), center_y=Avg('y'),
+            min_x=Min('x'), min_y=Min('y'), max_x=Max('x'), max_y=Max('y'),
+        )
+        .order_by('cluster')
+    )
+    return [
+        {
+            'x': row['center_x'],
+            'y': row['center_y'],
+            'count': row['pin_count'],
+            'bbox': [row['min_x'], row['min_y'], row['max_x'], row['max_y']],
+        }
+        for row in rows
+    ]
@@ -0,0 +1,111 @@
+try:
+    from celery import shared_task
+    CELERY_AVAILABLE = True
+except ImportError:
+    CELERY_AVAILABLE = False
+    # Fallback decorator if celery is not available
+    def shared_task(func):
+        return func
+
+import logging
+from django.db import transaction
+from PIL import Image
+from utils.cache_versions import invalidate, project_tenants
+from .models import Blueprint, BlueprintPage
+from .rasterize import render_pages, save_renditions
+from .tiles import build_pyramid, delete_tiles, new_version, tile_format, tiles_prefix
+
+logger = logging.getLogger(__name__)
+
+
+def rasterize_pdf(data, prefix):
+    """
+    Render the pages of a PDF blueprint and store their renditions.
+    
+    Returns:
+        tuple: (print-size image of the first page, BlueprintPage field values per page)
+    """
+    first, pages = None, []
+    for number, width, height, image in render_pages(data):
+        names = save_renditions(image, prefix, number)
+        pages.append({
+            'number': number,
+            'width': width,
+            'height': height,
+            'thumbnail_image': names['thumbnail'],
+            'screen_image': names['screen'],
+            'print_image': names['print'],
+        })
+        if first is None:
+            first = image
+    if first is None:
+        raise ValueError("The PDF has no pages.")
+    return first, pages
+
+
+@shared_task
+def generate_blueprint_tiles(blueprint_id):
+    """
+    Celery task cutting a blueprint into a deep-zoom tile pyramid.
+    PDFs are rasterized first and their first page is tiled.
+    The new pyramid is only published if the blueprint was not replaced
+    (or tiled by a duplicate delivery) meanwhile; the previous one is deleted.
+    """
+    blueprint = Blueprint.objects.filter(id=blueprint_id, tile_status='PENDING').first()
+    if not blueprint:
+        return
+
+    # The state the pyramid is built for; publishing requires it to be unchanged
+    current = Blueprint.objects.filter(
+        id=blueprint_id, uploaded_at=blueprint.uploaded_at, tile_version=blueprint.tile_version
+    )
+    current.update(tile_status='PROCESSING')
+
+    version = new_version()
+    file_format = tile_format()
+    prefix = tiles_prefix(blueprint.id, version)
+    pdf = blueprint.file_type == 'pdf'
+    pages = []
+    try:
+        with blueprint.file.open('rb') as source:
+            if pdf:
+                image, pages = rasterize_pdf(source.read(), prefix)
+            else:
+                image = Image.open(source)
+            levels = build_pyramid(image, prefix, file_format)
+    except Exception as e:
+        logger.error(f"Tiling blueprint {blueprint_id} failed: {e}", exc_info=True)
+        delete_tiles(prefix)
+        current.update(tile_status='FAILED')
+        return
+
+    fields = {}
+    if pdf:
+        # Pins are placed on the rendered first page
+        fields = {'width': image.width, 'height': image.height}
+    with transaction.atomic():
+        published = current.update(
+            tile_status='READY', tile_version=version, tile_format=file_format, tile_levels=levels,
+            page_count=len(pages) if pdf else None, **fields
+        )
+        if published:
+            BlueprintPage.objects.filter(blueprint_id=blueprint_id).delete()
+            BlueprintPage.objects.bulk_create(
+                BlueprintPage(blueprint_id=blueprint_id, **page) for page in pages
+            )
+    if not published:
+        delete_tiles(prefix)
+        return
+
+    if blueprint.tile_version:
+        delete_tiles(tiles_prefix(blueprint.id, blueprint.tile_version))
+    # Updated without save(), so the blueprint signals did not run
+    invalidate(['projects'], *project_tenants(blueprint.project_id))
+
+
+def enqueue_blueprint_tiles(blueprint_id):
+    """Send a blueprint to the Celery queue, or tile it inline when Celery is unavailable."""
+    if CELERY_AVAILABLE and hasattr(generate_blueprint_tiles, 'delay'):
+        generate_blueprint_tiles.delay(blueprint_id)
+    else:
+        generate_blueprint_tiles(blueprint_id)
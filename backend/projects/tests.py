@@ -2,6 +2,7 @@
 Unit tests for projects app.
 """
 import pytest
+from io import BytesIO, StringIO
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -88,3 +89,798 @@ class TestProjectAPI:
         response = api_client.get(f'/api/projects/{project.id}/')
         assert response.status_code == status.HTTP_200_OK
 
+
+
+@pytest.mark.django_db
+class TestProjectProgress:
+    """Test the pre-aggregated project progress rollup."""
+    
+    @pytest.fixture
+    def api_client(self):
+        """Create API client."""
+        return APIClient()
+    
+    @pytest.fixture
+    def company(self):
+        """Create test company."""
+        from accounts.models import Company
+        return Company.objects.create(name='Progress Co', email='progress@example.com')
+    
+    @pytest.fixture
+    def admin_user(self, company):
+        """Create company admin."""
+        return User.objects.create_user(
+            username='progress_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+    
+    @pytest.fixture
+    def project(self, company):
+        """Create test project."""
+        return Project.objects.create(company=company, name='Tower', address='Site 1')
+    
+    def _task(self, project, **kwargs):
+        from tasks.models import Task
+        return Task.objects.create(project=project, title='Task', **kwargs)
+    
+    def test_rollup_follows_task_changes(self, project):
+        """Test rollup is updated on task create, update and delete."""
+        from .models import ProjectProgress
+        task = self._task(project, estimated_hours=4)
+        self._task(project, status='COMPLETED', estimated_hours=2)
+        
+        progress = ProjectProgress.objects.get(project=project)
+        assert progress.total_tasks == 2
+        assert progress.completed_tasks == 1
+        assert progress.estimated_hours == 6
+        assert progress.progress_percentage == 50
+        
+        task.status = 'COMPLETED'
+        task.save()
+        progress.refresh_from_db()
+        assert progress.completed_tasks == 2
+        assert progress.pending_tasks == 0
+        
+        task.delete()
+        progress.refresh_from_db()
+        assert progress.total_tasks == 1
+        assert progress.progress_percentage == 100
+    
+    def test_task_moved_between_projects(self, company, project):
+        """Test both rollups are refreshed when a task changes project."""
+        from tasks.models import Task
+        from .models import ProjectProgress
+        other = Project.objects.create(company=company, name='Annex', address='Site 2')
+        task = self._task(project)
+        
+        task = Task.objects.get(pk=task.pk)
+        task.project = other
+        task.save()
+        
+        assert ProjectProgress.objects.get(project=project).total_tasks == 0
+        assert ProjectProgress.objects.get(project=other).total_tasks == 1
+    
+    def test_rebuild_command(self, project):
+        """Test the rebuild command backfills missing rollups."""
+        from django.core.management import call_command
+        from .models import ProjectProgress
+        self._task(project, status='COMPLETED')
+        self._task(project)
+        ProjectProgress.objects.all().delete()
+        
+        call_command('rebuild_project_progress', stdout=StringIO())
+        
+        progress = ProjectProgress.objects.get(project=project)
+        assert progress.total_tasks == 2
+        assert progress.completed_tasks == 1
+        assert progress.last_task_change_at is not None
+    
+    def test_for_project_builds_missing_rollup(self, project):
+        """Test first access builds the rollup, also when another request created it meanwhile."""
+        from tasks.models import Task
+        from .models import ProjectProgress
+        task = self._task(project)
+        ProjectProgress.objects.all().delete()
+        
+        progress = ProjectProgress.for_project(Project.objects.get(pk=project.pk))
+        assert progress.total_tasks == 1
+        # No task changed on access
+        assert progress.last_task_change_at == Task.objects.get(pk=task.pk).updated_at
+        
+        ProjectProgress.objects.all().delete()
+        loaded = Project.objects.select_related('progress').get(pk=project.pk)
+        ProjectProgress.objects.create(project=project)
+        assert ProjectProgress.for_project(loaded).total_tasks == 1
+    
+    def test_progress_endpoints_read_rollup(self, settings, api_client, admin_user, project):
+        """Test list, statistics and report endpoints expose rollup values."""
+        self._task(project, status='COMPLETED')
+        self._task(project)
+        api_client.force_authenticate(user=admin_user)
+        
+        response = api_client.get('/api/projects/')
+        assert response.data['results'][0]['progress_percentage'] == 50
+        
+        response = api_client.get(f'/api/projects/{project.id}/statistics/')
+        assert response.data['total_tasks'] == 2
+        assert response.data['completed_tasks'] == 1
+        
+        response = api_client.get('/api/reports/project_progress/')
+        assert response.data[0]['progress_percentage'] == 50
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+    """Test per-user response caching of project endpoints."""
+    
+    @pytest.fixture
+    def api_client(self, locmem_cache):
+        """Create API client."""
+        return APIClient()
+    
+    @pytest.fixture
+    def company(self):
+        """Create test company."""
+        from accounts.models import Company
+        return Company.objects.create(name='Cache Co', email='cache@example.com')
+    
+    @pytest.fixture
+    def admin_user(self, company):
+        """Create company admin."""
+        return User.objects.create_user(
+            username='cache_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+    
+    @pytest.fixture
+    def project(self, company):
+        """Create test project."""
+        return Project.objects.create(company=company, name='Tower', address='Site 1')
+    
+    def test_list_and_detail_are_cached(self, api_client, admin_user, project):
+        """Test repeated reads are hits and marked private."""
+        api_client.force_authenticate(user=admin_user)
+        for url in ['/api/projects/', f'/api/projects/{project.id}/']:
+            assert api_client.get(url)['X-Response-Cache'] == 'MISS'
+            response = api_client.get(url)
+            assert response['X-Response-Cache'] == 'HIT'
+            assert 'private' in response['Cache-Control']
+    
+    def test_responses_are_per_user(self, api_client, admin_user, company, project):
+        """Test a cached response is never served to another user."""
+        from accounts.models import Company
+        api_client.force_authenticate(user=admin_user)
+        api_client.get('/api/projects/')
+        
+        other_company = Company.objects.create(name='Other Co', email='other@example.com')
+        other_admin = User.objects.create_user(
+            username='other_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=other_company
+        )
+        api_client.force_authenticate(user=other_admin)
+        response = api_client.get('/api/projects/')
+        assert response['X-Response-Cache'] == 'MISS'
+        assert response.data['count'] == 0
+    
+    def test_writes_invalidate(self, api_client, admin_user, project):
+        """Test project and task writes are visible on the next read."""
+        from tasks.models import Task
+        api_client.force_authenticate(user=admin_user)
+        api_client.get('/api/projects/')
+        
+        project.name = 'Renamed'
+        project.save()
+        response = api_client.get('/api/projects/')
+        assert response['X-Response-Cache'] == 'MISS'
+        assert response.data['results'][0]['name'] == 'Renamed'
+        
+        api_client.get(f'/api/projects/{project.id}/')
+        Task.objects.create(project=project, title='Task', status='COMPLETED')
+        response = api_client.get(f'/api/projects/{project.id}/')
+        assert response.data['task_count'] == 1
+        assert api_client.get('/api/projects/').data['results'][0]['progress_percentage'] == 100
+    
+    def test_other_tenant_writes_keep_cache(self, api_client, admin_user, project):
+        """Test writes in another company do not invalidate this one."""
+        from accounts.models import Company
+        api_client.force_authenticate(user=admin_user)
+        api_client.get('/api/projects/')
+        
+        other_company = Company.objects.create(name='Other Co', email='other@example.com')
+        Project.objects.create(company=other_company, name='Elsewhere', address='Site 2')
+        assert api_client.get('/api/projects/')['X-Response-Cache'] == 'HIT'
+    
+    def test_cross_company_roles_are_not_cached(self, api_client, company, project):
+        """Test responses of roles spanning companies bypass the cache."""
+        worker = User.objects.create_user(
+            username='cache_worker', password='testpass123',
+            role='WORKER', company=company
+        )
+        api_client.force_authenticate(user=worker)
+        api_client.get('/api/projects/')
+        assert 'X-Response-Cache' not in api_client.get('/api/projects/')
+
+
+@pytest.mark.django_db
+class TestProjectQueryCount:
+    """Test project endpoints use a fixed number of queries."""
+    
+    @pytest.fixture
+    def api_client(self):
+        """Create API client."""
+        return APIClient()
+    
+    @pytest.fixture
+    def company(self):
+        """Create test company."""
+        from accounts.models import Company
+        return Company.objects.create(name='Query Co', email='query@example.com')
+    
+    @pytest.fixture
+    def admin_user(self, company):
+        """Create company admin."""
+        return User.objects.create_user(
+            username='query_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+    
+    def _project(self, company, admin_user, pins, tasks_per_pin):
+        from tasks.models import Task
+        project = Project.objects.create(company=company, name='Tower', address='Site', created_by=admin_user)
+        blueprint = Blueprint.objects.create(project=project, file='blueprints/plan.png', uploaded_by=admin_user)
+        for index in range(pins):
+            pin = Pin.objects.create(blueprint=blueprint, x=index, y=index, label=f'Pin {index}')
+            for number in range(tasks_per_pin):
+                Task.objects.create(project=project, pin=pin, title=f'Task {number}', assigned_to=admin_user)
+        return project
+    
+    def _count_queries(self, api_client, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        return len(queries), response
+    
+    def test_detail_queries_do_not_grow_with_pins(self, settings, api_client, company, admin_user):
+        """Test project detail is independent of pin and task counts."""
+        small = self._project(company, admin_user, pins=1, tasks_per_pin=1)
+        large = self._project(company, admin_user, pins=6, tasks_per_pin=7)
+        api_client.force_authenticate(user=admin_user)
+        
+        small_count, _ = self._count_queries(api_client, f'/api/projects/{small.id}/')
+        large_count, response = self._count_queries(api_client, f'/api/projects/{large.id}/')
+        assert large_count == small_count
+        
+        pins = response.data['blueprint']['pins']
+        assert len(pins) == 6
+        assert all(pin['task_count'] == 7 for pin in pins)
+        assert all(len(pin['tasks']) == 5 for pin in pins)
+        assert response.data['task_count'] == 42
+    
+    def test_list_and_pin_queries_are_constant(self, settings, api_client, company, admin_user):
+        """Test project and pin lists are independent of their length."""
+        project = self._project(company, admin_user, pins=2, tasks_per_pin=2)
+        api_client.force_authenticate(user=admin_user)
+        
+        list_count, _ = self._count_queries(api_client, '/api/projects/')
+        blueprint_id = project.blueprint.id
+        pin_count, _ = self._count_queries(api_client, f'/api/projects/pins/?blueprint={blueprint_id}')
+        
+        for _ in range(3):
+            self._project(company, admin_user, pins=0, tasks_per_pin=0)
+        for index in range(4):
+            Pin.objects.create(blueprint=project.blueprint, x=index, y=index)
+        
+        assert self._count_queries(api_client, '/api/projects/')[0] == list_count
+        assert self._count_queries(api_client, f'/api/projects/pins/?blueprint={blueprint_id}')[0] == pin_count
+
+
+@pytest.mark.django_db
+class TestBlueprintTiles:
+    """Test deep-zoom tile pyramids of blueprint images."""
+    
+    @pytest.fixture
+    def api_client(self, settings, media_root):
+        """Create API client."""
+        return APIClient()
+    
+    @pytest.fixture
+    def admin_user(self):
+        """Create company admin."""
+        from accounts.models import Company
+        company = Company.objects.create(name='Tile Co', email='tiles@example.com')
+        return User.objects.create_user(
+            username='tile_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+    
+    @pytest.fixture
+    def project(self, admin_user):
+        """Create test project."""
+        return Project.objects.create(company=admin_user.company, name='Tower', address='Site 1')
+    
+    def upload(self, api_client, project, size, capture):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+        output = BytesIO()
+        Image.new('RGB', size, 'white').save(output, 'PNG')
+        with capture(execute=True):
+            return api_client.post(
+                f'/api/projects/{project.id}/upload_blueprint/',
+                {'file': SimpleUploadedFile('plan.png', output.getvalue(), content_type='image/png')},
+                format='multipart'
+            )
+    
+    def test_pyramid_levels_and_tiles(self, media_root):
+        """Test each level halves the previous one and is cut into overlapping tiles."""
+        from PIL import Image
+        from .tiles import build_pyramid, level_size, tile_box
+        
+        levels = build_pyramid(Image.new('RGB', (600, 300)), 'tiles/test', 'jpeg')
+        assert levels == 11  # 600px needs 10 halvings down to 1px
+        assert level_size(600, 300, 10) == (600, 300)
+        assert level_size(600, 300, 9) == (300, 150)
+        assert level_size(600, 300, 0) == (1, 1)
+        assert sorted(p.name for p in (media_root / 'tiles/test/10').iterdir()) == [
+            '0_0.jpeg', '0_1.jpeg', '1_0.jpeg', '1_1.jpeg', '2_0.jpeg', '2_1.jpeg'
+        ]
+        assert (media_root / 'tiles/test/image.dzi').exists()
+        # Inner edges share one pixel with the neighbouring tile
+        assert tile_box(1, 0, 600, 300) == (255, 0, 513, 257)
+        assert tile_box(2, 1, 600, 300) == (511, 255, 600, 300)
+    
+    def test_upload_builds_tiles(self, api_client, admin_user, project,
+                                 django_capture_on_commit_callbacks):
+        """Test an uploaded image is tiled and its tiles are served with long-lived caching."""
+        api_client.force_authenticate(user=admin_user)
+        response = self.upload(api_client, project, (600, 300), django_capture_on_commit_callbacks)
+        assert response.status_code == status.HTTP_201_CREATED
+        
+        response = api_client.get(f'/api/projects/{project.id}/blueprint_tiles/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['status'] == 'READY'
+        assert response.data['levels'] == 11
+        assert (response.data['width'], response.data['height']) == (600, 300)
+        
+        url = response.data['tile_url'].format(level=10, col=2, row=1)
+        response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] in ('image/webp', 'image/jpeg')
+        assert 'immutable' in response['Cache-Control']
+        assert 'private' in response['Cache-Control']
+        
+        assert api_client.get(url.replace('/10/2_1/', '/10/3_0/')).status_code == status.HTTP_404_NOT_FOUND
+    
+    def test_replaced_blueprint_gets_new_tiles(self, api_client, admin_user, project, media_root,
+                                               django_capture_on_commit_callbacks):
+        """Test replacing the image changes the tile URLs and deletes the old tiles."""
+        api_client.force_authenticate(user=admin_user)
+        self.upload(api_client, project, (600, 300), django_capture_on_commit_callbacks)
+        old_url = api_client.get(f'/api/projects/{project.id}/blueprint_tiles/').data['tile_url']
+        old_version = Blueprint.objects.get(project=project).tile_version
+        
+        self.upload(api_client, project, (300, 300), django_capture_on_commit_callbacks)
+        response = api_client.get(f'/api/projects/{project.id}/blueprint_tiles/')
+        assert response.data['levels'] == 10
+        assert response.data['tile_url'] != old_url
+        assert api_client.get(old_url.format(level=0, col=0, row=0)).status_code == status.HTTP_404_NOT_FOUND
+        
+        blueprint = Blueprint.objects.get(project=project)
+        assert not (media_root / f'blueprints/tiles/{blueprint.id}/{old_version}').exists()
+    
+    def test_non_image_is_not_tiled(self, api_client, admin_user, project):
+        """Test the descriptor reports blueprints without tiles."""
+        Blueprint.objects.create(project=project, file='blueprints/plan.pdf', file_type='pdf')
+        api_client.force_authenticate(user=admin_user)
+        response = api_client.get(f'/api/projects/{project.id}/blueprint_tiles/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'status': 'NONE'}
+
+
+@pytest.mark.django_db
+class TestBlueprintRasterization:
+    """Test rasterization of PDF blueprints."""
+    
+    @pytest.fixture
+    def api_client(self, settings, media_root):
+        """Create API client."""
+        pytest.importorskip('pypdfium2')
+        return APIClient()
+    
+    @pytest.fixture
+    def admin_user(self):
+        """Create company admin."""
+        from accounts.models import Company
+        company = Company.objects.create(name='Plan Co', email='plans@example.com')
+        return User.objects.create_user(
+            username='plan_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+    
+    @pytest.fixture
+    def project(self, admin_user):
+        """Create test project."""
+        return Project.objects.create(company=admin_user.company, name='Tower', address='Site 1')
+    
+    def pdf(self, *page_sizes):
+        from reportlab.pdfgen import canvas
+        output = BytesIO()
+        pdf = canvas.Canvas(output)
+        for size in page_sizes:
+            pdf.setPageSize(size)
+            pdf.line(0, 0, *size)
+            pdf.showPage()
+        pdf.save()
+        return output.getvalue()
+    
+    def test_print_rendition_is_capped(self):
+        """Test large sheets are rendered at print DPI up to the maximum size."""
+        from .rasterize import page_scale, PRINT_DPI, RENDITION_SIZES
+        assert page_scale(595, 842) == PRINT_DPI / 72  # A4
+        assert round(4768 * page_scale(4768, 3370)) == RENDITION_SIZES['print']  # 2×A0
+    
+    def test_pdf_pages_are_rasterized_and_tiled(self, api_client, admin_user, project,
+                                                django_capture_on_commit_callbacks):
+        """Test every page gets its renditions and the first page is tiled."""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+        from reportlab.lib.pagesizes import A4, landscape
+        api_client.force_authenticate(user=admin_user)
+        
+        plan = SimpleUploadedFile('plan.pdf', self.pdf(A4, landscape(A4)), content_type='application/pdf')
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post(
+                f'/api/projects/{project.id}/upload_blueprint/', {'file': plan}, format='multipart'
+            )
+        assert response.status_code == status.HTTP_201_CREATED
+        
+        blueprint = Blueprint.objects.get(project=project)
+        assert blueprint.tile_status == 'READY'
+        assert blueprint.page_count == 2
+        # Pins use the size of the rendered first page (A4 at 150 DPI)
+        assert abs(blueprint.width - 1240) <= 1 and abs(blueprint.height - 1754) <= 1
+        
+        pages = list(blueprint.pages.all())
+        assert [(page.number, round(page.width), round(page.height)) for page in pages] == [
+            (1, 595, 842), (2, 842, 595)
+        ]
+        with Image.open(pages[1].thumbnail_image) as thumbnail:
+            assert thumbnail.size == (256, 181)
+        with Image.open(pages[1].screen_image) as screen:
+            assert screen.size == (blueprint.height, blueprint.width)
+        
+        response = api_client.get(f'/api/projects/{project.id}/')
+        assert [page['number'] for page in response.data['blueprint']['pages']] == [1, 2]
+        
+        response = api_client.get(f'/api/projects/{project.id}/blueprint_tiles/')
+        assert response.data['status'] == 'READY'
+        assert response.data['levels'] == 12
+
+
+@pytest.mark.django_db
+class TestPinViewport:
+    """Test the quadtree index and viewport queries of blueprint pins."""
+    
+    @pytest.fixture
+    def api_client(self):
+        """Create API client."""
+        return APIClient()
+    
+    @pytest.fixture
+    def admin_user(self):
+        """Create company admin."""
+        from accounts.models import Company
+        company = Company.objects.create(name='Pin Co', email='pins@example.com')
+        return User.objects.create_user(
+            username='pin_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+    
+    @pytest.fixture
+    def blueprint(self, settings, admin_user):
+        """Create a blueprint with a 30 x 30 grid of pins."""
+        project = Project.objects.create(company=admin_user.company, name='Tower', address='Site 1')
+        blueprint = Blueprint.objects.create(project=project, file='blueprints/plan.png')
+        from .spatial import cell_for
+        points = [((col + 0.5) / 30, (row + 0.5) / 30) for col in range(30) for row in range(30)]
+        Pin.objects.bulk_create(Pin(blueprint=blueprint, x=x, y=y, cell=cell_for(x, y)) for x, y in points)
+        return blueprint
+    
+    def test_cell_follows_coordinates(self):
+        """Test the quadtree cell is kept in sync with the pin position."""
+        from .spatial import cell_for, QUADTREE_DEPTH
+        assert cell_for(0, 0) == 0
+        assert cell_for(1, 1) == 4 ** QUADTREE_DEPTH - 1
+        # Quadrants are contiguous ranges: top-left, top-right, bottom-left, bottom-right
+        quarter = 4 ** (QUADTREE_DEPTH - 1)
+        assert [cell_for(x, y) // quarter for x, y in [(0.2, 0.2), (0.7, 0.2), (0.2, 0.7), (0.7, 0.7)]] == [0, 1, 2, 3]
+    
+    def test_bbox_matches_brute_force(self, blueprint):
+        """Test index range scans return exactly the pins inside the box."""
+        from .spatial import within_bbox
+        pins = list(Pin.objects.filter(blueprint=blueprint))
+        for bbox in [(0.1, 0.1, 0.4, 0.3), (0.33, 0.0, 0.34, 1.0), (0.5, 0.5, 1.0, 1.0), (0.9, 0.05, 0.91, 0.06)]:
+            x0, y0, x1, y1 = bbox
+            expected = {pin.id for pin in pins if x0 <= pin.x <= x1 and y0 <= pin.y <= y1}
+            found = set(within_bbox(Pin.objects.filter(blueprint=blueprint), bbox).values_list('id', flat=True))
+            assert found == expected
+        
+        pin = pins[0]
+        pin.x, pin.y = 0.99, 0.99
+        pin.save(update_fields=['x', 'y'])
+        assert within_bbox(Pin.objects.all(), (0.98, 0.98, 1.0, 1.0)).get() == pin
+    
+    def test_dense_viewport_is_clustered(self, api_client, admin_user, blueprint):
+        """Test a zoomed-out view returns a bounded number of clusters."""
+        api_client.force_authenticate(user=admin_user)
+        response = api_client.get('/api/projects/pins/viewport/', {'blueprint': blueprint.id, 'zoom': 0})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['clustered'] is True
+        assert response.data['count'] == 900
+        assert response.data['pins'] == []
+        assert 1 < len(response.data['clusters']) <= 81
+        assert sum(cluster['count'] for cluster in response.data['clusters']) == 900
+    
+    def test_sparse_viewport_returns_pins(self, api_client, admin_user, blueprint):
+        """Test a zoomed-in view returns the visible pins themselves."""
+        api_client.force_authenticate(user=admin_user)
+        response = api_client.get('/api/projects/pins/viewport/', {
+            'blueprint': blueprint.id, 'bbox': '0,0,0.25,0.25', 'zoom': 2
+        })
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['clustered'] is False
+        assert response.data['count'] == 64  # 8 x 8 pins lie within a quarter of each axis
+        assert all(pin['x'] <= 0.25 and pin['y'] <= 0.25 for pin in response.data['pins'])
+        assert response.data['pins'][0]['task_count'] == 0
+    
+    def test_invalid_viewport(self, api_client, admin_user, blueprint):
+        """Test bbox and zoom are validated."""
+        api_client.force_authenticate(user=admin_user)
+        url = '/api/projects/pins/viewport/'
+        assert api_client.get(url, {'bbox': '0,0,1,1'}).status_code == status.HTTP_400_BAD_REQUEST
+        for params in [{'bbox': '0,0,1'}, {'bbox': '0.5,0,0.2,1'}, {'bbox': 'a,b,c,d'}, {'zoom': 40}]:
+            response = api_client.get(url, {'blueprint': blueprint.id, **params})
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_viewport_scoping(self, api_client, admin_user, blueprint):
+        """Test the blueprint id is validated and only visible blueprints are read."""
+        from accounts.models import Company
+        company = Company.objects.create(name='Other Co', email='other@example.com')
+        other_admin = User.objects.create_user(
+            username='other_admin', password='testpass123', role='COMPANY_ADMIN', company=company
+        )
+        api_client.force_authenticate(user=other_admin)
+        for url in ['/api/projects/pins/viewport/', '/api/projects/pins/']:
+            response = api_client.get(url, {'blueprint': blueprint.id})
+            assert response.status_code == status.HTTP_200_OK
+            assert response.data['count'] == 0
+            assert api_client.get(url, {'blueprint': 'abc'}).status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_list_filters_by_bbox(self, api_client, admin_user, blueprint):
+        """Test the pin list accepts a bbox too."""
+        api_client.force_authenticate(user=admin_user)
+        response = api_client.get('/api/projects/pins/', {'blueprint': blueprint.id, 'bbox': '0,0,0.1,0.1'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 9
+
+
+@pytest.mark.django_db
+class TestPinClusters:
+    """Test the precomputed per-level pin clusters."""
+    
+    @pytest.fixture
+    def api_client(self):
+        """Create API client."""
+        return APIClient()
+    
+    @pytest.fixture
+    def admin_user(self):
+        """Create company admin."""
+        from accounts.models import Company
+        company = Company.objects.create(name='Cluster Co', email='clusters@example.com')
+        return User.objects.create_user(
+            username='cluster_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+    
+    @pytest.fixture
+    def blueprint(self, settings, admin_user):
+        """Create a blueprint with pins in two quadrants."""
+        project = Project.objects.create(company=admin_user.company, name='Tower', address='Site 1')
+        blueprint = Blueprint.objects.create(project=project, file='blueprints/plan.png')
+        for x, y in [(0.1, 0.1), (0.2, 0.2), (0.3, 0.1), (0.8, 0.8)]:
+            Pin.objects.create(blueprint=blueprint, x=x, y=y)
+        return blueprint
+    
+    def snapshot(self, blueprint):
+        from .models import PinCluster
+        fields = [field.name for field in PinCluster._meta.fields if field.name not in ('id', 'sum_x', 'sum_y')]
+        rows = PinCluster.objects.filter(blueprint=blueprint).values(*fields)
+        return sorted(tuple(row.values()) for row in rows)
+    
+    def test_signals_match_rebuild(self, blueprint):
+        """Test incremental updates from pins and tasks give the same clusters as a rebuild."""
+        from tasks.models import Task
+        from .models import PinCluster
+        pins = list(Pin.objects.filter(blueprint=blueprint).order_by('x'))
+        project = blueprint.project
+        task = Task.objects.create(project=project, pin=pins[0], title='A', priority='HIGH')
+        Task.objects.create(project=project, pin=pins[0], title='B', status='DELAYED')
+        Task.objects.create(project=project, pin=pins[3], title='C', priority='URGENT')
+        other = Task.objects.create(project=project, pin=pins[1], title='D')
+        
+        task = Task.objects.get(pk=task.pk)
+        task.status = 'COMPLETED'
+        task.save()
+        task.pin = pins[2]
+        task.save()
+        other.delete()
+        
+        moved = Pin.objects.get(pk=pins[0].pk)
+        moved.x, moved.y = 0.9, 0.6
+        moved.save()
+        Pin.objects.get(pk=pins[3].pk).delete()
+        
+        incremental = self.snapshot(blueprint)
+        PinCluster.rebuild(blueprint.id)
+        assert incremental == self.snapshot(blueprint)
+        
+        root = PinCluster.objects.get(blueprint=blueprint, level=0)
+        assert root.pin_count == 3
+        assert root.task_count == 2
+        assert root.completed_tasks == 1 and root.delayed_tasks == 1
+        assert root.dominant_priority == 'HIGH'
+    
+    def test_rebuild_command(self, blueprint):
+        """Test the management command backfills clusters of every level."""
+        from django.core.management import call_command
+        from .models import PinCluster
+        PinCluster.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_pin_clusters', stdout=out)
+        assert 'of 1 blueprint(s)' in out.getvalue()
+        levels = PinCluster.objects.filter(blueprint=blueprint).values_list('level', flat=True).distinct()
+        assert sorted(levels) == list(range(PinCluster.MAX_LEVEL + 1))
+    
+    def test_clusters_endpoint(self, api_client, admin_user, blueprint):
+        """Test the overview is read from the precomputed clusters."""
+        from tasks.models import Task
+        Task.objects.create(project=blueprint.project, pin=Pin.objects.get(x=0.8), title='T', priority='URGENT')
+        api_client.force_authenticate(user=admin_user)
+        url = '/api/projects/pins/clusters/'
+        
+        response = api_client.get(url, {'blueprint': blueprint.id, 'zoom': 0})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['level'] == 3
+        assert response.data['count'] == 4
+        assert len(response.data['clusters']) == 4
+        busy = [cluster for cluster in response.data['clusters'] if cluster['task_count']]
+        assert busy[0]['dominant_priority'] == 'URGENT'
+        assert busy[0]['tasks_by_status']['PENDING'] == 1
+        assert busy[0]['x'] == pytest.approx(0.8)
+        
+        response = api_client.get(url, {'blueprint': blueprint.id, 'bbox': '0,0,0.5,0.5', 'zoom': 1})
+        assert response.data['count'] == 3
+        
+        response = api_client.get(url, {'blueprint': blueprint.id, 'bbox': '0,0,0.001,0.001', 'zoom': 16})
+        assert response.data['level'] == 8
+        assert api_client.get(url).status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get(url, {'blueprint': 'abc'}).status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_clusters_of_other_company(self, api_client, blueprint):
+        """Test clusters of blueprints the user cannot see are not returned."""
+        from accounts.models import Company
+        company = Company.objects.create(name='Other Co', email='other@example.com')
+        other_admin = User.objects.create_user(
+            username='other_admin', password='testpass123', role='COMPANY_ADMIN', company=company
+        )
+        api_client.force_authenticate(user=other_admin)
+        response = api_client.get('/api/projects/pins/clusters/', {'blueprint': blueprint.id})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 0 and response.data['clusters'] == []
+
+
+@pytest.mark.django_db
+class TestBulkTasksFromLocations:
+    """Test creating pins and tasks in bulk from blueprint locations."""
+    
+    @pytest.fixture
+    def api_client(self):
+        """Create API client."""
+        return APIClient()
+    
+    @pytest.fixture
+    def admin_user(self):
+        """Create company admin."""
+        from accounts.models import Company
+        company = Company.objects.create(name='Survey Co', email='survey@example.com')
+        return User.objects.create_user(
+            username='survey_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+    
+    @pytest.fixture
+    def project(self, settings, admin_user):
+        """Create a project with a blueprint."""
+        project = Project.objects.create(company=admin_user.company, name='Tower', address='Site 1')
+        Blueprint.objects.create(project=project, file='blueprints/plan.png')
+        return project
+    
+    def locations(self, count, **fields):
+        return [
+            {'x': (number + 0.5) / count, 'y': 0.5, 'title': f'Defect {number}', **fields}
+            for number in range(count)
+        ]
+    
+    def test_bulk_create(self, api_client, admin_user, project):
+        """Test pins and tasks are created with the rollups and notifications of the batch."""
+        from notifications.models import Notification
+        from tasks.models import Task
+        from .models import ProjectProgress, PinCluster
+        from .spatial import cell_for
+        api_client.force_authenticate(user=admin_user)
+        url = f'/api/projects/{project.id}/create_tasks_from_locations/'
+        
+        response = api_client.post(url, {'locations': self.locations(
+            3, status='COMPLETED', priority='HIGH', assigned_to=admin_user.id
+        )}, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['created'] == 3
+        tasks = Task.objects.filter(id__in=[result['task'] for result in response.data['results']])
+        assert all(task.pin_id and task.completed_at and task.created_by == admin_user for task in tasks)
+        assert [pin.cell for pin in Pin.objects.order_by('x')] == [
+            cell_for((number + 0.5) / 3, 0.5) for number in range(3)
+        ]
+        assert Pin.objects.get(id=response.data['results'][0]['pin']).label == 'Defect 0'
+        
+        assert ProjectProgress.objects.get(project=project).completed_tasks == 3
+        root = PinCluster.objects.get(blueprint=project.blueprint, level=0)
+        assert (root.pin_count, root.completed_tasks, root.dominant_priority) == (3, 3, 'HIGH')
+        assert Notification.objects.filter(user=admin_user, notification_type='TASK_ASSIGNED').count() == 3
+    
+    def test_query_count_is_constant(self, api_client, admin_user, project):
+        """Test a batch costs the same number of queries whatever its size."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        api_client.force_authenticate(user=admin_user)
+        url = f'/api/projects/{project.id}/create_tasks_from_locations/'
+        counts = []
+        for size in (2, 40):
+            # On one spot, so the cluster rows (and SQLite insert batches) do not grow
+            locations = [{**location, 'x': 0.5} for location in self.locations(size, assigned_to=admin_user.id)]
+            with CaptureQueriesContext(connection) as queries:
+                response = api_client.post(url, {'locations': locations}, format='json')
+            assert response.status_code == status.HTTP_201_CREATED
+            counts.append(len(queries))
+        assert counts[0] == counts[1]
+    
+    def test_invalid_batch_creates_nothing(self, api_client, admin_user, project):
+        """Test the batch is validated as a whole before anything is written."""
+        from tasks.models import Task
+        api_client.force_authenticate(user=admin_user)
+        url = f'/api/projects/{project.id}/create_tasks_from_locations/'
+        locations = self.locations(3)
+        locations[1]['x'] = 1.5
+        locations[2]['assigned_to'] = 999999
+        
+        response = api_client.post(url, {'locations': locations}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'x' in response.data['locations'][1]
+        
+        locations[1]['x'] = 0.5
+        response = api_client.post(url, {'locations': locations}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'assigned_to' in response.data['locations'][2]
+        assert api_client.post(url, {'locations': []}, format='json').status_code == status.HTTP_400_BAD_REQUEST
+        assert not Task.objects.exists() and not Pin.objects.exists()
+    
+    def test_requires_blueprint(self, api_client, admin_user, project):
+        """Test a project without a blueprint is rejected."""
+        project.blueprint.delete()
+        api_client.force_authenticate(user=admin_user)
+        response = api_client.post(
+            f'/api/projects/{project.id}/create_tasks_from_locations/',
+            {'locations': self.locations(1)}, format='json'
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,144 @@
+"""
+Deep-zoom (DZI) tile pyramids for blueprint images.
+
+Level `max_level` is the full-size image and every level below halves it,
+down to a single pixel at level 0. Each level is cut into TILE_SIZE tiles
+(plus TILE_OVERLAP pixels shared with each neighbour) stored as
+`<prefix>/<level>/<col>_<row>.<format>` next to an `image.dzi` descriptor.
+"""
+import io
+import math
+import uuid
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, features
+
+TILE_SIZE = 256
+TILE_OVERLAP = 1
+TILE_QUALITY = 80
+
+# Tiles of a version never change, so clients may keep them for a year
+TILE_CACHE_SECONDS = 365 * 24 * 60 * 60
+
+TILE_CONTENT_TYPES = {
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+}
+
+# Pillow save() format names
+PIL_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
+
+def tile_format():
+    """Configured tile format, falling back to JPEG without WebP support."""
+    name = getattr(settings, 'BLUEPRINT_TILE_FORMAT', 'webp')
+    if name == 'webp' and not features.check('webp'):
+        return 'jpeg'
+    return name
+
+
+def max_level(width, height):
+    return math.ceil(math.log2(max(width, height, 1)))
+
+
+def level_size(width, height, level):
+    """Image size at a pyramid level."""
+    scale = 2 ** (max_level(width, height) - level)
+    return max(1, math.ceil(width / scale)), max(1, math.ceil(height / scale))
+
+
+def tile_box(col, row, width, height):
+    """Crop box of a tile, including its overlap, in a level of the given size."""
+    left = col * TILE_SIZE - (TILE_OVERLAP if col else 0)
+    top = row * TILE_SIZE - (TILE_OVERLAP if row else 0)
+    right = min(width, (col + 1) * TILE_SIZE + TILE_OVERLAP)
+    bottom = min(height, (row + 1) * TILE_SIZE + TILE_OVERLAP)
+    return left, top, right, bottom
+
+
+def tiles_prefix(blueprint_id, version):
+    return f'blueprints/tiles/{blueprint_id}/{version}'
+
+
+def tile_path(blueprint, level, col, row):
+    return (
+        f'{tiles_prefix(blueprint.id, blueprint.tile_version)}'
+        f'/{level}/{col}_{row}.{blueprint.tile_format}'
+    )
+
+
+def dzi_descriptor(width, height, file_format):
+    """Deep Zoom Image XML descriptor."""
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" '
+        f'TileSize="{TILE_SIZE}" Overlap="{TILE_OVERLAP}" Format="{file_format}">'
+        f'<Size Width="{width}" Height="{height}"/></Image>\n'
+    )
+
+
+def _flatten(image):
+    """RGB copy of an image, with transparent areas on white like the paper plan."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def build_pyramid(image, prefix, file_format):
+    """
+    Cut an image into a tile pyramid under a storage prefix.
+
+    Args:
+        image: PIL image at full resolution
+        prefix: Storage path the tiles and image.dzi are written under
+        file_format: Key of TILE_CONTENT_TYPES
+
+    Returns:
+        int: Number of levels
+    """
+    image = _flatten(image)
+    width, height = image.size
+    top = max_level(width, height)
+    default_storage.save(f'{prefix}/image.dzi', ContentFile(dzi_descriptor(width, height, file_format).encode()))
+
+    level_image = image
+    for level in range(top, -1, -1):
+        size = level_size(width, height, level)
+        # Each level is downscaled from the previous one rather than the original
+        if level_image.size != size:
+            level_image = level_image.resize(size, Image.LANCZOS)
+        columns = math.ceil(size[0] / TILE_SIZE)
+        rows = math.ceil(size[1] / TILE_SIZE)
+        for col in range(columns):
+            for row in range(rows):
+                tile = level_image.crop(tile_box(col, row, *size))
+                output = io.BytesIO()
+                tile.save(output, PIL_FORMATS[file_format], quality=TILE_QUALITY)
+                default_storage.save(f'{prefix}/{level}/{col}_{row}.{file_format}', ContentFile(output.getvalue()))
+    return top + 1
+
+
+def delete_tiles(prefix):
+    """Delete every file stored under a tiles prefix."""
+    try:
+        directories, files = default_storage.listdir(prefix)
+    except FileNotFoundError:
+        return
+    for name in files:
+        default_storage.delete(f'{prefix}/{name}')
+    for name in directories:
+        delete_tiles(f'{prefix}/{name}')
+    # Removes the emptied directory on local storage; a no-op on object stores
+    default_storage.delete(prefix)
+
+
+def new_version():
+    """Version token of a pyramid; part of the tile URLs so they can be cached forever."""
+    return uuid.uuid4().hex[:12]
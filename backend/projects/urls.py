@@ -3,8 +3,9 @@ from rest_framework.routers import DefaultRouter
 from .views import ProjectViewSet, PinViewSet
 
 router = DefaultRouter()
-router.register(r'', ProjectViewSet, basename='project')
+# Registered first so /pins/ is not taken for a project id
 router.register(r'pins', PinViewSet, basename='pin')
+router.register(r'', ProjectViewSet, basename='project')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,34 +1,48 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.db.models import Q
-from .models import Project, Blueprint, Pin
+from django.db import transaction
+from django.db.models import Q, Count
+from django.core.files.storage import default_storage
+from django.http import FileResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from .models import Project, ProjectProgress, Blueprint, Pin, PinCluster
 from .serializers import (
     ProjectSerializer, ProjectListSerializer,
-    BlueprintSerializer, PinSerializer
+    BlueprintSerializer, PinSerializer, BulkLocationTaskSerializer
 )
 from accounts.permissions import IsCompanyAdmin, IsContractorOrAdmin, IsProjectManagerOrAdmin
+from utils.response_cache import CachedResponseMixin
+from utils.file_responses import serve_file
+from blobs.models import Blob
+from blobs.views import request_upload
 from django.utils import timezone
 from datetime import timedelta
 from django.conf import settings
-from utils.file_validators import (
-    validate_file_size, validate_mime_type, validate_image_file,
-    get_file_type_from_mime, is_image_file, MAX_BLUEPRINT_SIZE_MB,
-    ALLOWED_BLUEPRINT_MIME_TYPES
+from utils.file_validators import inspect_upload, MAX_BLUEPRINT_SIZE_MB, ALLOWED_BLUEPRINT_MIME_TYPES
+from .tasks import enqueue_blueprint_tiles
+from .bulk import notify_bulk_tasks, log_bulk_tasks, index_bulk_tasks, invalidate_bulk_tasks
+from .spatial import (
+    cell_for, within_bbox, level_ranges, cluster_pins, cluster_level, parse_bbox, parse_zoom,
+    MAX_VIEWPORT_PINS
 )
-from PIL import Image
+from .tiles import tile_path, TILE_SIZE, TILE_OVERLAP, TILE_CACHE_SECONDS, TILE_CONTENT_TYPES
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """
     ViewSet for Project management.
     """
     queryset = Project.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    cache_namespace = 'projects'
+    cache_timeouts = {'list': 60, 'retrieve': 60}
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -36,22 +50,20 @@ class ProjectViewSet(viewsets.ModelViewSet):
         return ProjectSerializer
     
     def get_queryset(self):
-        user = self.request.user
-        if user.is_company_admin:
-            return Project.objects.filter(company=user.company)
-        elif user.is_project_manager:
-            # Project managers see projects from their company
-            return Project.objects.filter(company=user.company)
-        elif user.is_contractor:
-            return Project.objects.filter(contractor=user.contractor)
-        elif user.is_worker:
-            # Workers see projects where they have tasks
-            from tasks.models import Task
-            project_ids = Task.objects.filter(
-                assigned_to=user
-            ).values_list('project_id', flat=True).distinct()
-            return Project.objects.filter(id__in=project_ids)
-        return Project.objects.none()
+        queryset = Project.visible_to(self.request.user)
+        
+        if self.action == 'list':
+            return ProjectListSerializer.setup_eager_loading(queryset)
+        if self.action == 'retrieve':
+            return ProjectSerializer.setup_eager_loading(queryset)
+        if self.action in ('blueprint_tiles', 'blueprint_tile', 'download_blueprint'):
+            return queryset.select_related('blueprint')
+        # Progress rollup is read alongside the project row
+        return queryset.select_related('progress')
+    
+    def _eager_blueprint(self, blueprint):
+        """Reload a blueprint with its pins and their tasks for serialization."""
+        return BlueprintSerializer.setup_eager_loading(Blueprint.objects.filter(pk=blueprint.pk)).get()
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -68,41 +80,42 @@ class ProjectViewSet(viewsets.ModelViewSet):
         """Upload or replace a blueprint for the project."""
         project = self.get_object()
         
-        file = request.FILES.get('file')
+        # A multipart file, or a finalized resumable upload
+        file, session = request_upload(request)
         if not file:
             return Response(
                 {"error": "No file provided."},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Validate file size
-        validate_file_size(file, MAX_BLUEPRINT_SIZE_MB)
-        
-        # Validate MIME type
-        validate_mime_type(file, ALLOWED_BLUEPRINT_MIME_TYPES)
-        
-        # If it's an image, validate it's a real image and get dimensions
-        if is_image_file(file):
-            validate_image_file(file)
-        
-        # Get file type from MIME
-        file_type = get_file_type_from_mime(file)
+        # Size, type, hash and image dimensions in one pass over the file
+        info = inspect_upload(file, ALLOWED_BLUEPRINT_MIME_TYPES, MAX_BLUEPRINT_SIZE_MB)
         
         # Set review deadline (10 days or configurable)
         review_days = getattr(settings, 'DOCUMENT_REVIEW_TIMER_DAYS', 10)
         review_deadline = timezone.now() + timedelta(days=review_days)
         
+        # Identical files are stored once
+        blob = Blob.store(file, digest=info.sha256)
+        if session:
+            session.discard()
+        
         # Check if blueprint already exists
         if hasattr(project, 'blueprint'):
             # Update existing blueprint
             blueprint = project.blueprint
-            # Store old file path before replacing
+            # Store old file path before replacing; blob files are shared and
+            # deleted by the blob collector once unreferenced
             old_file = blueprint.file
-            old_file_path = old_file.path if old_file else None
+            old_file_path = old_file.path if old_file and not blueprint.blob_id else None
             
             # Assign new file first
-            blueprint.file = file
-            blueprint.file_type = file_type
+            blueprint.file = blob.file.name
+            blueprint.blob = blob
+            blueprint.file_type = info.file_type
+            # PDF sizes are set when the first page is rendered
+            blueprint.width = info.width
+            blueprint.height = info.height
             blueprint.uploaded_by = request.user
             blueprint.review_status = 'PENDING'  # Reset to pending when replaced
             blueprint.review_deadline = review_deadline
@@ -110,6 +123,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             blueprint.reviewed_at = None
             blueprint.review_notes = ''
             blueprint.uploaded_at = timezone.now()
+            blueprint.tile_status = 'PENDING'
             blueprint.save()
             
             # Try to delete old file after saving new one
@@ -127,10 +141,10 @@ class ProjectViewSet(viewsets.ModelViewSet):
                         os.remove(old_file_path)
                 except (PermissionError, OSError) as e:
                     # Log the error but don't fail the request
-                    # The new file is already saved, old file will be cleaned up later
+                    # The new file is already saved; collect_orphaned_media removes the old one
                     logger.warning(
                         f"Could not delete old blueprint file {old_file_path}: {e}. "
-                        "File may be in use. It will be cleaned up later."
+                        "File may be in use. It will be removed by the orphaned media collector."
                     )
             
             created = False
@@ -138,33 +152,98 @@ class ProjectViewSet(viewsets.ModelViewSet):
             # Create new blueprint
             blueprint = Blueprint.objects.create(
                 project=project,
-                file=file,
-                file_type=file_type,
+                file=blob.file.name,
+                blob=blob,
+                file_type=info.file_type,
+                width=info.width,
+                height=info.height,
                 uploaded_by=request.user,
                 review_status='PENDING',
-                review_deadline=review_deadline
+                review_deadline=review_deadline,
+                tile_status='PENDING'
             )
             created = True
         
-        # If it's an image, get dimensions
-        if is_image_file(file):
-            try:
-                img = Image.open(blueprint.file)
-                blueprint.width, blueprint.height = img.size
-                blueprint.save()
-            except Exception as e:
-                logger.warning(
-                    f"Failed to extract image dimensions for blueprint {blueprint.id}: {e}",
-                    exc_info=True
-                )
+        # Tiles (and the page images of PDFs) are rendered in the background
+        blueprint_id = blueprint.id
+        transaction.on_commit(lambda: enqueue_blueprint_tiles(blueprint_id))
         
-        # Send notifications to Company Admin and Consultant
-        from notifications.signals import blueprint_uploaded
-        blueprint_uploaded.send(sender=Blueprint, instance=blueprint, created=created)
+        # Company Admin and Consultant are notified by the Blueprint post_save receiver
         
-        serializer = BlueprintSerializer(blueprint)
+        serializer = BlueprintSerializer(self._eager_blueprint(blueprint))
         return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
     
+    @action(detail=True, methods=['get'])
+    def blueprint_tiles(self, request, pk=None):
+        """
+        Deep-zoom tile pyramid of the project blueprint.
+        Clients fetch only the tiles of their viewport from `tile_url`.
+        """
+        project = self.get_object()
+        if not hasattr(project, 'blueprint'):
+            return Response(
+                {"error": "No blueprint found."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        blueprint = project.blueprint
+        data = {'status': blueprint.tile_status}
+        if blueprint.tile_status == 'READY':
+            base = reverse('project-blueprint-tiles', kwargs={'pk': project.pk})
+            data.update({
+                'width': blueprint.width,
+                'height': blueprint.height,
+                'tile_size': TILE_SIZE,
+                'overlap': TILE_OVERLAP,
+                'format': blueprint.tile_format,
+                'levels': blueprint.tile_levels,
+                'tile_url': request.build_absolute_uri(f'{base}{blueprint.tile_version}/')
+                + '{level}/{col}_{row}/',
+            })
+        return Response(data)
+    
+    @action(
+        detail=True,
+        methods=['get'],
+        url_path=r'blueprint_tiles/(?P<version>[0-9a-f]+)/(?P<level>[0-9]+)/(?P<col>[0-9]+)_(?P<row>[0-9]+)',
+        url_name='blueprint-tile'
+    )
+    def blueprint_tile(self, request, version, level, col, row, pk=None):
+        """A single blueprint tile; tile URLs are versioned, so they are cached for good."""
+        project = self.get_object()
+        blueprint = project.blueprint if hasattr(project, 'blueprint') else None
+        if not blueprint or blueprint.tile_status != 'READY' or blueprint.tile_version != version:
+            return Response(
+                {"error": "Tile not found."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        try:
+            tile = default_storage.open(tile_path(blueprint, int(level), int(col), int(row)))
+        except FileNotFoundError:
+            return Response(
+                {"error": "Tile not found."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        response = FileResponse(tile, content_type=TILE_CONTENT_TYPES[blueprint.tile_format])
+        patch_cache_control(response, private=True, max_age=TILE_CACHE_SECONDS, immutable=True)
+        return response
+    
+    @action(detail=True, methods=['get'])
+    def download_blueprint(self, request, pk=None):
+        """Download the original blueprint file."""
+        project = self.get_object()
+        if not hasattr(project, 'blueprint'):
+            return Response(
+                {"error": "No blueprint found."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        blueprint = project.blueprint
+        extension = os.path.splitext(blueprint.file.name)[1]
+        return serve_file(request, blueprint.file, f'{project.name} blueprint{extension}')
+    
     @action(detail=True, methods=['post'])
     def approve_blueprint(self, request, pk=None):
         """Approve a blueprint (Company Admin or Consultant only)."""
@@ -210,7 +289,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             object_id=blueprint.id
         )
         
-        serializer = BlueprintSerializer(blueprint)
+        serializer = BlueprintSerializer(self._eager_blueprint(blueprint))
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
@@ -258,7 +337,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             object_id=blueprint.id
         )
         
-        serializer = BlueprintSerializer(blueprint)
+        serializer = BlueprintSerializer(self._eager_blueprint(blueprint))
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
@@ -306,7 +385,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             object_id=blueprint.id
         )
         
-        serializer = BlueprintSerializer(blueprint)
+        serializer = BlueprintSerializer(self._eager_blueprint(blueprint))
         return Response(serializer.data)
     
     @action(detail=True, methods=['delete'])
@@ -430,35 +509,87 @@ class ProjectViewSet(viewsets.ModelViewSet):
             'message': 'Task created successfully from blueprint location.'
         }, status=status.HTTP_201_CREATED)
     
+    @action(detail=True, methods=['post'])
+    def create_tasks_from_locations(self, request, pk=None):
+        """
+        Bulk create_task_from_location: create a pin and a task for each of
+        up to MAX_BULK_LOCATIONS `locations` in one transaction.
+        Rows are inserted with bulk_create, so the work of the Pin and Task
+        signals is done here once for the whole batch.
+        """
+        project = self.get_object()
+        if not hasattr(project, 'blueprint'):
+            return Response(
+                {"error": "No blueprint found for this project. Please upload a blueprint first."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        serializer = BulkLocationTaskSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        locations = serializer.validated_data['locations']
+        blueprint = project.blueprint
+        
+        from tasks.models import Task
+        now = timezone.now()
+        with transaction.atomic():
+            # Pin.save() is bypassed, so the quadtree cell is set here
+            pins = Pin.objects.bulk_create(
+                Pin(
+                    blueprint=blueprint, x=location['x'], y=location['y'],
+                    cell=cell_for(location['x'], location['y']),
+                    label=location.get('pin_label', location['title'])
+                )
+                for location in locations
+            )
+            tasks = Task.objects.bulk_create(
+                Task(
+                    project=project,
+                    pin=pin,
+                    title=location['title'],
+                    description=location['description'],
+                    priority=location['priority'],
+                    status=location['status'],
+                    department_id=location['department'],
+                    assigned_to_id=location['assigned_to'],
+                    estimated_hours=location['estimated_hours'],
+                    due_date=location['due_date'],
+                    # Task.save() sets these from the status
+                    started_at=now if location['status'] == 'IN_PROGRESS' else None,
+                    completed_at=now if location['status'] == 'COMPLETED' else None,
+                    created_by=request.user
+                )
+                for pin, location in zip(pins, locations)
+            )
+            ProjectProgress.recalculate(project.id)
+            PinCluster.rebuild(blueprint.id)
+            notify_bulk_tasks(project, tasks)
+            log_bulk_tasks(project, tasks)
+            index_bulk_tasks(tasks)
+        
+        invalidate_bulk_tasks(project, tasks)
+        
+        return Response({
+            'created': len(tasks),
+            'results': [{'pin': pin.id, 'task': task.id} for pin, task in zip(pins, tasks)],
+            'message': f'{len(tasks)} task(s) created successfully from blueprint locations.'
+        }, status=status.HTTP_201_CREATED)
+    
     @action(detail=True, methods=['get'])
     def statistics(self, request, pk=None):
         """Get project statistics."""
         project = self.get_object()
-        from tasks.models import Task
-        from django.db.models import Count, Avg
-        
-        tasks = Task.objects.filter(project=project)
-        total_tasks = tasks.count()
-        completed_tasks = tasks.filter(status='COMPLETED').count()
-        in_progress_tasks = tasks.filter(status='IN_PROGRESS').count()
-        pending_tasks = tasks.filter(status='PENDING').count()
-        delayed_tasks = tasks.filter(status='DELAYED').count()
-        
-        # Time tracking stats
-        time_stats = tasks.aggregate(
-            total_estimated_hours=Avg('estimated_hours'),
-            total_actual_hours=Avg('actual_hours')
-        )
+        progress = ProjectProgress.for_project(project)
         
         return Response({
-            'total_tasks': total_tasks,
-            'completed_tasks': completed_tasks,
-            'in_progress_tasks': in_progress_tasks,
-            'pending_tasks': pending_tasks,
-            'delayed_tasks': delayed_tasks,
-            'progress_percentage': round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 2),
-            'avg_estimated_hours': time_stats['total_estimated_hours'] or 0,
-            'avg_actual_hours': time_stats['total_actual_hours'] or 0,
+            'total_tasks': progress.total_tasks,
+            'completed_tasks': progress.completed_tasks,
+            'in_progress_tasks': progress.in_progress_tasks,
+            'pending_tasks': progress.pending_tasks,
+            'delayed_tasks': progress.delayed_tasks,
+            'progress_percentage': progress.progress_percentage,
+            'avg_estimated_hours': progress.avg_estimated_hours,
+            'avg_actual_hours': progress.avg_actual_hours,
+            'last_task_change_at': progress.last_task_change_at,
         })
 
 
@@ -470,12 +601,112 @@ class PinViewSet(viewsets.ModelViewSet):
     serializer_class = PinSerializer
     permission_classes = [permissions.IsAuthenticated, IsContractorOrAdmin]
     
+    def blueprint_id(self):
+        """
+        The ?blueprint= id, or None if it is missing.
+
+        Raises:
+            ValidationError: If it is not an integer
+        """
+        blueprint_id = self.request.query_params.get('blueprint')
+        if not blueprint_id:
+            return None
+        try:
+            return int(blueprint_id)
+        except ValueError:
+            raise ValidationError({"blueprint": "blueprint must be an integer."})
+    
     def get_queryset(self):
-        blueprint_id = self.request.query_params.get('blueprint', None)
-        if blueprint_id:
-            return Pin.objects.filter(blueprint_id=blueprint_id)
-        return Pin.objects.none()
+        blueprint_id = self.blueprint_id()
+        if blueprint_id is None:
+            return Pin.objects.none()
+        # Only blueprints of the projects the user can see
+        queryset = Pin.objects.filter(
+            blueprint_id=blueprint_id, blueprint__project__in=Project.visible_to(self.request.user)
+        )
+        if self.action == 'viewport':
+            return queryset
+        if self.action == 'list' and self.request.query_params.get('bbox'):
+            queryset = within_bbox(queryset, parse_bbox(self.request.query_params['bbox']))
+        return PinSerializer.setup_eager_loading(queryset)
     
     def perform_create(self, serializer):
         serializer.save()
+    
+    @action(detail=False, methods=['get'])
+    def viewport(self, request):
+        """
+        Pins of a blueprint visible in ?bbox=x0,y0,x1,y1 (normalized, default
+        the whole blueprint) at ?zoom= (the view spans ~1/2^zoom of the plan).
+        Up to MAX_VIEWPORT_PINS pins are returned as is; denser views are
+        clustered on the quadtree so the payload stays bounded.
+        """
+        if not request.query_params.get('blueprint'):
+            return Response(
+                {"error": "blueprint is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        bbox = parse_bbox(request.query_params.get('bbox'))
+        zoom = parse_zoom(request.query_params.get('zoom'))
+        visible = within_bbox(self.get_queryset(), bbox)
+        
+        # One extra row tells whether the view has to be clustered
+        pins = list(
+            visible.annotate(task_count=Count('tasks'))
+            .order_by('cell', 'id')
+            .values('id', 'x', 'y', 'label', 'task_count')[:MAX_VIEWPORT_PINS + 1]
+        )
+        data = {'bbox': list(bbox), 'zoom': zoom}
+        if len(pins) <= MAX_VIEWPORT_PINS:
+            data.update(clustered=False, count=len(pins), pins=pins, clusters=[])
+        else:
+            clusters = cluster_pins(visible, cluster_level(bbox, zoom))
+            data.update(
+                clustered=True, count=sum(cluster['count'] for cluster in clusters),
+                pins=[], clusters=clusters
+            )
+        return Response(data)
+    
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        """
+        Precomputed pin clusters of a blueprint in ?bbox= at ?zoom=, with task
+        counts by status and the dominant priority, for heat-map overviews.
+        Read from PinCluster in one query, whatever the number of pins.
+        """
+        blueprint_id = self.blueprint_id()
+        if blueprint_id is None:
+            return Response(
+                {"error": "blueprint is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        bbox = parse_bbox(request.query_params.get('bbox'))
+        zoom = parse_zoom(request.query_params.get('zoom'))
+        level = min(cluster_level(bbox, zoom), PinCluster.MAX_LEVEL)
+        
+        in_cells = Q()
+        for start, end in level_ranges(bbox, level):
+            in_cells |= Q(cell__gte=start, cell__lt=end)
+        clusters = PinCluster.objects.filter(
+            in_cells, blueprint_id=blueprint_id, level=level,
+            blueprint__project__in=Project.visible_to(request.user)
+        ).order_by('cell')
+        data = []
+        for cluster in clusters:
+            x, y = cluster.center
+            data.append({
+                'cell': cluster.cell,
+                'x': x,
+                'y': y,
+                'count': cluster.pin_count,
+                'task_count': cluster.task_count,
+                'tasks_by_status': {
+                    name: getattr(cluster, field) for name, field in PinCluster.STATUS_FIELDS.items()
+                },
+                'dominant_priority': cluster.dominant_priority,
+            })
+        return Response({
+            'bbox': list(bbox), 'zoom': zoom, 'level': level,
+            'count': sum(cluster['count'] for cluster in data), 'clusters': data
+        })
 
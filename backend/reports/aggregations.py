@@ -0,0 +1,107 @@
+"""
+Aggregation helpers for report endpoints.
+Every KPI is computed with conditional aggregation so the number of
+queries stays fixed regardless of the reporting horizon.
+"""
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+DEFAULT_DASHBOARD_MONTHS = 12
+MAX_DASHBOARD_MONTHS = 120
+
+
+def month_starts(months, now=None):
+    """
+    Get the first instant of each of the last `months` calendar months.
+    
+    Args:
+        months: Number of months, the current month included
+        now: Reference datetime (defaults to now)
+        
+    Returns:
+        list: Aware datetimes in the current timezone, oldest first
+    """
+    now = timezone.localtime(now or timezone.now())
+    year, month = now.year, now.month
+    starts = []
+    for _ in range(months):
+        starts.append(now.replace(
+            year=year, month=month, day=1,
+            hour=0, minute=0, second=0, microsecond=0
+        ))
+        month -= 1
+        if month == 0:
+            month = 12
+            year -= 1
+    return starts[::-1]
+
+
+def progress_over_time(projects, tasks, months=DEFAULT_DASHBOARD_MONTHS):
+    """
+    Cumulative project/task progress per month, bucketed by project creation month.
+    
+    Uses three queries whatever the horizon: a baseline for everything created
+    before the window, plus one TruncMonth-grouped query each for projects and tasks.
+    
+    Args:
+        projects: Scoped Project queryset
+        tasks: Scoped Task queryset
+        months: Number of months to return
+        
+    Returns:
+        list: One dict per month, oldest first
+    """
+    starts = month_starts(months)
+    window_start = starts[0]
+    
+    baseline = tasks.aggregate(
+        total=Count('id', filter=Q(project__created_at__lt=window_start)),
+        completed=Count('id', filter=Q(project__created_at__lt=window_start, status='COMPLETED')),
+    )
+    baseline['projects'] = projects.filter(created_at__lt=window_start).count()
+    
+    project_rows = (
+        projects.filter(created_at__gte=window_start)
+        .annotate(month=TruncMonth('created_at'))
+        .order_by('month')
+        .values('month')
+        .annotate(count=Count('id'))
+    )
+    projects_by_month = {row['month'].strftime('%Y-%m'): row['count'] for row in project_rows}
+    
+    task_rows = (
+        tasks.filter(project__created_at__gte=window_start)
+        .annotate(month=TruncMonth('project__created_at'))
+        .order_by('month')
+        .values('month')
+        .annotate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(status='COMPLETED')),
+        )
+    )
+    tasks_by_month = {row['month'].strftime('%Y-%m'): row for row in task_rows}
+    
+    total_projects = baseline['projects']
+    total_tasks = baseline['total']
+    completed_tasks = baseline['completed']
+    
+    series = []
+    for month_start in starts:
+        key = month_start.strftime('%Y-%m')
+        total_projects += projects_by_month.get(key, 0)
+        month_tasks = tasks_by_month.get(key)
+        if month_tasks:
+            total_tasks += month_tasks['total']
+            completed_tasks += month_tasks['completed']
+        
+        series.append({
+            'month': key,
+            'month_name': month_start.strftime('%b %Y'),
+            'total_projects': total_projects,
+            'avg_progress': round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 2),
+            'total_tasks': total_tasks,
+            'completed_tasks': completed_tasks,
+        })
+    
+    return series
@@ -0,0 +1,86 @@
+"""
+Versioned cache for report results.
+
+Cached reports are keyed by data scope, report name, normalized params and
+the scope's data version (see utils/cache_versions.py), which writes to the
+underlying models bump from reports/signals.py.
+"""
+import hashlib
+import json
+from django.core.cache import cache
+from utils.cache_versions import get_version, invalidate
+from .queries import scope_key
+from .generators import generate_report, normalize_params
+
+# Seconds a computed report is kept
+REPORT_CACHE_TIMEOUT = 300
+
+REPORTS_NAMESPACE = 'reports'
+
+HITS_KEY = 'reports:cache:hits'
+MISSES_KEY = 'reports:cache:misses'
+
+
+def version_tenant(scope):
+    """Tenant whose data version applies to a scope_key(); None (not cached) for per-user scopes."""
+    if scope.startswith(('company:', 'contractor:')):
+        return scope
+    return None
+
+
+def invalidate_reports(*tenants):
+    """Invalidate cached reports of the given tenants."""
+    invalidate([REPORTS_NAMESPACE], *tenants)
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def report_cache_key(report, scope, version, params):
+    params_hash = hashlib.sha256(
+        json.dumps(normalize_params(params), sort_keys=True).encode()
+    ).hexdigest()[:16]
+    return f"reports:result:{report}:{scope}:{version}:{params_hash}"
+
+
+def get_cached_report(report, user, params):
+    """
+    Serve a report from the cache, computing and storing it on a miss.
+
+    Returns:
+        tuple: (data, hit)
+    """
+    scope = scope_key(user)
+    tenant = version_tenant(scope)
+    if tenant is None:
+        return generate_report(report, user, params), False
+    # Read the version first: if a write lands while the report is computed,
+    # the result is stored under the old version and never served.
+    version = get_version(REPORTS_NAMESPACE, tenant)
+    key = report_cache_key(report, scope, version, params)
+
+    data = cache.get(key)
+    if data is not None:
+        _count(HITS_KEY)
+        return data, True
+
+    _count(MISSES_KEY)
+    data = generate_report(report, user, params)
+    cache.set(key, data, REPORT_CACHE_TIMEOUT)
+    return data, False
+
+
+def cache_stats():
+    """Hit/miss counters and hit ratio of the report cache."""
+    hits = cache.get(HITS_KEY) or 0
+    misses = cache.get(MISSES_KEY) or 0
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
@@ -0,0 +1,224 @@
+"""
+Streaming report exports (CSV, XLSX, PDF).
+Rows are produced one at a time from a server-side cursor and written
+straight to the output, so memory use does not grow with the report size.
+"""
+import csv
+import tempfile
+from django.http import StreamingHttpResponse, FileResponse
+from django.utils import timezone
+from projects.models import ProjectProgress
+from .queries import (
+    project_progress_queryset, time_entry_queryset,
+    budget_queryset, budget_row, department_queryset, department_row
+)
+
+# Rows fetched per round trip from the database cursor
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+}
+
+
+class ReportExport:
+    """
+    A report ready to be written: a title, column headers and a lazy row iterator.
+    """
+    def __init__(self, name, title, headers, rows):
+        self.name = name
+        self.title = title
+        self.headers = headers
+        self.rows = rows
+
+    def filename(self, file_format):
+        return f"{self.name}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{file_format}"
+
+
+def _project_progress_rows(user, params):
+    projects = project_progress_queryset(user, params.get('project_id'))
+    for project in projects.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        # Same figures as the JSON report, building a missing rollup
+        progress = ProjectProgress.for_project(project)
+        yield [
+            project.id, project.name, project.status, progress.total_tasks,
+            progress.completed_tasks, progress.progress_percentage,
+            project.start_date, project.end_date,
+        ]
+
+
+def _time_tracking_rows(user, params):
+    time_entries = time_entry_queryset(
+        user,
+        project_id=params.get('project_id'),
+        start_date=params.get('start_date'),
+        end_date=params.get('end_date'),
+    ).order_by('date', 'id').values_list(
+        'date', 'task__project__name', 'task__title', 'user__username', 'hours', 'notes'
+    )
+    for row in time_entries.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield list(row)
+
+
+def _budget_rows(user, params):
+    for project in budget_queryset(user).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = budget_row(project)
+        yield [
+            row['project_id'], row['project_name'], row['estimated_budget'],
+            row['actual_budget'], row['total_hours'], row['calculated_cost'], row['variance'],
+        ]
+
+
+def _department_rows(user, params):
+    for dept in department_queryset(user).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = department_row(dept)
+        yield [
+            row['department_id'], row['department_name'], row['contractor_name'],
+            row['total_tasks'], row['completed_tasks'], row['completion_rate'],
+            row['total_hours'], row['member_count'],
+        ]
+
+
+EXPORTABLE_REPORTS = {
+    'project_progress': (
+        'Project Progress',
+        ['Project ID', 'Project', 'Status', 'Total Tasks', 'Completed Tasks',
+         'Progress %', 'Start Date', 'End Date'],
+        _project_progress_rows,
+    ),
+    'time_tracking': (
+        'Time Tracking',
+        ['Date', 'Project', 'Task', 'User', 'Hours', 'Notes'],
+        _time_tracking_rows,
+    ),
+    'budget_vs_actual': (
+        'Budget vs Actual',
+        ['Project ID', 'Project', 'Estimated Budget', 'Actual Budget', 'Total Hours',
+         'Calculated Cost', 'Variance'],
+        _budget_rows,
+    ),
+    'department_performance': (
+        'Department Performance',
+        ['Department ID', 'Department', 'Contractor', 'Total Tasks', 'Completed Tasks',
+         'Completion Rate %', 'Total Hours', 'Members'],
+        _department_rows,
+    ),
+}
+
+
+def build_export(report, user, params):
+    """
+    Build a lazy export for one of EXPORTABLE_REPORTS.
+
+    Args:
+        report: Report name (key of EXPORTABLE_REPORTS)
+        user: User whose scope applies
+        params: Mapping of report filters (project_id, start_date, end_date)
+
+    Returns:
+        ReportExport: Nothing is queried until rows are consumed
+    """
+    title, headers, row_builder = EXPORTABLE_REPORTS[report]
+    return ReportExport(report, title, headers, row_builder(user, params))
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer streaming."""
+    def write(self, value):
+        return value
+
+
+def iter_csv(export):
+    """Yield CSV lines one row at a time."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(export.headers)
+    for row in export.rows:
+        yield writer.writerow(row)
+
+
+def write_csv(export, fileobj):
+    """Write the export as CSV to a binary file object."""
+    for line in iter_csv(export):
+        fileobj.write(line.encode('utf-8'))
+
+
+def write_xlsx(export, fileobj):
+    """Write the export with a write-only openpyxl workbook (rows are not kept in memory)."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=export.title[:31])
+    sheet.append(export.headers)
+    for row in export.rows:
+        sheet.append(row)
+    workbook.save(fileobj)
+
+
+def write_pdf(export, fileobj):
+    """Write the export as a paginated PDF table, drawing rows as they arrive."""
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from reportlab.pdfgen import canvas
+
+    page_width, page_height = landscape(A4)
+    margin = 36
+    line_height = 14
+    font, font_size = 'Helvetica', 8
+    column_width = (page_width - 2 * margin) / len(export.headers)
+
+    def fit(value):
+        text = '' if value is None else str(value)
+        while text and stringWidth(text, font, font_size) > column_width - 4:
+            text = text[:-1]
+        return text
+
+    pdf = canvas.Canvas(fileobj, pagesize=(page_width, page_height))
+
+    def start_page():
+        pdf.setFont('Helvetica-Bold', 12)
+        pdf.drawString(margin, page_height - margin, export.title)
+        pdf.setFont('Helvetica-Bold', font_size)
+        y = page_height - margin - 2 * line_height
+        for index, header in enumerate(export.headers):
+            pdf.drawString(margin + index * column_width, y, fit(header))
+        pdf.setFont(font, font_size)
+        return y - line_height
+
+    y = start_page()
+    for row in export.rows:
+        if y < margin:
+            pdf.showPage()
+            y = start_page()
+        for index, value in enumerate(row):
+            pdf.drawString(margin + index * column_width, y, fit(value))
+        y -= line_height
+    pdf.save()
+
+
+EXPORT_WRITERS = {
+    'csv': write_csv,
+    'xlsx': write_xlsx,
+    'pdf': write_pdf,
+}
+
+
+def export_response(export, file_format):
+    """
+    Build the HTTP response for an export.
+    CSV is streamed line by line; XLSX/PDF are spooled to a temporary file
+    (both formats need a seekable output) and sent back in chunks.
+    """
+    filename = export.filename(file_format)
+    content_type = EXPORT_FORMATS[file_format]
+
+    if file_format == 'csv':
+        response = StreamingHttpResponse(iter_csv(export), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    output = tempfile.TemporaryFile()
+    EXPORT_WRITERS[file_format](export, output)
+    output.seek(0)
+    return FileResponse(output, as_attachment=True, filename=filename, content_type=content_type)
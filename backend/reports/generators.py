@@ -0,0 +1,254 @@
+"""
+Report generators.
+Each generator takes the requesting user and a mapping of query params and
+returns JSON-serializable data, so reports can be served inline by
+ReportsViewSet or computed in the background by a ReportJob.
+"""
+from django.db.models import Count, Sum, Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from projects.models import Project, ProjectProgress, Blueprint
+from tasks.models import Task
+from documents.models import Document
+from .queries import (
+    project_progress_queryset, time_entry_queryset,
+    budget_queryset, budget_row, department_queryset, department_row
+)
+from .aggregations import progress_over_time, DEFAULT_DASHBOARD_MONTHS, MAX_DASHBOARD_MONTHS
+
+# Query params understood by the reports; anything else is ignored
+REPORT_PARAMS = ['project_id', 'start_date', 'end_date', 'months']
+
+
+def normalize_params(params):
+    """
+    Keep only known report params, as non-empty strings with a stable order.
+    Used for cache and job deduplication keys.
+    """
+    normalized = {}
+    for name in REPORT_PARAMS:
+        value = params.get(name)
+        if value not in (None, ''):
+            normalized[name] = str(value).strip()
+    return normalized
+
+
+def parse_months(value):
+    """
+    Validate the dashboard `months` param.
+
+    Raises:
+        ValidationError: If it is not an integer between 1 and MAX_DASHBOARD_MONTHS
+    """
+    if value in (None, ''):
+        return DEFAULT_DASHBOARD_MONTHS
+    try:
+        months = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({"months": "months must be an integer."})
+    if not 1 <= months <= MAX_DASHBOARD_MONTHS:
+        raise ValidationError({"months": f"months must be between 1 and {MAX_DASHBOARD_MONTHS}."})
+    return months
+
+
+def project_progress(user, params):
+    """Project progress report."""
+    projects = project_progress_queryset(user, params.get('project_id'))
+
+    # Progress comes from the pre-aggregated rollup joined in the same query
+    data = []
+    for project in projects:
+        progress = ProjectProgress.for_project(project)
+
+        data.append({
+            'project_id': project.id,
+            'project_name': project.name,
+            'status': project.status,
+            'total_tasks': progress.total_tasks,
+            'completed_tasks': progress.completed_tasks,
+            'progress_percentage': progress.progress_percentage,
+            'start_date': project.start_date,
+            'end_date': project.end_date,
+        })
+
+    return data
+
+
+def time_tracking(user, params):
+    """Time tracking report."""
+    time_entries = time_entry_queryset(
+        user,
+        project_id=params.get('project_id'),
+        start_date=params.get('start_date'),
+        end_date=params.get('end_date'),
+    )
+
+    # Aggregate by task
+    task_stats = time_entries.values('task__id', 'task__title').annotate(
+        total_hours=Sum('hours'),
+        entry_count=Count('id')
+    )
+
+    # Aggregate by project
+    project_stats = time_entries.values('task__project__id', 'task__project__name').annotate(
+        total_hours=Sum('hours'),
+        entry_count=Count('id')
+    )
+
+    return {
+        'by_task': list(task_stats),
+        'by_project': list(project_stats),
+        'total_hours': time_entries.aggregate(total=Sum('hours'))['total'] or 0,
+        'total_entries': time_entries.count(),
+    }
+
+
+def budget_vs_actual(user, params):
+    """Budget vs actual spending report."""
+    return [budget_row(project) for project in budget_queryset(user)]
+
+
+def document_approval_timeline(user, params):
+    """Document approval timeline report."""
+    project_id = params.get('project_id')
+
+    if user.is_company_admin:
+        documents = Document.objects.filter(project__company=user.company)
+    elif user.is_contractor:
+        documents = Document.objects.filter(
+            Q(contractor=user.contractor) | Q(project__contractor=user.contractor)
+        )
+    else:
+        documents = Document.objects.none()
+
+    if project_id:
+        documents = documents.filter(project_id=project_id)
+
+    # Group by status
+    status_counts = documents.values('status').annotate(count=Count('id'))
+
+    # Overdue documents
+    overdue = documents.filter(
+        review_deadline__lt=timezone.now(),
+        status='PENDING'
+    ).count()
+
+    # Average review time
+    reviewed_docs = documents.filter(reviewed_at__isnull=False)
+    avg_review_time = None
+    if reviewed_docs.exists():
+        review_times = []
+        for doc in reviewed_docs:
+            if doc.uploaded_at and doc.reviewed_at:
+                delta = doc.reviewed_at - doc.uploaded_at
+                review_times.append(delta.total_seconds() / 3600)  # Convert to hours
+        if review_times:
+            avg_review_time = sum(review_times) / len(review_times)
+
+    return {
+        'status_breakdown': list(status_counts),
+        'overdue_count': overdue,
+        'total_documents': documents.count(),
+        'average_review_time_hours': round(avg_review_time, 2) if avg_review_time else None,
+    }
+
+
+def department_performance(user, params):
+    """Department performance report."""
+    return [department_row(dept) for dept in department_queryset(user)]
+
+
+def dashboard_summary(user, params):
+    """
+    Dashboard summary statistics.
+    The number of queries is fixed, whatever the `months` horizon.
+    """
+    months = parse_months(params.get('months'))
+
+    if user.is_company_admin:
+        projects = Project.objects.filter(company=user.company)
+        tasks = Task.objects.filter(project__company=user.company)
+    elif user.is_contractor:
+        projects = Project.objects.filter(contractor=user.contractor)
+        tasks = Task.objects.filter(project__contractor=user.contractor)
+    elif user.is_worker:
+        # Subquery instead of a join so project rows are not duplicated per task
+        projects = Project.objects.filter(
+            id__in=Task.objects.filter(assigned_to=user).values('project_id')
+        )
+        tasks = Task.objects.filter(assigned_to=user)
+    elif user.is_consultant:
+        projects = Project.objects.filter(consultant=user)
+        tasks = Task.objects.filter(project__consultant=user)
+    else:
+        projects = Project.objects.none()
+        tasks = Task.objects.none()
+
+    now = timezone.now()
+
+    project_stats = projects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(status='IN_PROGRESS')),
+    )
+    task_stats = tasks.aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='COMPLETED')),
+        pending=Count('id', filter=Q(status='PENDING')),
+        delayed=Count('id', filter=Q(status='DELAYED')),
+    )
+
+    # Pending documents
+    document_stats = Document.objects.filter(
+        project__in=projects, status='PENDING'
+    ).aggregate(
+        pending=Count('id'),
+        overdue=Count('id', filter=Q(review_deadline__lt=now)),
+    )
+
+    # Pending blueprints
+    blueprint_stats = Blueprint.objects.filter(
+        project__in=projects, review_status='PENDING'
+    ).aggregate(
+        pending=Count('id'),
+        overdue=Count('id', filter=Q(review_deadline__lt=now)),
+    )
+
+    # Project status breakdown
+    project_status_breakdown = projects.order_by().values('status').annotate(count=Count('id'))
+
+    return {
+        'total_projects': project_stats['total'],
+        'active_projects': project_stats['active'],
+        'total_tasks': task_stats['total'],
+        'completed_tasks': task_stats['completed'],
+        'pending_tasks': task_stats['pending'],
+        'overdue_tasks': task_stats['delayed'],
+        'pending_documents': document_stats['pending'],
+        'overdue_documents': document_stats['overdue'],
+        'pending_blueprints': blueprint_stats['pending'],
+        'overdue_blueprints': blueprint_stats['overdue'],
+        'project_status_breakdown': list(project_status_breakdown),
+        'progress_over_time': progress_over_time(projects, tasks, months),
+    }
+
+
+REPORT_GENERATORS = {
+    'project_progress': project_progress,
+    'time_tracking': time_tracking,
+    'budget_vs_actual': budget_vs_actual,
+    'document_approval_timeline': document_approval_timeline,
+    'department_performance': department_performance,
+    'dashboard_summary': dashboard_summary,
+}
+
+
+def generate_report(report, user, params):
+    """
+    Run a report generator.
+
+    Args:
+        report: Report name (key of REPORT_GENERATORS)
+        user: User whose scope applies
+        params: Mapping of query params
+    """
+    return REPORT_GENERATORS[report](user, params)
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:05
+
+from django.conf import settings
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope_key', models.CharField(help_text='Data scope the report is computed over (company/contractor/user)', max_length=50)),
+                ('report', models.CharField(max_length=50)),
+                ('file_format', models.CharField(blank=True, help_text='Export format (csv/xlsx/pdf), empty for a JSON result', max_length=10)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('dedup_key', models.CharField(db_index=True, max_length=64)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('result', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('result_file', models.FileField(blank=True, null=True, upload_to='reports/')),
+                ('error_message', models.TextField(blank=True)),
+                ('celery_task_id', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'report_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['dedup_key', 'status'], name='report_jobs_dedup_k_efc482_idx'), models.Index(fields=['scope_key', 'created_at'], name='report_jobs_scope_k_5d2d5b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:28
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fail_duplicate_jobs(apps, schema_editor):
+    """Keep the oldest of identical in-flight jobs, so the constraint can be added."""
+    ReportJob = apps.get_model('reports', 'ReportJob')
+    in_flight = ReportJob.objects.filter(status__in=['PENDING', 'RUNNING'])
+    duplicated = in_flight.values('dedup_key').annotate(jobs=Count('id')).filter(jobs__gt=1)
+    for dedup_key in duplicated.values_list('dedup_key', flat=True):
+        first, *duplicates = in_flight.filter(dedup_key=dedup_key).order_by('created_at', 'id')
+        in_flight.filter(id__in=[job.id for job in duplicates]).update(
+            status='FAILED', error_message=f'Duplicate of job {first.id}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='reportjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['PENDING', 'RUNNING'])), fields=('dedup_key',), name='report_job_in_flight'),
+        ),
+    ]
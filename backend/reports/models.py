@@ -0,0 +1,96 @@
+import hashlib
+import json
+from datetime import timedelta
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+class ReportJob(models.Model):
+    """
+    A report computed in the background by Celery.
+    Holds either the JSON result or the generated export file.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    IN_FLIGHT_STATUSES = ['PENDING', 'RUNNING']
+    
+    # In-flight jobs queued or started longer ago were lost (crashed worker,
+    # lost message) and no longer block identical submits
+    STALE_AFTER = timedelta(hours=1)
+    
+    user = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.CASCADE,
+        related_name='report_jobs'
+    )
+    scope_key = models.CharField(
+        max_length=50,
+        help_text="Data scope the report is computed over (company/contractor/user)"
+    )
+    report = models.CharField(max_length=50)
+    file_format = models.CharField(
+        max_length=10,
+        blank=True,
+        help_text="Export format (csv/xlsx/pdf), empty for a JSON result"
+    )
+    params = models.JSONField(default=dict, blank=True)
+    dedup_key = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    result_file = models.FileField(upload_to='reports/', null=True, blank=True)
+    error_message = models.TextField(blank=True)
+    celery_task_id = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'report_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['dedup_key', 'status']),
+            models.Index(fields=['scope_key', 'created_at']),
+        ]
+        constraints = [
+            # One in-flight job per key (IN_FLIGHT_STATUSES), so identical
+            # submits racing each other cannot both insert
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status__in=['PENDING', 'RUNNING']),
+                name='report_job_in_flight'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.report} ({self.get_status_display()}) for {self.scope_key}"
+    
+    @staticmethod
+    def make_dedup_key(scope_key, report, file_format, params):
+        """Hash of everything that determines a job's output."""
+        payload = json.dumps([scope_key, report, file_format, params], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    @classmethod
+    def fail_stale(cls, **filters):
+        """
+        Mark the in-flight jobs older than STALE_AFTER as failed.
+        
+        Returns:
+            int: Number of jobs failed
+        """
+        return cls.objects.filter(status__in=cls.IN_FLIGHT_STATUSES, **filters).annotate(
+            active_since=Coalesce('started_at', 'created_at')
+        ).filter(active_since__lt=timezone.now() - cls.STALE_AFTER).update(
+            status='FAILED', error_message='Job did not finish in time', finished_at=timezone.now()
+        )
+    
+    @property
+    def is_finished(self):
+        return self.status in ['COMPLETED', 'FAILED']
@@ -0,0 +1,159 @@
+"""
+Scoped, pre-annotated querysets shared by the report endpoints and exports.
+Per-row figures are computed in SQL (annotations/subqueries) so callers can
+iterate over the results without issuing extra queries.
+"""
+from decimal import Decimal
+from django.db.models import Count, Sum, OuterRef, Subquery, Value, DecimalField, IntegerField
+from django.db.models.functions import Coalesce
+from projects.models import Project
+from tasks.models import Task, TimeEntry
+from accounts.models import Contractor
+
+# Assuming hourly rate (this should be configurable)
+DEFAULT_HOURLY_RATE = 50
+
+
+def scope_key(user):
+    """
+    Identify the data scope a user's reports are computed over.
+    Company admins share their company scope and contractors their contractor
+    scope; every other role is scoped to the user itself.
+    """
+    if user.is_company_admin and user.company_id:
+        return f"company:{user.company_id}"
+    if user.is_contractor and user.contractor_id:
+        return f"contractor:{user.contractor_id}"
+    return f"user:{user.pk}"
+
+
+def _subquery_total(queryset, group_field, aggregate, output_field):
+    """Correlated subquery returning a single aggregate per outer row."""
+    subquery = (
+        queryset.order_by()
+        .values(group_field)
+        .annotate(total=aggregate)
+        .values('total')
+    )
+    return Coalesce(Subquery(subquery, output_field=output_field), Value(0), output_field=output_field)
+
+
+def project_progress_queryset(user, project_id=None):
+    """Projects visible to the user for the progress report, with their rollup joined."""
+    if user.is_company_admin:
+        projects = Project.objects.filter(company=user.company)
+    elif user.is_contractor:
+        projects = Project.objects.filter(contractor=user.contractor)
+    elif user.is_consultant:
+        projects = Project.objects.filter(consultant=user)
+    else:
+        projects = Project.objects.none()
+    
+    if project_id:
+        projects = projects.filter(id=project_id)
+    
+    return projects.select_related('progress')
+
+
+def time_entry_queryset(user, project_id=None, start_date=None, end_date=None):
+    """Time entries visible to the user for the time tracking report."""
+    if user.is_company_admin:
+        tasks = Task.objects.filter(project__company=user.company)
+    elif user.is_contractor:
+        tasks = Task.objects.filter(project__contractor=user.contractor)
+    elif user.is_worker:
+        tasks = Task.objects.filter(assigned_to=user)
+    else:
+        tasks = Task.objects.none()
+    
+    if project_id:
+        tasks = tasks.filter(project_id=project_id)
+    
+    time_entries = TimeEntry.objects.filter(task__in=tasks)
+    
+    if start_date:
+        time_entries = time_entries.filter(date__gte=start_date)
+    if end_date:
+        time_entries = time_entries.filter(date__lte=end_date)
+    
+    return time_entries
+
+
+def budget_queryset(user):
+    """Projects visible to the user, annotated with their logged hours."""
+    if user.is_company_admin:
+        projects = Project.objects.filter(company=user.company)
+    elif user.is_contractor:
+        projects = Project.objects.filter(contractor=user.contractor)
+    else:
+        projects = Project.objects.none()
+    
+    return projects.annotate(
+        total_hours=_subquery_total(
+            TimeEntry.objects.filter(task__project=OuterRef('pk')),
+            'task__project', Sum('hours'),
+            DecimalField(max_digits=15, decimal_places=2)
+        )
+    )
+
+
+def budget_row(project, hourly_rate=DEFAULT_HOURLY_RATE):
+    """Budget vs actual figures for a project from budget_queryset()."""
+    total_hours = project.total_hours or Decimal('0')
+    actual_cost = total_hours * hourly_rate
+    estimated_budget = float(project.estimated_budget) if project.estimated_budget else 0
+    return {
+        'project_id': project.id,
+        'project_name': project.name,
+        'estimated_budget': estimated_budget,
+        'actual_budget': float(project.actual_budget) if project.actual_budget else 0,
+        'calculated_cost': actual_cost,
+        'total_hours': total_hours,
+        'variance': estimated_budget - float(actual_cost),
+    }
+
+
+def department_queryset(user):
+    """Departments visible to the user, annotated with task, hour and member totals."""
+    from departments.models import Department
+    
+    if user.is_company_admin:
+        contractors = Contractor.objects.filter(company=user.company)
+    elif user.is_contractor:
+        contractors = Contractor.objects.filter(id=user.contractor_id)
+    else:
+        return Department.objects.none()
+    
+    tasks = Task.objects.filter(department=OuterRef('pk'))
+    return (
+        Department.objects.filter(contractor__in=contractors)
+        .select_related('contractor')
+        .annotate(
+            total_tasks=_subquery_total(tasks, 'department', Count('id'), IntegerField()),
+            completed_tasks=_subquery_total(
+                tasks.filter(status='COMPLETED'), 'department', Count('id'), IntegerField()
+            ),
+            total_hours=_subquery_total(
+                TimeEntry.objects.filter(task__department=OuterRef('pk')),
+                'task__department', Sum('hours'),
+                DecimalField(max_digits=15, decimal_places=2)
+            ),
+            member_count=Count('members', distinct=True),
+        )
+    )
+
+
+def department_row(dept):
+    """Performance figures for a department from department_queryset()."""
+    total_tasks = dept.total_tasks
+    completed_tasks = dept.completed_tasks
+    return {
+        'department_id': dept.id,
+        'department_name': dept.name,
+        'contractor_name': dept.contractor.name,
+        'total_tasks': total_tasks,
+        'completed_tasks': completed_tasks,
+        'completion_rate': round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 2),
+        'total_hours': dept.total_hours,
+        'member_count': dept.member_count,
+    }
@@ -0,0 +1,49 @@
+from rest_framework import serializers
+from .models import ReportJob
+from .generators import REPORT_GENERATORS, normalize_params, parse_months
+from .exports import EXPORTABLE_REPORTS, EXPORT_FORMATS
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ReportJob
+        fields = ['id', 'report', 'file_format', 'params', 'status', 'error_message',
+                  'download_url', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = ['id', 'status', 'error_message', 'created_at',
+                            'started_at', 'finished_at']
+    
+    def get_download_url(self, obj):
+        if obj.status != 'COMPLETED':
+            return None
+        request = self.context.get('request')
+        url = f'/api/reports/jobs/{obj.id}/download/'
+        return request.build_absolute_uri(url) if request else url
+    
+    def validate_params(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("params must be an object.")
+        return normalize_params(value)
+    
+    def validate(self, attrs):
+        report = attrs.get('report')
+        file_format = attrs.get('file_format', '')
+        
+        if file_format:
+            if file_format not in EXPORT_FORMATS:
+                raise serializers.ValidationError({
+                    "file_format": f"Unsupported format. Allowed: {', '.join(EXPORT_FORMATS)}"
+                })
+            if report not in EXPORTABLE_REPORTS:
+                raise serializers.ValidationError({
+                    "report": f"Report cannot be exported. Available: {', '.join(EXPORTABLE_REPORTS)}"
+                })
+        elif report not in REPORT_GENERATORS:
+            raise serializers.ValidationError({
+                "report": f"Unknown report. Available: {', '.join(REPORT_GENERATORS)}"
+            })
+        
+        if report == 'dashboard_summary':
+            parse_months(attrs.get('params', {}).get('months'))
+        return attrs
@@ -0,0 +1,70 @@
+"""
+Invalidate cached reports when the data they are computed from changes.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from departments.models import Department
+from documents.models import Document
+from projects.models import Project, Blueprint
+from tasks.models import Task, TimeEntry
+from utils.cache_versions import project_tenants, contractor_tenants, department_tenants
+from .cache import invalidate_reports
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=Project)
+def invalidate_project_reports(sender, instance, **kwargs):
+    invalidate_reports(
+        f"company:{instance.company_id}",
+        instance.contractor_id and f"contractor:{instance.contractor_id}"
+    )
+
+
+@receiver([post_save, post_delete], sender=Task)
+def invalidate_task_reports(sender, instance, **kwargs):
+    tenants = project_tenants(instance.project_id) + department_tenants(instance.department_id)
+    # Task moved to another project
+    previous_project_id = getattr(instance, '_loaded_project_id', None)
+    if previous_project_id and previous_project_id != instance.project_id:
+        tenants += project_tenants(previous_project_id)
+    invalidate_reports(*tenants)
+
+
+@receiver([post_save, post_delete], sender=TimeEntry)
+def invalidate_time_entry_reports(sender, instance, **kwargs):
+    task = Task.objects.filter(id=instance.task_id).values_list('project_id', 'department_id').first()
+    if task:
+        invalidate_reports(*project_tenants(task[0]), *department_tenants(task[1]))
+    else:
+        invalidate_reports()
+
+
+@receiver([post_save, post_delete], sender=Document)
+def invalidate_document_reports(sender, instance, **kwargs):
+    invalidate_reports(
+        *project_tenants(instance.project_id),
+        instance.company_id and f"company:{instance.company_id}",
+        instance.contractor_id and f"contractor:{instance.contractor_id}"
+    )
+
+
+@receiver([post_save, post_delete], sender=Blueprint)
+def invalidate_blueprint_reports(sender, instance, **kwargs):
+    invalidate_reports(*project_tenants(instance.project_id))
+
+
+@receiver([post_save, post_delete], sender=Department)
+def invalidate_department_reports(sender, instance, **kwargs):
+    invalidate_reports(*contractor_tenants(instance.contractor_id))
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_member_reports(sender, instance, **kwargs):
+    """Department member counts change with user membership."""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    if instance.department_id:
+        invalidate_reports(*department_tenants(instance.department_id))
@@ -0,0 +1,67 @@
+try:
+    from celery import shared_task
+    CELERY_AVAILABLE = True
+except ImportError:
+    CELERY_AVAILABLE = False
+    # Fallback decorator if celery is not available
+    def shared_task(func):
+        return func
+
+import logging
+import tempfile
+from django.core.files import File
+from django.utils import timezone
+from .models import ReportJob
+from .cache import get_cached_report
+from .exports import build_export, EXPORT_WRITERS
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def run_report_job(job_id):
+    """
+    Celery task computing a ReportJob and storing its result.
+    """
+    # Claim the job so a duplicate delivery does not run it twice
+    claimed = ReportJob.objects.filter(id=job_id, status='PENDING').update(
+        status='RUNNING', started_at=timezone.now()
+    )
+    if not claimed:
+        return
+    
+    job = ReportJob.objects.select_related('user').get(id=job_id)
+    try:
+        if job.file_format:
+            export = build_export(job.report, job.user, job.params)
+            with tempfile.TemporaryFile() as output:
+                EXPORT_WRITERS[job.file_format](export, output)
+                output.seek(0)
+                job.result_file.save(export.filename(job.file_format), File(output), save=False)
+        else:
+            job.result, _ = get_cached_report(job.report, job.user, job.params)
+        job.status = 'COMPLETED'
+    except Exception as e:
+        logger.error(f"Report job {job_id} ({job.report}) failed: {e}", exc_info=True)
+        job.status = 'FAILED'
+        job.error_message = str(e)
+    
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'result_file', 'error_message', 'finished_at'])
+
+
+def enqueue_report_job(job):
+    """Send a job to the Celery queue, or run it inline when Celery is unavailable."""
+    if CELERY_AVAILABLE and hasattr(run_report_job, 'delay'):
+        try:
+            result = run_report_job.delay(job.id)
+        except Exception as e:
+            # Left pending, the job would block identical submits until it goes stale
+            logger.error(f"Cannot queue report job {job.id}: {e}", exc_info=True)
+            ReportJob.objects.filter(id=job.id, status='PENDING').update(
+                status='FAILED', error_message=f'Could not be queued: {e}', finished_at=timezone.now()
+            )
+            return
+        ReportJob.objects.filter(id=job.id).update(celery_task_id=result.id or '')
+    else:
+        run_report_job(job.id)
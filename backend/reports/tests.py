@@ -0,0 +1,468 @@
+"""
+Unit tests for reports app.
+"""
+import pytest
+from decimal import Decimal
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from accounts.models import Company
+from projects.models import Project
+from tasks.models import Task, TimeEntry
+from .aggregations import month_starts
+from .models import ReportJob
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestDashboardSummary:
+    """Test dashboard summary report."""
+    
+    @pytest.fixture
+    def api_client(self):
+        """Create API client."""
+        return APIClient()
+    
+    @pytest.fixture
+    def company(self):
+        """Create test company."""
+        return Company.objects.create(name='Dashboard Co', email='dashboard@example.com')
+    
+    @pytest.fixture
+    def admin_user(self, company):
+        """Create company admin."""
+        return User.objects.create_user(
+            username='dashboard_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+    
+    def _project(self, company, created_at, **kwargs):
+        project = Project.objects.create(company=company, name='Project', address='Site', **kwargs)
+        Project.objects.filter(pk=project.pk).update(created_at=created_at)
+        return project
+    
+    def test_month_starts(self):
+        """Test month buckets roll over year boundaries."""
+        now = timezone.now().replace(year=2025, month=2, day=15)
+        starts = month_starts(3, now=now)
+        assert [s.strftime('%Y-%m') for s in starts] == ['2024-12', '2025-01', '2025-02']
+        assert all(s.day == 1 and s.hour == 0 for s in starts)
+    
+    def test_summary_values(self, settings, api_client, admin_user, company):
+        """Test KPIs and cumulative monthly series."""
+        now = timezone.now()
+        old = self._project(company, now - timedelta(days=800), status='IN_PROGRESS')
+        recent = self._project(company, now)
+        Task.objects.create(project=old, title='Done', status='COMPLETED')
+        Task.objects.create(project=old, title='Late', status='DELAYED')
+        Task.objects.create(project=recent, title='Open')
+        
+        api_client.force_authenticate(user=admin_user)
+        response = api_client.get('/api/reports/dashboard_summary/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['total_projects'] == 2
+        assert response.data['active_projects'] == 1
+        assert response.data['total_tasks'] == 3
+        assert response.data['completed_tasks'] == 1
+        assert response.data['overdue_tasks'] == 1
+        
+        series = response.data['progress_over_time']
+        assert len(series) == 12
+        assert series[0]['total_projects'] == 1
+        assert series[0]['total_tasks'] == 2
+        assert series[0]['avg_progress'] == 50
+        assert series[-1]['month'] == timezone.localtime(now).strftime('%Y-%m')
+        assert series[-1]['total_projects'] == 2
+        assert series[-1]['total_tasks'] == 3
+    
+    def test_query_count_independent_of_months(self, settings, api_client, admin_user, company):
+        """Test a longer horizon does not add queries."""
+        now = timezone.now()
+        for days in (0, 100, 400, 900):
+            project = self._project(company, now - timedelta(days=days))
+            Task.objects.create(project=project, title='Task')
+        api_client.force_authenticate(user=admin_user)
+        
+        counts = []
+        for months in (1, 12, 60):
+            with CaptureQueriesContext(connection) as ctx:
+                response = api_client.get('/api/reports/dashboard_summary/', {'months': months})
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.data['progress_over_time']) == months
+            counts.append(len(ctx.captured_queries))
+        assert counts[0] == counts[1] == counts[2]
+    
+    def test_invalid_months(self, settings, api_client, admin_user):
+        """Test months parameter validation."""
+        api_client.force_authenticate(user=admin_user)
+        response = api_client.get('/api/reports/dashboard_summary/', {'months': 'abc'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = api_client.get('/api/reports/dashboard_summary/', {'months': 0})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestReportExport:
+    """Test streaming report exports."""
+    
+    @pytest.fixture
+    def api_client(self):
+        """Create API client."""
+        return APIClient()
+    
+    @pytest.fixture
+    def company(self):
+        """Create test company."""
+        return Company.objects.create(name='Export Co', email='export@example.com')
+    
+    @pytest.fixture
+    def admin_user(self, company):
+        """Create company admin."""
+        return User.objects.create_user(
+            username='export_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+    
+    @pytest.fixture
+    def project(self, company, admin_user):
+        """Create a project with logged time."""
+        project = Project.objects.create(
+            company=company, name='Export Tower', address='Site', estimated_budget=1000
+        )
+        for day in range(3):
+            task = Task.objects.create(project=project, title=f'Task {day}', status='COMPLETED')
+            TimeEntry.objects.create(
+                task=task, user=admin_user, hours=2,
+                date=timezone.now().date() - timedelta(days=day)
+            )
+        return project
+    
+    def test_csv_is_streamed(self, settings, api_client, admin_user, project):
+        """Test CSV export streams one line per row."""
+        api_client.force_authenticate(user=admin_user)
+        response = api_client.get('/api/reports/export/time_tracking/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert lines[0].startswith('Date,Project,Task')
+        assert len(lines) == 4
+        assert 'Export Tower' in lines[1]
+    
+    def test_xlsx_and_pdf(self, settings, api_client, admin_user, project):
+        """Test XLSX and PDF exports produce valid files."""
+        from io import BytesIO
+        from openpyxl import load_workbook
+        api_client.force_authenticate(user=admin_user)
+        
+        response = api_client.get('/api/reports/export/budget_vs_actual/', {'file_format': 'xlsx'})
+        assert response.status_code == status.HTTP_200_OK
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        rows = list(sheet.values)
+        assert rows[0][1] == 'Project'
+        assert rows[1][1] == 'Export Tower'
+        assert rows[1][4] == 6
+        
+        response = api_client.get('/api/reports/export/project_progress/', {'file_format': 'pdf'})
+        assert response.status_code == status.HTTP_200_OK
+        assert b''.join(response.streaming_content).startswith(b'%PDF')
+    
+    def test_csv_figures(self, settings, api_client, admin_user, project):
+        """Test progress is built for projects without a rollup and costs keep their decimals."""
+        from projects.models import ProjectProgress
+        ProjectProgress.objects.filter(project=project).delete()
+        api_client.force_authenticate(user=admin_user)
+        
+        response = api_client.get('/api/reports/export/project_progress/')
+        row = b''.join(response.streaming_content).decode().splitlines()[1].split(',')
+        assert row[3:6] == ['3', '3', '100.0']
+        
+        response = api_client.get('/api/reports/export/budget_vs_actual/')
+        row = b''.join(response.streaming_content).decode().splitlines()[1].split(',')
+        assert Decimal(row[4]) == 6
+        assert row[5] == str(Decimal(row[4]) * 50)
+    
+    def test_export_validation_and_permission(self, settings, api_client, admin_user, company):
+        """Test unknown reports/formats and role permission check."""
+        api_client.force_authenticate(user=admin_user)
+        response = api_client.get('/api/reports/export/unknown/')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        response = api_client.get('/api/reports/export/time_tracking/', {'file_format': 'doc'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        
+        worker = User.objects.create_user(
+            username='export_worker', password='testpass123', role='WORKER', company=company
+        )
+        api_client.force_authenticate(user=worker)
+        response = api_client.get('/api/reports/export/time_tracking/')
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+    
+    def test_json_reports_use_annotations(self, settings, api_client, admin_user, project):
+        """Test budget and department reports after moving figures into SQL."""
+        from departments.models import Department
+        from accounts.models import Contractor
+        contractor = Contractor.objects.create(company=project.company, name='Builder', email='b@example.com')
+        department = Department.objects.create(contractor=contractor, name='Electrical')
+        project.tasks.update(department=department)
+        api_client.force_authenticate(user=admin_user)
+        
+        response = api_client.get('/api/reports/budget_vs_actual/')
+        assert response.data[0]['total_hours'] == 6
+        assert response.data[0]['calculated_cost'] == 300
+        assert response.data[0]['variance'] == 700
+        
+        response = api_client.get('/api/reports/department_performance/')
+        assert response.data[0]['total_tasks'] == 3
+        assert response.data[0]['completion_rate'] == 100
+        assert response.data[0]['total_hours'] == 6
+
+
+@pytest.mark.django_db
+class TestReportJobs:
+    """Test background report jobs."""
+    
+    @pytest.fixture
+    def api_client(self):
+        """Create API client."""
+        return APIClient()
+    
+    @pytest.fixture
+    def company(self):
+        """Create test company."""
+        return Company.objects.create(name='Jobs Co', email='jobs@example.com')
+    
+    @pytest.fixture
+    def admin_user(self, company):
+        """Create company admin."""
+        return User.objects.create_user(
+            username='jobs_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+    
+    @pytest.fixture
+    def project(self, company):
+        """Create a project with tasks."""
+        project = Project.objects.create(company=company, name='Jobs Tower', address='Site')
+        Task.objects.create(project=project, title='Done', status='COMPLETED')
+        Task.objects.create(project=project, title='Open', status='PENDING')
+        return project
+    
+    def test_json_job_lifecycle(self, settings, api_client, admin_user, project,
+                                django_capture_on_commit_callbacks):
+        """Test submitting, polling and downloading a JSON report job."""
+        api_client.force_authenticate(user=admin_user)
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post('/api/reports/jobs/', {
+                'report': 'project_progress', 'params': {'project_id': project.id}
+            }, format='json')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        job_id = response.data['id']
+        
+        response = api_client.get(f'/api/reports/jobs/{job_id}/')
+        assert response.data['status'] == 'COMPLETED'
+        assert response.data['download_url'].endswith(f'/api/reports/jobs/{job_id}/download/')
+        
+        response = api_client.get(f'/api/reports/jobs/{job_id}/download/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data[0]['total_tasks'] == 2
+        assert response.data[0]['progress_percentage'] == 50.0
+    
+    def test_export_job(self, settings, api_client, admin_user, project,
+                        django_capture_on_commit_callbacks, tmp_path):
+        """Test an export job stores a downloadable file."""
+        api_client.force_authenticate(user=admin_user)
+        with override_settings(MEDIA_ROOT=str(tmp_path)):
+            with django_capture_on_commit_callbacks(execute=True):
+                response = api_client.post('/api/reports/jobs/', {
+                    'report': 'project_progress', 'file_format': 'csv'
+                }, format='json')
+            assert response.status_code == status.HTTP_202_ACCEPTED
+            
+            response = api_client.get(f"/api/reports/jobs/{response.data['id']}/download/")
+            assert response.status_code == status.HTTP_200_OK
+            lines = b''.join(response.streaming_content).decode().splitlines()
+            assert lines[0].startswith('Project ID,Project')
+            assert 'Jobs Tower' in lines[1]
+    
+    def test_in_flight_jobs_are_deduplicated(self, settings, api_client, admin_user, project):
+        """Test an identical request reuses the pending job."""
+        api_client.force_authenticate(user=admin_user)
+        payload = {'report': 'dashboard_summary', 'params': {'months': 6}}
+        
+        # on_commit callbacks are not run, so the first job stays pending
+        first = api_client.post('/api/reports/jobs/', payload, format='json')
+        second = api_client.post('/api/reports/jobs/', payload, format='json')
+        assert first.status_code == status.HTTP_202_ACCEPTED
+        assert second.status_code == status.HTTP_200_OK
+        assert second.data['id'] == first.data['id']
+        
+        response = api_client.get(f"/api/reports/jobs/{first.data['id']}/download/")
+        assert response.status_code == status.HTTP_409_CONFLICT
+    
+    def test_stale_jobs_do_not_block(self, settings, api_client, admin_user, project):
+        """Test an in-flight job older than STALE_AFTER is failed instead of reused."""
+        api_client.force_authenticate(user=admin_user)
+        payload = {'report': 'dashboard_summary', 'params': {'months': 6}}
+        lost = api_client.post('/api/reports/jobs/', payload, format='json').data['id']
+        ReportJob.objects.filter(id=lost).update(
+            status='RUNNING', started_at=timezone.now() - ReportJob.STALE_AFTER - timedelta(minutes=1)
+        )
+        
+        response = api_client.post('/api/reports/jobs/', payload, format='json')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['id'] != lost
+        assert ReportJob.objects.get(id=lost).status == 'FAILED'
+    
+    def test_unqueued_job_fails(self, settings, api_client, admin_user, project, monkeypatch,
+                                django_capture_on_commit_callbacks):
+        """Test a job the broker did not accept is failed, so an identical submit runs again."""
+        from . import tasks
+        
+        def broker_down(job_id):
+            raise ConnectionError('Broker unavailable')
+        
+        monkeypatch.setattr(tasks.run_report_job, 'delay', broker_down)
+        api_client.force_authenticate(user=admin_user)
+        payload = {'report': 'budget_vs_actual'}
+        with django_capture_on_commit_callbacks(execute=True):
+            first = api_client.post('/api/reports/jobs/', payload, format='json')
+        job = ReportJob.objects.get(id=first.data['id'])
+        assert job.status == 'FAILED'
+        assert 'Broker unavailable' in job.error_message
+        
+        second = api_client.post('/api/reports/jobs/', payload, format='json')
+        assert second.status_code == status.HTTP_202_ACCEPTED
+        assert second.data['id'] != job.id
+    
+    def test_one_job_in_flight_per_key(self, admin_user):
+        """Test the database rejects a second in-flight job, as concurrent submits would insert."""
+        from django.db import IntegrityError, transaction
+        job = ReportJob.objects.create(user=admin_user, scope_key='company:1', report='budget_vs_actual', dedup_key='key')
+        with pytest.raises(IntegrityError), transaction.atomic():
+            ReportJob.objects.create(user=admin_user, scope_key='company:1', report='budget_vs_actual', dedup_key='key')
+        
+        job.status = 'COMPLETED'
+        job.save()
+        ReportJob.objects.create(user=admin_user, scope_key='company:1', report='budget_vs_actual', dedup_key='key')
+    
+    def test_validation_and_scope(self, settings, api_client, admin_user, project):
+        """Test job validation and that jobs are private to their scope."""
+        api_client.force_authenticate(user=admin_user)
+        response = api_client.post('/api/reports/jobs/', {'report': 'unknown'}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = api_client.post('/api/reports/jobs/', {
+            'report': 'dashboard_summary', 'params': {'months': 0}
+        }, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        
+        job = api_client.post('/api/reports/jobs/', {'report': 'budget_vs_actual'}, format='json').data
+        
+        other_company = Company.objects.create(name='Other Co', email='other@example.com')
+        other_admin = User.objects.create_user(
+            username='other_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=other_company
+        )
+        api_client.force_authenticate(user=other_admin)
+        assert api_client.get(f"/api/reports/jobs/{job['id']}/").status_code == status.HTTP_404_NOT_FOUND
+        assert api_client.get('/api/reports/jobs/').data['count'] == 0
+
+
+@pytest.mark.django_db
+class TestReportCache:
+    """Test the versioned report cache."""
+    
+    @pytest.fixture
+    def api_client(self, locmem_cache):
+        """Create API client."""
+        return APIClient()
+    
+    @pytest.fixture
+    def company(self):
+        """Create test company."""
+        return Company.objects.create(name='Cache Co', email='cache@example.com')
+    
+    @pytest.fixture
+    def admin_user(self, company):
+        """Create company admin."""
+        return User.objects.create_user(
+            username='cache_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+    
+    @pytest.fixture
+    def project(self, company):
+        """Create test project."""
+        return Project.objects.create(company=company, name='Cache Tower', address='Site')
+    
+    def test_repeated_dashboard_is_cached(self, api_client, admin_user, project):
+        """Test repeated loads are served from the cache without queries."""
+        api_client.force_authenticate(user=admin_user)
+        response = api_client.get('/api/reports/dashboard_summary/')
+        assert response['X-Report-Cache'] == 'MISS'
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get('/api/reports/dashboard_summary/')
+        assert response['X-Report-Cache'] == 'HIT'
+        assert response.data['total_projects'] == 1
+        assert len(queries) == 0
+        
+        # Different params are cached separately
+        response = api_client.get('/api/reports/dashboard_summary/?months=6')
+        assert response['X-Report-Cache'] == 'MISS'
+    
+    def test_writes_invalidate(self, api_client, admin_user, project):
+        """Test a write is visible on the next request."""
+        api_client.force_authenticate(user=admin_user)
+        assert api_client.get('/api/reports/dashboard_summary/').data['total_tasks'] == 0
+        
+        task = Task.objects.create(project=project, title='New', status='PENDING')
+        response = api_client.get('/api/reports/dashboard_summary/')
+        assert response['X-Report-Cache'] == 'MISS'
+        assert response.data['total_tasks'] == 1
+        
+        assert api_client.get('/api/reports/time_tracking/').data['total_hours'] == 0
+        TimeEntry.objects.create(task=task, user=admin_user, hours=3, date=timezone.now().date())
+        assert api_client.get('/api/reports/time_tracking/').data['total_hours'] == 3
+        
+        task.delete()
+        assert api_client.get('/api/reports/dashboard_summary/').data['total_tasks'] == 0
+    
+    def test_other_tenants_keep_their_cache(self, api_client, admin_user, project):
+        """Test writes in another company do not invalidate this one."""
+        api_client.force_authenticate(user=admin_user)
+        api_client.get('/api/reports/dashboard_summary/')
+        
+        other = Company.objects.create(name='Other Co', email='other@example.com')
+        other_project = Project.objects.create(company=other, name='Elsewhere', address='Site')
+        Task.objects.create(project=other_project, title='Elsewhere', status='PENDING')
+        
+        response = api_client.get('/api/reports/dashboard_summary/')
+        assert response['X-Report-Cache'] == 'HIT'
+    
+    def test_per_user_scopes_are_not_cached(self, api_client, company, project):
+        """Test reports of roles spanning companies are always computed."""
+        worker = User.objects.create_user(
+            username='cache_worker', password='testpass123',
+            role='WORKER', company=company
+        )
+        api_client.force_authenticate(user=worker)
+        api_client.get('/api/reports/dashboard_summary/')
+        assert api_client.get('/api/reports/dashboard_summary/')['X-Report-Cache'] == 'MISS'
+    
+    def test_cache_stats(self, api_client, admin_user, project):
+        """Test the hit ratio metric is staff only."""
+        api_client.force_authenticate(user=admin_user)
+        api_client.get('/api/reports/dashboard_summary/')
+        api_client.get('/api/reports/dashboard_summary/')
+        assert api_client.get('/api/reports/cache_stats/').status_code == status.HTTP_403_FORBIDDEN
+        
+        staff = User.objects.create_user(username='cache_staff', password='testpass123', is_staff=True)
+        api_client.force_authenticate(user=staff)
+        response = api_client.get('/api/reports/cache_stats/')
+        assert response.data == {'hits': 1, 'misses': 1, 'hit_ratio': 0.5}
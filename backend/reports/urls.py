@@ -1,11 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ReportsViewSet
+from .views import ReportsViewSet, ReportJobViewSet
 
 router = DefaultRouter()
+router.register(r'jobs', ReportJobViewSet, basename='report-job')
 router.register(r'', ReportsViewSet, basename='report')
 
 urlpatterns = [
     path('', include(router.urls)),
 ]
-
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import SearchEntry
+
+
+@admin.register(SearchEntry)
+class SearchEntryAdmin(admin.ModelAdmin):
+    list_display = ['model', 'object_id', 'title', 'updated_at']
+    list_filter = ['model']
+    search_fields = ['title']
+    readonly_fields = ['model', 'object_id', 'title', 'body', 'content', 'updated_at']
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search'
+    
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from .schema import ensure_index
+        import search.signals  # noqa
+        post_migrate.connect(ensure_index, sender=self)
@@ -0,0 +1,70 @@
+"""
+Full-text matching and ranking of search entries.
+
+PostgreSQL matches the `search_vector` column (GIN-indexed, weighted
+title > body > content) with websearch_to_tsquery and ranks with ts_rank.
+SQLite, used for local and test runs, matches the FTS5 table shadowing
+search_entries and ranks with bm25. Other databases fall back to
+case-insensitive containment, unranked.
+"""
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# Text search configuration of the PostgreSQL vectors and queries
+SEARCH_CONFIG = 'english'
+
+# Relative weight of title, body and content matches in the SQLite ranking
+FTS_WEIGHTS = (10.0, 4.0, 1.0)
+
+TERM = re.compile(r'\w+')
+
+
+def fts_query(query):
+    """
+    An FTS5 query matching rows containing every word of a query; words are
+    quoted so operators and punctuation in user input are not interpreted.
+    """
+    return ' '.join(f'"{term}"' for term in TERM.findall(query))
+
+
+def matching(queryset, query):
+    """Filter search entries to those matching a query."""
+    if connection.vendor == 'postgresql':
+        return queryset.filter(search_vector=SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch'))
+
+    if connection.vendor == 'sqlite':
+        terms = fts_query(query)
+        if not terms:
+            return queryset.none()
+        return queryset.filter(
+            id__in=RawSQL('SELECT rowid FROM search_entries_fts WHERE search_entries_fts MATCH %s', (terms,))
+        )
+
+    condition = Q()
+    for term in TERM.findall(query):
+        condition &= Q(title__icontains=term) | Q(body__icontains=term) | Q(content__icontains=term)
+    return queryset.filter(condition) if condition else queryset.none()
+
+
+def ranked(queryset, query):
+    """
+    Search entries matching a query, annotated with their `rank` (higher is
+    better) and ordered by it.
+    """
+    queryset = matching(queryset, query)
+    if connection.vendor == 'postgresql':
+        rank = SearchRank(F('search_vector'), SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch'))
+    elif connection.vendor == 'sqlite':
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        # bm25() is lower for better matches
+        rank = RawSQL(
+            f'SELECT -bm25(search_entries_fts, {weights}) FROM search_entries_fts '
+            f'WHERE search_entries_fts MATCH %s AND search_entries_fts.rowid = search_entries.id',
+            (fts_query(query),), output_field=FloatField()
+        )
+    else:
+        rank = Value(1.0, output_field=FloatField())
+    return queryset.annotate(rank=rank).order_by('-rank', 'id')
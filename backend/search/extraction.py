@@ -0,0 +1,87 @@
+"""
+Text extraction from document files for the search index.
+
+PDFs are read with pypdfium2 (already used to rasterize blueprints), Word
+documents from their XML, and text files as they are. Other files, such
+as images and scanned PDFs, have no extractable text.
+"""
+import io
+import logging
+import os
+import re
+import zipfile
+from html import unescape
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+logger = logging.getLogger(__name__)
+
+# Characters of extracted text kept per document
+MAX_EXTRACTED_CHARS = 200000
+
+TEXT_FILE_TYPES = {'txt', 'csv', 'md'}
+
+DOCX_PARAGRAPH = re.compile(r'<w:p[ >].*?</w:p>', re.S)
+DOCX_TEXT = re.compile(r'<w:t(?: [^>]*)?>([^<]*)</w:t>')
+
+
+def file_type_of(name):
+    return os.path.splitext(name)[1].lstrip('.').lower()
+
+
+def pdf_text(data):
+    if pdfium is None:
+        return ''
+    pdf = pdfium.PdfDocument(data)
+    parts, length = [], 0
+    try:
+        for index in range(len(pdf)):
+            page = pdf[index]
+            text_page = page.get_textpage()
+            parts.append(text_page.get_text_range())
+            text_page.close()
+            page.close()
+            length += len(parts[-1])
+            if length >= MAX_EXTRACTED_CHARS:
+                break
+    finally:
+        pdf.close()
+    return '\n'.join(parts)
+
+
+def docx_text(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        xml = archive.read('word/document.xml').decode('utf-8')
+    return '\n'.join(
+        unescape(''.join(DOCX_TEXT.findall(paragraph)))
+        for paragraph in DOCX_PARAGRAPH.findall(xml)
+    )
+
+
+def extract_text(field_file):
+    """
+    Text of a stored file, up to MAX_EXTRACTED_CHARS.
+
+    Returns:
+        str: The text, or '' if the file has none or cannot be read
+    """
+    file_type = file_type_of(field_file.name)
+    if file_type not in TEXT_FILE_TYPES | {'pdf', 'docx'}:
+        return ''
+    try:
+        with field_file.open('rb') as stored:
+            data = stored.read()
+        if file_type == 'pdf':
+            text = pdf_text(data)
+        elif file_type == 'docx':
+            text = docx_text(data)
+        else:
+            text = data[:MAX_EXTRACTED_CHARS * 4].decode('utf-8', errors='replace')
+    except Exception as e:
+        logger.warning(f"Cannot extract text of {field_file.name}: {e}")
+        return ''
+    # NUL characters are not accepted in PostgreSQL text
+    return text.replace('\x00', '')[:MAX_EXTRACTED_CHARS]
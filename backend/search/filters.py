@@ -0,0 +1,27 @@
+from rest_framework.filters import BaseFilterBackend
+from .backends import matching
+from .models import SearchEntry
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    `?search=` matched against the full-text index instead of LIKE scans;
+    views set `search_model` to the SearchEntry.model of their rows.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        entries = matching(SearchEntry.objects.filter(model=view.search_model), query)
+        return queryset.filter(id__in=entries.values('object_id'))
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Full-text search terms',
+            'schema': {'type': 'string'},
+        }]
@@ -0,0 +1,50 @@
+"""
+Django management command to reindex every task, comment and document,
+e.g. to extract the text of documents uploaded before the search app
+(migration 0003 indexes their titles and descriptions only).
+Run with: python manage.py rebuild_search_index [--skip-files]
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Value
+from documents.models import Document
+from tasks.models import Task, TaskComment
+from search.models import SearchEntry
+from search.tasks import extract_document_text
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of tasks, comments and documents'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--skip-files',
+            action='store_true',
+            help='Keep the text already extracted from document files'
+        )
+
+    def handle(self, *args, **options):
+        sources = {
+            'task': Task.objects.values_list('id', 'title', 'description'),
+            # Comments have no title
+            'comment': TaskComment.objects.annotate(no_title=Value('')).values_list('id', 'no_title', 'content'),
+            'document': Document.objects.values_list('id', 'title', 'description'),
+        }
+        for model, rows in sources.items():
+            SearchEntry.objects.filter(model=model).exclude(object_id__in=rows.model.objects.values('id')).delete()
+            count, batch = 0, []
+            for row in rows.order_by('id').iterator(chunk_size=BATCH_SIZE):
+                batch.append(row)
+                if len(batch) >= BATCH_SIZE:
+                    SearchEntry.index(model, batch)
+                    count += len(batch)
+                    batch = []
+            SearchEntry.index(model, batch)
+            count += len(batch)
+            self.stdout.write(f'{model}: {count} indexed')
+
+        if not options['skip_files']:
+            for document_id in Document.objects.values_list('id', flat=True).iterator():
+                extract_document_text(document_id)
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
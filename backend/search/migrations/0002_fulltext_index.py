@@ -0,0 +1,25 @@
+"""
+Full-text index of search_entries: a GIN-indexed, trigger-maintained
+tsvector on PostgreSQL, an FTS5 table on SQLite (see search/schema.py).
+"""
+from django.db import migrations
+from search.schema import create_index, drop_index
+
+
+def forwards(apps, schema_editor):
+    create_index(schema_editor.connection)
+
+
+def backwards(apps, schema_editor):
+    drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
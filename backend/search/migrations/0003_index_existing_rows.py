@@ -0,0 +1,43 @@
+"""
+Index the tasks, comments and documents that existed before the search
+app, so ?search= keeps finding them. The text of document files is
+extracted by `python manage.py rebuild_search_index`.
+"""
+from django.db import migrations
+from django.db.models import Value
+
+BATCH_SIZE = 1000
+
+
+def index_existing(apps, schema_editor):
+    SearchEntry = apps.get_model('search', 'SearchEntry')
+    Task = apps.get_model('tasks', 'Task')
+    TaskComment = apps.get_model('tasks', 'TaskComment')
+    Document = apps.get_model('documents', 'Document')
+    sources = {
+        'task': Task.objects.values_list('id', 'title', 'description'),
+        # Comments have no title
+        'comment': TaskComment.objects.annotate(no_title=Value('')).values_list('id', 'no_title', 'content'),
+        'document': Document.objects.values_list('id', 'title', 'description'),
+    }
+    for model, rows in sources.items():
+        batch = []
+        for object_id, title, body in rows.order_by('id').iterator(chunk_size=BATCH_SIZE):
+            batch.append(SearchEntry(model=model, object_id=object_id, title=(title or '')[:255], body=body or ''))
+            if len(batch) >= BATCH_SIZE:
+                SearchEntry.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        SearchEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_fulltext_index'),
+        ('tasks', '0004_keyset_indexes'),
+        ('documents', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+
+class SearchEntry(models.Model):
+    """
+    Full-text index row of a searchable object (see search/backends.py).
+
+    `title` and `body` are copied from the object on save, `content` is the
+    text extracted from a document's file in the background. The database
+    keeps the index itself in sync through triggers: the weighted
+    `search_vector` on PostgreSQL (GIN-indexed), the `search_entries_fts`
+    FTS5 table on SQLite (see migration 0002).
+    """
+    MODEL_CHOICES = [
+        ('task', 'Task'),
+        ('comment', 'Task Comment'),
+        ('document', 'Document'),
+    ]
+
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True)
+    content = models.TextField(blank=True, help_text="Text extracted from the file")
+    # Only maintained on PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'search_entries'
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'object_id'], name='search_entry_object'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id}: {self.title}"
+
+    @classmethod
+    def index(cls, model, rows):
+        """
+        Add or refresh the entries of objects, keeping their extracted content.
+
+        Args:
+            model: One of MODEL_CHOICES
+            rows: Iterable of (object id, title, body)
+        """
+        entries = [
+            cls(model=model, object_id=object_id, title=(title or '')[:255], body=body or '')
+            for object_id, title, body in rows
+        ]
+        if entries:
+            cls.objects.bulk_create(
+                entries, update_conflicts=True, unique_fields=['model', 'object_id'],
+                update_fields=['title', 'body', 'updated_at']
+            )
+
+    @classmethod
+    def remove(cls, model, object_ids):
+        cls.objects.filter(model=model, object_id__in=object_ids).delete()
@@ -0,0 +1,109 @@
+"""
+The full-text index of search_entries, maintained by database triggers.
+
+PostgreSQL: a trigger computes the weighted search_vector of each row,
+which a GIN index covers. SQLite: an FTS5 table with the entries as
+external content, kept in sync by insert/update/delete triggers. Other
+databases get no index (see search/backends.py).
+
+The index is created by migration 0002, and after migrate for databases
+built without migrations (pytest --nomigrations).
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+
+POSTGRESQL_INDEX = [
+    """
+    CREATE OR REPLACE FUNCTION search_entries_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.body, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.content, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER search_entries_vector BEFORE INSERT OR UPDATE OF title, body, content
+    ON search_entries FOR EACH ROW EXECUTE PROCEDURE search_entries_vector()
+    """,
+    "CREATE INDEX search_entries_vector_gin ON search_entries USING gin (search_vector)",
+]
+
+POSTGRESQL_DROP = [
+    "DROP INDEX IF EXISTS search_entries_vector_gin",
+    "DROP TRIGGER IF EXISTS search_entries_vector ON search_entries",
+    "DROP FUNCTION IF EXISTS search_entries_vector()",
+]
+
+SQLITE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE search_entries_fts USING fts5(
+        title, body, content, content='search_entries', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER search_entries_fts_insert AFTER INSERT ON search_entries BEGIN
+        INSERT INTO search_entries_fts (rowid, title, body, content)
+        VALUES (new.id, new.title, new.body, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER search_entries_fts_delete AFTER DELETE ON search_entries BEGIN
+        INSERT INTO search_entries_fts (search_entries_fts, rowid, title, body, content)
+        VALUES ('delete', old.id, old.title, old.body, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER search_entries_fts_update AFTER UPDATE ON search_entries BEGIN
+        INSERT INTO search_entries_fts (search_entries_fts, rowid, title, body, content)
+        VALUES ('delete', old.id, old.title, old.body, old.content);
+        INSERT INTO search_entries_fts (rowid, title, body, content)
+        VALUES (new.id, new.title, new.body, new.content);
+    END
+    """,
+    # Index the rows that already exist
+    "INSERT INTO search_entries_fts (search_entries_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS search_entries_fts_update",
+    "DROP TRIGGER IF EXISTS search_entries_fts_delete",
+    "DROP TRIGGER IF EXISTS search_entries_fts_insert",
+    "DROP TABLE IF EXISTS search_entries_fts",
+]
+
+
+STATEMENTS = {
+    'postgresql': (POSTGRESQL_INDEX, POSTGRESQL_DROP),
+    'sqlite': (SQLITE_INDEX, SQLITE_DROP),
+}
+
+EXISTS = {
+    'postgresql': "SELECT 1 FROM pg_indexes WHERE indexname = 'search_entries_vector_gin'",
+    'sqlite': "SELECT 1 FROM sqlite_master WHERE name = 'search_entries_fts'",
+}
+
+
+def create_index(connection):
+    with connection.cursor() as cursor:
+        for statement in STATEMENTS.get(connection.vendor, ([], []))[0]:
+            cursor.execute(statement)
+
+
+def drop_index(connection):
+    with connection.cursor() as cursor:
+        for statement in STATEMENTS.get(connection.vendor, ([], []))[1]:
+            cursor.execute(statement)
+
+
+def ensure_index(using=DEFAULT_DB_ALIAS, **kwargs):
+    """post_migrate receiver creating the index if the table exists without it."""
+    connection = connections[using]
+    if connection.vendor not in STATEMENTS or 'search_entries' not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(EXISTS[connection.vendor])
+        if cursor.fetchone():
+            return
+    create_index(connection)
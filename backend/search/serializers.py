@@ -0,0 +1,25 @@
+from rest_framework import serializers
+from .models import SearchEntry
+
+# Characters of the matched text shown with each result
+EXCERPT_LENGTH = 200
+
+
+class SearchResultSerializer(serializers.ModelSerializer):
+    type = serializers.CharField(source='model')
+    id = serializers.IntegerField(source='object_id')
+    excerpt = serializers.SerializerMethodField()
+    rank = serializers.FloatField()
+    task = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SearchEntry
+        fields = ['type', 'id', 'title', 'excerpt', 'rank', 'task']
+
+    def get_excerpt(self, obj):
+        text = obj.body or obj.content
+        return text[:EXCERPT_LENGTH] + ('…' if len(text) > EXCERPT_LENGTH else '')
+
+    def get_task(self, obj):
+        """The task of a comment."""
+        return self.context.get('comment_tasks', {}).get(obj.object_id) if obj.model == 'comment' else None
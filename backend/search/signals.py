@@ -0,0 +1,47 @@
+"""
+Index receivers of the searchable models.
+
+Task rows created with bulk_create() are indexed by their caller with
+SearchEntry.index(); `python manage.py rebuild_search_index` reindexes
+everything.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from documents.models import Document, DocumentVersion
+from tasks.models import Task, TaskComment
+from .models import SearchEntry
+from .tasks import enqueue_text_extraction
+
+
+@receiver(post_save, sender=Task)
+def index_task(sender, instance, **kwargs):
+    SearchEntry.index('task', [(instance.id, instance.title, instance.description)])
+
+
+@receiver(post_save, sender=TaskComment)
+def index_comment(sender, instance, **kwargs):
+    SearchEntry.index('comment', [(instance.id, '', instance.content)])
+
+
+@receiver(post_save, sender=Document)
+def index_document(sender, instance, created, **kwargs):
+    SearchEntry.index('document', [(instance.id, instance.title, instance.description)])
+    if created and not kwargs.get('raw'):
+        # The file is read in the background
+        transaction.on_commit(lambda: enqueue_text_extraction(instance.id))
+
+
+@receiver(post_save, sender=DocumentVersion)
+def index_document_version(sender, instance, created, **kwargs):
+    """A new version replaces the indexed text of its document."""
+    if created and not kwargs.get('raw'):
+        transaction.on_commit(lambda: enqueue_text_extraction(instance.document_id))
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=TaskComment)
+@receiver(post_delete, sender=Document)
+def remove_entry(sender, instance, **kwargs):
+    model = {Task: 'task', TaskComment: 'comment', Document: 'document'}[sender]
+    SearchEntry.remove(model, [instance.id])
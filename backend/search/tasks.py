@@ -0,0 +1,32 @@
+try:
+    from celery import shared_task
+    CELERY_AVAILABLE = True
+except ImportError:
+    CELERY_AVAILABLE = False
+    # Fallback decorator if celery is not available
+    def shared_task(func):
+        return func
+
+from .extraction import extract_text
+from .models import SearchEntry
+
+
+@shared_task
+def extract_document_text(document_id):
+    """Celery task indexing the text of a document's latest file."""
+    from documents.models import Document
+
+    document = Document.objects.filter(id=document_id).first()
+    if not document:
+        return
+    version = document.versions.order_by('-version_number').first()
+    text = extract_text(version.file if version else document.file)
+    SearchEntry.objects.filter(model='document', object_id=document_id).update(content=text)
+
+
+def enqueue_text_extraction(document_id):
+    """Send a document to the Celery queue, or extract inline when Celery is unavailable."""
+    if CELERY_AVAILABLE and hasattr(extract_document_text, 'delay'):
+        extract_document_text.delay(document_id)
+    else:
+        extract_document_text(document_id)
@@ -0,0 +1,123 @@
+"""
+Unit tests for search app.
+"""
+import pytest
+from io import BytesIO
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from .models import SearchEntry
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestSearch:
+    """Test the full-text index and the ranked, role-scoped search endpoint."""
+
+    @pytest.fixture
+    def api_client(self):
+        """Create API client."""
+        return APIClient()
+
+    @pytest.fixture
+    def admin(self):
+        """Create company admin."""
+        from accounts.models import Company
+        company = Company.objects.create(name='Search Co', email='search@example.com')
+        return User.objects.create_user(
+            username='search_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+
+    @pytest.fixture
+    def project(self, admin):
+        from projects.models import Project
+        return Project.objects.create(company=admin.company, name='Tower', address='Site 1')
+
+    def search(self, api_client, user, query, **params):
+        api_client.force_authenticate(user=user)
+        response = api_client.get('/api/search/', {'q': query, **params})
+        assert response.status_code == status.HTTP_200_OK
+        return [(result['type'], result['id']) for result in response.data['results']]
+
+    def test_ranked(self, api_client, settings, admin, project):
+        """Test tasks and comments match on any stem, title matches first."""
+        from tasks.models import Task, TaskComment
+        mentioned = Task.objects.create(project=project, title='Formwork', description='Before the slab is poured')
+        titled = Task.objects.create(project=project, title='Pour slabs', description='Level 3')
+        comment = TaskComment.objects.create(task=mentioned, user=admin, content='Slab pouring moved to Friday')
+        Task.objects.create(project=project, title='Install windows')
+
+        results = self.search(api_client, admin, 'slab')
+        assert results[0] == ('task', titled.id)
+        assert set(results) == {('task', titled.id), ('task', mentioned.id), ('comment', comment.id)}
+        assert self.search(api_client, admin, 'slab', type='comment') == [('comment', comment.id)]
+
+    def test_role_scoping(self, api_client, settings, admin, project):
+        """Test only objects the user can see through the list endpoints are returned."""
+        from accounts.models import Company
+        from projects.models import Project
+        from tasks.models import Task
+        own = Task.objects.create(project=project, title='Waterproofing')
+        other_company = Company.objects.create(name='Other Co', email='other@example.com')
+        other_project = Project.objects.create(company=other_company, name='Mall', address='Site 2')
+        Task.objects.create(project=other_project, title='Waterproofing')
+        assert self.search(api_client, admin, 'waterproofing') == [('task', own.id)]
+
+        worker = User.objects.create_user(username='search_worker', password='testpass123', role='WORKER')
+        assert self.search(api_client, worker, 'waterproofing') == []
+        own.assigned_to = worker
+        own.save()
+        assert self.search(api_client, worker, 'waterproofing') == [('task', own.id)]
+
+    def test_index_follows_edits(self, api_client, settings, admin, project):
+        """Test edited and deleted objects are reindexed and removed."""
+        from tasks.models import Task
+        task = Task.objects.create(project=project, title='Scaffolding')
+        task.title = 'Crane inspection'
+        task.save()
+        assert self.search(api_client, admin, 'scaffolding') == []
+        assert self.search(api_client, admin, 'crane') == [('task', task.id)]
+
+        task.delete()
+        assert self.search(api_client, admin, 'crane') == []
+        assert not SearchEntry.objects.exists()
+
+    def test_document_text(self, api_client, settings, admin, project, media_root, django_capture_on_commit_callbacks):
+        """Test the text of a PDF is extracted and searchable."""
+        pytest.importorskip('pypdfium2')
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from reportlab.pdfgen import canvas
+        from documents.models import Document
+        output = BytesIO()
+        pdf = canvas.Canvas(output)
+        pdf.drawString(72, 720, 'Bentonite membrane under the raft foundation')
+        pdf.save()
+        name = default_storage.save('documents/spec.pdf', ContentFile(output.getvalue()))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            document = Document.objects.create(
+                project=project, side='COMPANY', title='Specification', file=name,
+                file_name='spec.pdf', file_type='pdf', uploaded_by=admin
+            )
+        assert 'Bentonite' in SearchEntry.objects.get(model='document').content
+        assert self.search(api_client, admin, 'bentonite membrane') == [('document', document.id)]
+
+        api_client.force_authenticate(user=admin)
+        response = api_client.get('/api/documents/', {'search': 'raft'})
+        assert [row['id'] for row in response.data['results']] == [document.id]
+
+    def test_task_list_search(self, api_client, settings, admin, project):
+        """Test ?search= of the task list uses the index and ignores FTS syntax in input."""
+        from tasks.models import Task
+        task = Task.objects.create(project=project, title='Rebar inspection')
+        api_client.force_authenticate(user=admin)
+        response = api_client.get('/api/tasks/', {'search': 'inspections'})
+        assert [row['id'] for row in response.data['results']] == [task.id]
+        response = api_client.get('/api/tasks/', {'search': 'rebar" OR NEAR('})
+        assert response.status_code == status.HTTP_200_OK
+
+        assert api_client.get('/api/search/').status_code == status.HTTP_400_BAD_REQUEST
+        assert api_client.get('/api/search/', {'q': 'rebar', 'type': 'pin'}).status_code == status.HTTP_400_BAD_REQUEST
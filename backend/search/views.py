@@ -0,0 +1,57 @@
+from django.db.models import Q
+from rest_framework import viewsets, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from documents.models import Document
+from tasks.models import Task, TaskComment
+from .backends import ranked
+from .models import SearchEntry
+from .serializers import SearchResultSerializer
+
+
+def visible_entries(user, models):
+    """Search entries of the objects a user can see, as the list endpoints scope them."""
+    tasks = Task.visible_to(user)
+    scopes = {
+        'task': tasks,
+        'comment': TaskComment.objects.filter(task__in=tasks),
+        'document': Document.visible_to(user),
+    }
+    condition = Q()
+    for model in models:
+        condition |= Q(model=model, object_id__in=scopes[model].values('id'))
+    return SearchEntry.objects.filter(condition) if condition else SearchEntry.objects.none()
+
+
+class SearchViewSet(viewsets.GenericViewSet):
+    """
+    Ranked full-text search across tasks, task comments and documents
+    (title, description and the text of the file).
+
+    GET /api/search/?q=<terms>&type=task,comment,document
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = SearchResultSerializer
+
+    def list(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "q is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        models = [choice for choice, _ in SearchEntry.MODEL_CHOICES]
+        if request.query_params.get('type'):
+            requested = request.query_params['type'].split(',')
+            unknown = set(requested) - set(models)
+            if unknown:
+                return Response(
+                    {"error": f"Unknown type(s): {', '.join(sorted(unknown))}."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            models = requested
+
+        entries = ranked(visible_entries(request.user, models), query)
+        page = self.paginate_queryset(entries)
+        comment_ids = [entry.object_id for entry in page if entry.model == 'comment']
+        comment_tasks = dict(TaskComment.objects.filter(id__in=comment_ids).values_list('id', 'task_id'))
+        serializer = SearchResultSerializer(page, many=True, context={'request': request, 'comment_tasks': comment_tasks})
+        return self.get_paginated_response(serializer.data)
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import Change
+
+
+@admin.register(Change)
+class ChangeAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tenant', 'model', 'object_id', 'deleted', 'created_at']
+    list_filter = ['model', 'deleted']
+    search_fields = ['tenant']
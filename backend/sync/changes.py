@@ -0,0 +1,95 @@
+"""
+Tenants of the synced objects and logging of their changes.
+
+Tasks, comments, time entries and pins are logged for the company and
+contractor of their project, and for the user they reach a worker through:
+the assignee of the task (or of the pin's tasks), or the author of a time
+entry. Notifications are logged for their recipient only.
+"""
+from collections import defaultdict
+from utils.cache_versions import project_tenants
+from .models import Change
+
+
+def user_tenants(user):
+    """The tenants whose changes a user reads."""
+    tenants = [f"user:{user.id}"]
+    if user.is_company_admin and user.company_id:
+        tenants.append(f"company:{user.company_id}")
+    elif user.is_contractor and user.contractor_id:
+        tenants.append(f"contractor:{user.contractor_id}")
+    return tenants
+
+
+def record_changes(model, rows, deleted=False):
+    """
+    Log changes of objects, with one insert per project and user.
+
+    Args:
+        model: One of Change.MODEL_CHOICES
+        rows: Iterable of (object id, project id or None, user id or None)
+        deleted: Log tombstones of deleted objects
+    """
+    groups = defaultdict(list)
+    for object_id, project_id, user_id in rows:
+        groups[(project_id, user_id)].append(object_id)
+
+    tenants_of_project = {}
+    for (project_id, user_id), object_ids in groups.items():
+        if project_id not in tenants_of_project:
+            tenants_of_project[project_id] = project_tenants(project_id) if project_id else []
+        tenants = [*tenants_of_project[project_id], user_id and f"user:{user_id}"]
+        Change.record(model, object_ids, tenants, deleted=deleted)
+
+
+def pin_rows(pin_ids):
+    """Change rows of pins: their project, and the assignees of their tasks."""
+    from projects.models import Pin
+    from tasks.models import Task
+
+    rows = [
+        (pin_id, project_id, None)
+        for pin_id, project_id in Pin.objects.filter(id__in=pin_ids).values_list('id', 'blueprint__project_id')
+    ]
+    assignees = Task.objects.filter(pin_id__in=pin_ids, assigned_to__isnull=False).values_list('pin_id', 'assigned_to_id')
+    return rows + [(pin_id, None, user_id) for pin_id, user_id in assignees.order_by().distinct()]
+
+
+def record_project_move(project, previous_tenants):
+    """
+    Log everything in a project that moved to another company or contractor,
+    for the previous tenants and the current ones. Assignees keep their
+    tasks, so user tenants are not logged.
+    """
+    from projects.models import Pin
+    from tasks.models import Task, TaskComment, TimeEntry
+
+    tenants = [*previous_tenants, *project_tenants(project.id)]
+    task_ids = list(Task.objects.filter(project=project).values_list('id', flat=True))
+    Change.record('task', task_ids, tenants)
+    Change.record('comment', TaskComment.objects.filter(task__project=project).values_list('id', flat=True), tenants)
+    Change.record('time_entry', TimeEntry.objects.filter(task__project=project).values_list('id', flat=True), tenants)
+    Change.record('pin', Pin.objects.filter(blueprint__project=project).values_list('id', flat=True), tenants)
+
+
+def record_task_dependents(task, project_ids, assignee_ids, pin_ids):
+    """
+    Log the comments, time entries and pins of a task that moved to another
+    project, assignee or pin, for both the previous and the current ones.
+    """
+    rows = [
+        (comment_id, project_id, user_id)
+        for comment_id in task.comments.values_list('id', flat=True)
+        for project_id in project_ids for user_id in assignee_ids
+    ]
+    record_changes('comment', rows)
+    rows = [
+        (entry_id, project_id, user_id)
+        for entry_id, user_id in task.time_entries.values_list('id', 'user_id')
+        for project_id in project_ids
+    ]
+    record_changes('time_entry', rows)
+    # The previous assignee loses the pin along with the task
+    record_changes('pin', pin_rows(pin_ids) + [
+        (pin_id, None, user_id) for pin_id in pin_ids for user_id in assignee_ids
+    ])
@@ -0,0 +1,31 @@
+"""
+Django management command to log every synced object in the change log,
+e.g. after installing the sync app on existing data.
+Run with: python manage.py rebuild_change_log
+"""
+from django.core.management.base import BaseCommand
+from notifications.models import Notification
+from projects.models import Pin
+from tasks.models import Task, TaskComment, TimeEntry
+from sync.changes import pin_rows, record_changes
+
+
+class Command(BaseCommand):
+    help = 'Log all tasks, comments, time entries, pins and notifications for offline sync'
+
+    def handle(self, *args, **options):
+        logged = {
+            'task': Task.objects.values_list('id', 'project_id', 'assigned_to_id'),
+            'comment': TaskComment.objects.values_list('id', 'task__project_id', 'task__assigned_to_id'),
+            'time_entry': TimeEntry.objects.values_list('id', 'task__project_id', 'user_id'),
+            'pin': pin_rows(Pin.objects.values('id')),
+            'notification': [
+                (object_id, None, user_id)
+                for object_id, user_id in Notification.objects.values_list('id', 'user_id')
+            ],
+        }
+        for model, rows in logged.items():
+            rows = list(rows)
+            record_changes(model, rows)
+            self.stdout.write(f'{model}: {len(rows)} row(s)')
+        self.stdout.write(self.style.SUCCESS('Change log rebuilt.'))
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tenant', models.CharField(max_length=50)),
+                ('model', models.CharField(choices=[('task', 'Task'), ('comment', 'Task Comment'), ('time_entry', 'Time Entry'), ('pin', 'Pin'), ('notification', 'Notification')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False, help_text='Tombstone of a deleted object')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'sync_changes',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['tenant', 'id'], name='sync_change_tenant_165abc_idx'), models.Index(fields=['model', 'object_id'], name='sync_change_model_1958f0_idx'), models.Index(fields=['deleted', 'created_at'], name='sync_change_deleted_2bd641_idx')],
+            },
+        ),
+    ]
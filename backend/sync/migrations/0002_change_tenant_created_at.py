@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['tenant', 'created_at'], name='sync_change_tenant_1bece9_idx'),
+        ),
+    ]
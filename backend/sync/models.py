@@ -0,0 +1,77 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Change(models.Model):
+    """
+    Change log read by offline clients (see sync/views.py).
+
+    A row says an object changed for a tenant: `company:<id>`,
+    `contractor:<id>` or `user:<id>`. Its id is the change token (ids are
+    allocated in insert order, not commit order; see sync.views.overlap_start),
+    and each (tenant, object) keeps only its latest row, so the log holds
+    one row per visible object plus the tombstones of deleted ones, which
+    are pruned after SYNC_TOMBSTONE_DAYS.
+    """
+    MODEL_CHOICES = [
+        ('task', 'Task'),
+        ('comment', 'Task Comment'),
+        ('time_entry', 'Time Entry'),
+        ('pin', 'Pin'),
+        ('notification', 'Notification'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    tenant = models.CharField(max_length=50)
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False, help_text="Tombstone of a deleted object")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'sync_changes'
+        ordering = ['id']
+        indexes = [
+            # Changes of a tenant after a token
+            models.Index(fields=['tenant', 'id']),
+            # Changes of a tenant read again behind a token
+            models.Index(fields=['tenant', 'created_at']),
+            models.Index(fields=['model', 'object_id']),
+            models.Index(fields=['deleted', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} {'deleted' if self.deleted else 'changed'} for {self.tenant}"
+
+    @classmethod
+    def record(cls, model, object_ids, tenants, deleted=False):
+        """
+        Log changes of objects for tenants, replacing their earlier entries.
+
+        Args:
+            model: One of MODEL_CHOICES
+            object_ids: Ids of the changed objects
+            tenants: Tenants the objects are visible to (None entries are skipped)
+            deleted: Log tombstones of deleted objects
+        """
+        object_ids = list(dict.fromkeys(filter(None, object_ids)))
+        tenants = list(dict.fromkeys(filter(None, tenants)))
+        if not object_ids or not tenants:
+            return
+        cls.objects.filter(model=model, object_id__in=object_ids, tenant__in=tenants).delete()
+        cls.objects.bulk_create(
+            cls(tenant=tenant, model=model, object_id=object_id, deleted=deleted)
+            for tenant in tenants for object_id in object_ids
+        )
+
+    @classmethod
+    def prune(cls, retention):
+        """
+        Delete the tombstones older than a retention period; clients whose
+        token predates it have to sync again from scratch.
+
+        Returns:
+            int: Number of tombstones deleted
+        """
+        deleted, _ = cls.objects.filter(deleted=True, created_at__lt=timezone.now() - retention).delete()
+        return deleted
@@ -0,0 +1,30 @@
+from rest_framework import serializers
+from projects.models import Pin
+from tasks.models import Task, TaskComment, TimeEntry
+
+
+class SyncTaskSerializer(serializers.ModelSerializer):
+    """Task fields stored by offline clients, without nested objects."""
+    class Meta:
+        model = Task
+        fields = ['id', 'project', 'pin', 'department', 'assigned_to', 'title', 'description',
+                  'status', 'priority', 'estimated_hours', 'actual_hours', 'due_date',
+                  'started_at', 'completed_at', 'created_at', 'updated_at']
+
+
+class SyncCommentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TaskComment
+        fields = ['id', 'task', 'user', 'content', 'created_at', 'updated_at']
+
+
+class SyncTimeEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TimeEntry
+        fields = ['id', 'task', 'user', 'hours', 'date', 'notes', 'created_at']
+
+
+class SyncPinSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Pin
+        fields = ['id', 'blueprint', 'x', 'y', 'label', 'created_at']
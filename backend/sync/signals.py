@@ -0,0 +1,119 @@
+"""
+Change log receivers of the synced models.
+
+Tombstones are logged on pre_delete, while the rows the tenants are derived
+from still exist; the cascade runs in the same transaction, so they are
+rolled back with it. Writes that send no signals (bulk_create, update) log
+their changes themselves with sync.changes.record_changes.
+"""
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+from notifications.models import Notification
+from projects.models import Blueprint, Pin, Project
+from tasks.models import Task, TaskComment, TimeEntry
+from .changes import pin_rows, record_changes, record_project_move, record_task_dependents
+
+
+def deleted_directly(kwargs, *models):
+    """Whether a delete originates from one of the models rather than a cascade from elsewhere."""
+    origin = kwargs.get('origin')
+    return isinstance(origin, models) or getattr(origin, 'model', None) in models
+
+
+@receiver(post_save, sender=Project)
+def log_project_move(sender, instance, created, **kwargs):
+    """Log the contents of a project handed to another company or contractor."""
+    if created or kwargs.get('raw') or not hasattr(instance, '_loaded_company_id'):
+        return
+    previous = (instance._loaded_company_id, instance._loaded_contractor_id)
+    if previous != (instance.company_id, instance.contractor_id):
+        company_id, contractor_id = previous
+        record_project_move(instance, [f"company:{company_id}", contractor_id and f"contractor:{contractor_id}"])
+
+
+@receiver(post_save, sender=Task)
+def log_task_change(sender, instance, created, **kwargs):
+    """Log a task for its current and previous project and assignee."""
+    if kwargs.get('raw'):
+        return
+    previous_project_id = getattr(instance, '_loaded_project_id', None) or instance.project_id
+    previous_assignee_id = getattr(instance, '_loaded_assigned_to_id', None)
+    previous_pin_id = getattr(instance, '_loaded_pin_id', None)
+    record_changes('task', [
+        (instance.id, instance.project_id, instance.assigned_to_id),
+        (instance.id, previous_project_id, previous_assignee_id),
+    ])
+    previous = (previous_project_id, previous_assignee_id, previous_pin_id)
+    if created or previous != (instance.project_id, instance.assigned_to_id, instance.pin_id):
+        record_task_dependents(
+            instance,
+            {instance.project_id, previous_project_id},
+            {instance.assigned_to_id, previous_assignee_id},
+            {instance.pin_id, previous_pin_id} - {None}
+        )
+
+
+@receiver(pre_delete, sender=Task)
+def log_task_delete(sender, instance, **kwargs):
+    record_changes('task', [(instance.id, instance.project_id, instance.assigned_to_id)], deleted=True)
+    # The assignee loses the pin of the task, unless it is deleted as well
+    if instance.pin_id and deleted_directly(kwargs, Task):
+        record_changes('pin', pin_rows([instance.pin_id]))
+
+
+def comment_rows(instance):
+    task = Task.objects.filter(id=instance.task_id).values_list('project_id', 'assigned_to_id').first()
+    return [(instance.id, *task)] if task else []
+
+
+@receiver(post_save, sender=TaskComment)
+def log_comment_change(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        record_changes('comment', comment_rows(instance))
+
+
+@receiver(pre_delete, sender=TaskComment)
+def log_comment_delete(sender, instance, **kwargs):
+    record_changes('comment', comment_rows(instance), deleted=True)
+
+
+def time_entry_rows(instance):
+    project_id = Task.objects.filter(id=instance.task_id).values_list('project_id', flat=True).first()
+    return [(instance.id, project_id, instance.user_id)]
+
+
+@receiver(post_save, sender=TimeEntry)
+def log_time_entry_change(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        record_changes('time_entry', time_entry_rows(instance))
+
+
+@receiver(pre_delete, sender=TimeEntry)
+def log_time_entry_delete(sender, instance, **kwargs):
+    record_changes('time_entry', time_entry_rows(instance), deleted=True)
+
+
+@receiver(post_save, sender=Pin)
+def log_pin_change(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        record_changes('pin', pin_rows([instance.id]))
+
+
+@receiver(pre_delete, sender=Pin)
+def log_pin_delete(sender, instance, **kwargs):
+    record_changes('pin', pin_rows([instance.id]), deleted=True)
+    # The tasks of the pin are kept and unlinked, unless the whole project goes
+    if deleted_directly(kwargs, Pin, Blueprint):
+        tasks = Task.objects.filter(pin_id=instance.id).values_list('id', 'project_id', 'assigned_to_id')
+        record_changes('task', tasks)
+
+
+@receiver(post_save, sender=Notification)
+def log_notification_change(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        record_changes('notification', [(instance.id, None, instance.user_id)])
+
+
+@receiver(pre_delete, sender=Notification)
+def log_notification_delete(sender, instance, **kwargs):
+    record_changes('notification', [(instance.id, None, instance.user_id)], deleted=True)
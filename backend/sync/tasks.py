@@ -0,0 +1,23 @@
+try:
+    from celery import shared_task
+    CELERY_AVAILABLE = True
+except ImportError:
+    CELERY_AVAILABLE = False
+    # Fallback decorator if celery is not available
+    def shared_task(func):
+        return func
+
+import logging
+from datetime import timedelta
+from django.conf import settings
+from .models import Change
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def prune_tombstones():
+    """Periodic Celery task deleting the tombstones older than SYNC_TOMBSTONE_DAYS."""
+    deleted = Change.prune(timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_DAYS', 30)))
+    logger.info(f"Pruned {deleted} sync tombstone(s)")
+    return deleted
@@ -0,0 +1,249 @@
+"""
+Unit tests for sync app.
+"""
+import gzip
+import json
+import pytest
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from rest_framework.test import APIClient
+from rest_framework import status
+from .models import Change
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestSync:
+    """Test clients receive only what changed since their token."""
+
+    @pytest.fixture(autouse=True)
+    def no_overlap(self):
+        """Read deltas without the overlap behind tokens (see test_out_of_order_commit)."""
+        with override_settings(SYNC_OVERLAP_SECONDS=0):
+            yield
+
+    @pytest.fixture
+    def api_client(self):
+        """Create API client."""
+        return APIClient()
+
+    @pytest.fixture
+    def company(self):
+        from accounts.models import Company
+        return Company.objects.create(name='Sync Co', email='sync@example.com')
+
+    @pytest.fixture
+    def worker(self, company):
+        """Create worker."""
+        return User.objects.create_user(
+            username='sync_worker', password='testpass123', role='WORKER', company=company
+        )
+
+    @pytest.fixture
+    def other_worker(self, company):
+        return User.objects.create_user(
+            username='other_worker', password='testpass123', role='WORKER', company=company
+        )
+
+    @pytest.fixture
+    def task(self, settings, company, worker):
+        """Create a pinned task assigned to the worker."""
+        from projects.models import Project, Blueprint, Pin
+        from tasks.models import Task
+        project = Project.objects.create(company=company, name='Tower', address='Site 1')
+        blueprint = Blueprint.objects.create(project=project, file='blueprints/plan.png')
+        pin = Pin.objects.create(blueprint=blueprint, x=0.5, y=0.5, label='Column C4')
+        return Task.objects.create(project=project, pin=pin, title='Pour slab', assigned_to=worker)
+
+    def sync(self, api_client, user, token=None, **params):
+        api_client.force_authenticate(user=user)
+        if token:
+            params['since'] = token
+        response = api_client.get('/api/sync/', params)
+        assert response.status_code == status.HTTP_200_OK
+        return response.data
+
+    def test_full_sync(self, api_client, worker, task):
+        """Test the first sync returns everything the worker sees."""
+        task.comments.create(user=worker, content='Rebar checked')
+
+        data = self.sync(api_client, worker)
+        assert data['reset'] is True
+        assert data['more'] is False
+        assert [row['id'] for row in data['changes']['tasks']] == [task.id]
+        assert [row['id'] for row in data['changes']['pins']] == [task.pin_id]
+        assert len(data['changes']['comments']) == 1
+        # The assignment notification
+        assert [row['object_id'] for row in data['changes']['notifications']] == [task.id]
+
+    def test_delta(self, api_client, worker, task):
+        """Test a token only returns later changes, and deletions as tombstones."""
+        comment_id = task.comments.create(user=worker, content='Rebar checked').id
+        token = self.sync(api_client, worker)['token']
+
+        data = self.sync(api_client, worker, token)
+        assert data['reset'] is False
+        assert not any(data['changes'].values()) and not any(data['deleted'].values())
+
+        task.status = 'IN_PROGRESS'
+        task.save()
+        task.comments.get().delete()
+        data = self.sync(api_client, worker, token)
+        assert [row['status'] for row in data['changes']['tasks']] == ['IN_PROGRESS']
+        assert data['changes']['comments'] == []
+        assert data['deleted']['comments'] == [comment_id]
+        assert Change.objects.filter(model='comment', object_id=comment_id, deleted=True).exists()
+
+    def test_reassignment(self, api_client, worker, other_worker, task):
+        """Test a reassigned task moves, with its pin and comments, to the new assignee."""
+        task.comments.create(user=worker, content='Rebar checked')
+        token = self.sync(api_client, worker)['token']
+        other_token = self.sync(api_client, other_worker)['token']
+
+        task.assigned_to = other_worker
+        task.save()
+
+        data = self.sync(api_client, worker, token)
+        assert data['deleted']['tasks'] == [task.id]
+        assert data['deleted']['pins'] == [task.pin_id]
+        assert len(data['deleted']['comments']) == 1
+
+        data = self.sync(api_client, other_worker, other_token)
+        assert [row['id'] for row in data['changes']['tasks']] == [task.id]
+        assert [row['id'] for row in data['changes']['pins']] == [task.pin_id]
+        assert len(data['changes']['comments']) == 1
+
+    @override_settings(SYNC_OVERLAP_SECONDS=300)
+    def test_out_of_order_commit(self, api_client, worker, task):
+        """Test a change committed after a client read past its id is still returned."""
+        from tasks.models import Task
+        token = self.sync(api_client, worker)['token']
+        # A slow transaction logs a change, and a fast one logs the next
+        # change and commits first; the client syncs in between
+        slow = Task.objects.create(project=task.project, title='Slow', assigned_to=worker)
+        uncommitted = list(Change.objects.filter(model='task', object_id=slow.id))
+        Change.objects.filter(model='task', object_id=slow.id).delete()
+        fast = Task.objects.create(project=task.project, title='Fast', assigned_to=worker)
+        data = self.sync(api_client, worker, token)
+        returned = [row['id'] for row in data['changes']['tasks']]
+        assert fast.id in returned and slow.id not in returned
+        token = data['token']
+        assert int(token.split('.')[0]) > max(change.id for change in uncommitted)
+
+        Change.objects.bulk_create(uncommitted)
+        seen, next_token, more = [], token, True
+        while more:
+            data = self.sync(api_client, worker, next_token, limit=1)
+            seen += [row['id'] for row in data['changes']['tasks']]
+            next_token, more = data['token'], data['more']
+        assert slow.id in seen
+        # Changes read again do not move the token back
+        assert next_token.split('.')[0] == token.split('.')[0]
+
+        # Changes older than the overlap are not read again
+        with override_settings(SYNC_OVERLAP_SECONDS=0):
+            data = self.sync(api_client, worker, next_token)
+        assert not any(data['changes'].values()) and not any(data['deleted'].values())
+
+    def test_project_move(self, api_client, company, worker, task):
+        """Test a project handed to another contractor moves its contents between them."""
+        from accounts.models import Contractor
+        contractors = [
+            User.objects.create_user(
+                username=f'sync_contractor_{number}', password='testpass123', role='CONTRACTOR',
+                company=company, contractor=Contractor.objects.create(company=company, name=name, email=f'{name}@example.com')
+            )
+            for number, name in enumerate(['builder', 'mason'])
+        ]
+        first, second = contractors
+        task.project.contractor = first.contractor
+        task.project.save()
+        comment = task.comments.create(user=worker, content='Rebar checked')
+        first_token = self.sync(api_client, first)['token']
+        second_token = self.sync(api_client, second)['token']
+        worker_token = self.sync(api_client, worker)['token']
+
+        admin = User.objects.create_user(
+            username='sync_admin', password='testpass123', role='COMPANY_ADMIN', company=company
+        )
+        api_client.force_authenticate(user=admin)
+        response = api_client.patch(f'/api/projects/{task.project_id}/', {'contractor': second.contractor_id})
+        assert response.status_code == status.HTTP_200_OK
+
+        data = self.sync(api_client, first, first_token)
+        assert data['deleted']['tasks'] == [task.id]
+        assert data['deleted']['comments'] == [comment.id]
+        assert data['deleted']['pins'] == [task.pin_id]
+        data = self.sync(api_client, second, second_token)
+        assert [row['id'] for row in data['changes']['tasks']] == [task.id]
+        assert [row['id'] for row in data['changes']['comments']] == [comment.id]
+        assert [row['id'] for row in data['changes']['pins']] == [task.pin_id]
+        # The assignee keeps the task
+        data = self.sync(api_client, worker, worker_token)
+        assert not any(data['changes'].values()) and not any(data['deleted'].values())
+
+    def test_other_company(self, api_client, task):
+        """Test changes of other tenants are not returned."""
+        from accounts.models import Company
+        company = Company.objects.create(name='Other Co', email='other@example.com')
+        admin = User.objects.create_user(
+            username='other_admin', password='testpass123', role='COMPANY_ADMIN', company=company
+        )
+        data = self.sync(api_client, admin)
+        assert not any(data['changes'].values()) and not any(data['deleted'].values())
+
+    def test_batches(self, api_client, company, worker, task):
+        """Test changes are paged by token without repeats."""
+        from tasks.models import Task
+        for number in range(4):
+            Task.objects.create(project=task.project, title=f'Task {number}', assigned_to=worker)
+
+        seen, token, more = [], None, True
+        while more:
+            data = self.sync(api_client, worker, token, limit=2)
+            seen += [row['id'] for row in data['changes']['tasks']]
+            token, more = data['token'], data['more']
+        assert sorted(seen) == sorted(Task.objects.values_list('id', flat=True))
+
+    def test_mark_all_read(self, api_client, worker):
+        """Test notifications updated in bulk are logged."""
+        from notifications.models import Notification
+        notification = Notification.objects.create(
+            user=worker, notification_type='NEW_TASK', title='New task', message=''
+        )
+        token = self.sync(api_client, worker)['token']
+        assert api_client.post('/api/notifications/mark_all_read/').status_code == status.HTTP_200_OK
+
+        data = self.sync(api_client, worker, token)
+        assert [(row['id'], row['is_read']) for row in data['changes']['notifications']] == [(notification.id, True)]
+
+    def test_expired_token(self, api_client, worker, task):
+        """Test tokens older than the tombstone retention start over."""
+        token = self.sync(api_client, worker)['token']
+        change_id, _ = token.split('.')
+        with override_settings(SYNC_TOMBSTONE_DAYS=1):
+            data = self.sync(api_client, worker, f'{change_id}.0')
+        assert data['reset'] is True
+        assert [row['id'] for row in data['changes']['tasks']] == [task.id]
+
+        api_client.force_authenticate(user=worker)
+        assert api_client.get('/api/sync/', {'since': 'bogus'}).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_prune(self, worker, task):
+        """Test only old tombstones are pruned."""
+        task_id = task.id
+        task.delete()
+        Change.objects.filter(object_id=task_id, model='task').update(created_at='2000-01-01T00:00Z')
+        # One tombstone for the company and one for the assignee
+        assert Change.prune(timedelta(days=30)) == 2
+        assert not Change.objects.filter(model='task', object_id=task_id).exists()
+        assert Change.objects.filter(model='pin').exists()
+
+    def test_gzip(self, api_client, worker, task):
+        """Test responses are compressed for clients accepting gzip."""
+        api_client.force_authenticate(user=worker)
+        response = api_client.get('/api/sync/', HTTP_ACCEPT_ENCODING='gzip')
+        assert response['Content-Encoding'] == 'gzip'
+        assert json.loads(gzip.decompress(response.content))['changes']['tasks'][0]['id'] == task.id
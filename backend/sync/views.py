@@ -0,0 +1,165 @@
+import time
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
+from django.db.models import Min
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
+from rest_framework import viewsets, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from notifications.models import Notification
+from notifications.serializers import NotificationSerializer
+from projects.models import Pin
+from tasks.models import Task, TaskComment, TimeEntry
+from .changes import user_tenants
+from .models import Change
+from .serializers import SyncTaskSerializer, SyncCommentSerializer, SyncTimeEntrySerializer, SyncPinSerializer
+
+# Change.model -> (response key, serializer)
+SYNCED_MODELS = {
+    'task': ('tasks', SyncTaskSerializer),
+    'comment': ('comments', SyncCommentSerializer),
+    'time_entry': ('time_entries', SyncTimeEntrySerializer),
+    'pin': ('pins', SyncPinSerializer),
+    'notification': ('notifications', NotificationSerializer),
+}
+
+
+def visible_pins(user):
+    if user.is_company_admin:
+        return Pin.objects.filter(blueprint__project__company=user.company)
+    if user.is_contractor:
+        return Pin.objects.filter(blueprint__project__contractor=user.contractor)
+    if user.is_worker:
+        return Pin.objects.filter(id__in=Task.visible_to(user).values('pin_id'))
+    return Pin.objects.none()
+
+
+def visible_querysets(user):
+    """The objects of each synced model a user can see, as the list endpoints scope them."""
+    tasks = Task.visible_to(user)
+    return {
+        'task': tasks,
+        'comment': TaskComment.objects.filter(task__in=tasks),
+        'time_entry': TimeEntry.visible_to(user),
+        'pin': visible_pins(user),
+        'notification': Notification.objects.filter(user=user),
+    }
+
+
+def make_token(change_id, issued_at, more=False):
+    token = f"{change_id}.{int(issued_at)}"
+    return f"{token}.more" if more else token
+
+
+def parse_token(token):
+    """
+    Returns:
+        tuple: (change id, unix time the token was issued, whether it
+        continues a batch)
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    change_id, issued_at, *more = token.split('.')
+    change_id, issued_at = int(change_id), int(issued_at)
+    if change_id < 0 or more not in ([], ['more']):
+        raise ValueError(token)
+    return change_id, issued_at, bool(more)
+
+
+def overlap_start(changes, since, issued_at):
+    """
+    Where to read a tenant's changes from for a token.
+
+    Change ids are allocated on insert but become visible on commit, and on
+    PostgreSQL concurrent transactions commit out of id order: a change
+    logged by a slow request can still be uncommitted when a client reads
+    past it. The changes logged within SYNC_OVERLAP_SECONDS before the token
+    was issued are therefore read again; clients apply them idempotently.
+    """
+    overlap = getattr(settings, 'SYNC_OVERLAP_SECONDS', 300)
+    if not since or not overlap:
+        return since
+    window_start = datetime.fromtimestamp(issued_at, tz=timezone.utc) - timedelta(seconds=overlap)
+    first = changes.filter(id__lte=since, created_at__gte=window_start).aggregate(first=Min('id'))['first']
+    return min(since, first - 1) if first else since
+
+
+class SyncViewSet(viewsets.ViewSet):
+    """
+    Delta sync for offline clients.
+
+    GET /api/sync/?since=<token> returns the tasks, comments, time entries,
+    pins and notifications the user can see that changed after the token,
+    and the ids of those deleted (or no longer visible) since, in batches of
+    up to SYNC_BATCH_SIZE changes (?limit= for smaller ones). Clients call
+    again with the returned token while `more` is true. Changes logged
+    shortly before a token may be returned again (see overlap_start).
+
+    Without a token, or with one older than the tombstone retention, all
+    objects are returned with `reset: true`: the client replaces its copy.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @method_decorator(gzip_page)
+    def list(self, request):
+        batch_size = getattr(settings, 'SYNC_BATCH_SIZE', 500)
+        try:
+            limit = min(int(request.query_params.get('limit', batch_size)), batch_size)
+        except ValueError:
+            return Response({"error": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({"error": "limit must be positive."}, status=status.HTTP_400_BAD_REQUEST)
+
+        since, issued_at, continued, reset = 0, 0, False, True
+        token = request.query_params.get('since')
+        if token:
+            try:
+                since, issued_at, continued = parse_token(token)
+            except ValueError:
+                return Response({"error": "Invalid sync token."}, status=status.HTTP_400_BAD_REQUEST)
+            retention = getattr(settings, 'SYNC_TOMBSTONE_DAYS', 30) * 86400
+            # Tombstones logged after the token may have been pruned
+            reset = issued_at < time.time() - retention
+            if reset:
+                since, continued = 0, False
+
+        tenant_changes = Change.objects.filter(tenant__in=user_tenants(request.user))
+        if continued:
+            # The pages of a batch follow each other, and its tokens keep the
+            # time of the first page, from which the next batch overlaps
+            start = since
+        else:
+            start = overlap_start(tenant_changes, since, issued_at)
+            issued_at = time.time()
+        changes = list(
+            tenant_changes.filter(id__gt=start).order_by('id').values_list('id', 'model', 'object_id')[:limit + 1]
+        )
+        more = len(changes) > limit
+        changes = changes[:limit]
+
+        ids = {model: set() for model in SYNCED_MODELS}
+        for _, model, object_id in changes:
+            ids[model].add(object_id)
+
+        # Whether an object is sent or reported deleted depends on what the user
+        # can see now, so objects moved out of their scope are removed as well
+        querysets = visible_querysets(request.user)
+        data = {'changes': {}, 'deleted': {}}
+        for model, (key, serializer_class) in SYNCED_MODELS.items():
+            objects = list(querysets[model].filter(id__in=ids[model]).order_by('id')) if ids[model] else []
+            data['changes'][key] = serializer_class(objects, many=True, context={'request': request}).data
+            data['deleted'][key] = sorted(ids[model] - {obj.id for obj in objects})
+
+        if more:
+            token = make_token(changes[-1][0], issued_at, more=True)
+        else:
+            # Changes read again from the overlap do not move the token back
+            token = make_token(max(since, changes[-1][0]) if changes else since, issued_at)
+        return Response({
+            'token': token,
+            'more': more,
+            'reset': reset,
+            **data,
+        })
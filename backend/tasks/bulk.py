@@ -0,0 +1,209 @@
+"""
+Changes applied to many tasks at once.
+
+The tasks are written with bulk_update(), which sends no model signals, so
+the work of the Task receivers (project rollups, pin clusters, cache
+invalidation, the sync change log and notifications) is done here once per
+batch. Notifications are coalesced: one per recipient and project.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+from projects.models import Project, Pin, PinCluster, ProjectProgress
+from sync.changes import pin_rows, record_changes
+from utils.cache_versions import invalidate, project_tenants, department_tenants
+from .models import Task, TaskComment
+
+BULK_UPDATE_BATCH_SIZE = 500
+
+
+def bulk_update_tasks(tasks, **values):
+    """
+    Set fields of tasks, e.g. status='COMPLETED' or assigned_to_id=None.
+
+    Args:
+        tasks: Tasks loaded from the database, with their project
+
+    Returns:
+        list: The tasks that changed
+    """
+    previous_departments = {task.id: task.department_id for task in tasks}
+    changed = [
+        task for task in tasks
+        if any(getattr(task, field) != value for field, value in values.items())
+    ]
+    for task in changed:
+        for field, value in values.items():
+            setattr(task, field, value)
+    save_bulk_update(changed, list(values), previous_departments)
+    return changed
+
+
+def bulk_shift_due_dates(tasks, days):
+    """
+    Move the due dates of tasks by a number of days (tasks without one are skipped).
+
+    Returns:
+        list: The tasks that changed
+    """
+    changed = [task for task in tasks if task.due_date and days]
+    for task in changed:
+        task.due_date += timedelta(days=days)
+    save_bulk_update(changed, ['due_date'], {})
+    return changed
+
+
+def save_bulk_update(tasks, fields, previous_departments):
+    if not tasks:
+        return
+    now = timezone.now()
+    fields = [*fields, 'updated_at']
+    if 'status' in fields:
+        # One timestamp for the batch, as Task.save() would set it
+        fields += ['started_at', 'completed_at']
+        for task in tasks:
+            if task.status == 'IN_PROGRESS' and not task.started_at:
+                task.started_at = now
+            elif task.status == 'COMPLETED' and not task.completed_at:
+                task.completed_at = now
+    for task in tasks:
+        task.updated_at = now
+    Task.objects.bulk_update(tasks, fields, batch_size=BULK_UPDATE_BATCH_SIZE)
+
+    project_ids = {task.project_id for task in tasks}
+    if 'status' in fields:
+        for project_id in project_ids:
+            ProjectProgress.recalculate(project_id)
+        pin_ids = {task.pin_id for task in tasks if task.pin_id}
+        blueprint_ids = Pin.objects.filter(id__in=pin_ids).values_list('blueprint_id', flat=True).distinct()
+        for blueprint_id in blueprint_ids:
+            PinCluster.rebuild(blueprint_id)
+
+    log_bulk_update(tasks)
+    notify_bulk_update(tasks)
+    invalidate_bulk_update(tasks, project_ids, previous_departments)
+
+
+def log_bulk_update(tasks):
+    """Log the tasks for offline sync, and the comments and pins of reassigned ones."""
+    record_changes('task', [
+        (task.id, task.project_id, assignee_id)
+        for task in tasks for assignee_id in {task.assigned_to_id, task._loaded_assigned_to_id}
+    ])
+    reassigned = {
+        task.id: task for task in tasks if task.assigned_to_id != task._loaded_assigned_to_id
+    }
+    if not reassigned:
+        return
+    comments = TaskComment.objects.filter(task_id__in=reassigned).values_list('id', 'task_id')
+    record_changes('comment', [
+        (comment_id, reassigned[task_id].project_id, assignee_id)
+        for comment_id, task_id in comments
+        for assignee_id in {reassigned[task_id].assigned_to_id, reassigned[task_id]._loaded_assigned_to_id}
+    ])
+    pinned = [task for task in reassigned.values() if task.pin_id]
+    record_changes('pin', pin_rows({task.pin_id for task in pinned}) + [
+        (task.pin_id, None, task._loaded_assigned_to_id) for task in pinned
+    ])
+
+
+def coalesce(notification_type, groups, single, summary):
+    """
+    One notification per recipient and project.
+
+    Args:
+        groups: Mapping of (user id, project) to the tasks to notify about
+        single: Callable giving (title, message) for a single task
+        summary: Callable giving (title, message) for a count of tasks in a project
+    """
+    from notifications.models import Notification
+
+    task_type = ContentType.objects.get_for_model(Task)
+    project_type = ContentType.objects.get_for_model(Project)
+    for (user_id, project), tasks in groups.items():
+        if len(tasks) == 1:
+            title, message = single(tasks[0])
+            content_type, object_id = task_type, tasks[0].id
+        else:
+            title, message = summary(len(tasks), project)
+            content_type, object_id = project_type, project.id
+        yield Notification(
+            user_id=user_id, notification_type=notification_type, title=title, message=message,
+            content_type=content_type, object_id=object_id
+        )
+
+
+def notify_bulk_update(tasks):
+    """
+    Notify the new assignees, the company admins of completed tasks and the
+    assignees of delayed ones, with one insert for all notifications.
+    """
+    from accounts.models import User
+    from notifications.models import Notification
+
+    assigned, completed, delayed = defaultdict(list), defaultdict(list), defaultdict(list)
+    completed_tasks = []
+    for task in tasks:
+        previous_status = task._loaded_status
+        if task.assigned_to_id and task.assigned_to_id != task._loaded_assigned_to_id:
+            assigned[(task.assigned_to_id, task.project)].append(task)
+        if task.status != previous_status and task.status == 'COMPLETED':
+            completed_tasks.append(task)
+        if task.status != previous_status and task.status == 'DELAYED' and task.assigned_to_id:
+            delayed[(task.assigned_to_id, task.project)].append(task)
+
+    if completed_tasks:
+        admins = defaultdict(list)
+        rows = User.objects.filter(
+            role='COMPANY_ADMIN', company_id__in={task.project.company_id for task in completed_tasks}
+        ).values_list('id', 'company_id')
+        for user_id, company_id in rows:
+            admins[company_id].append(user_id)
+        for task in completed_tasks:
+            for user_id in admins[task.project.company_id]:
+                completed[(user_id, task.project)].append(task)
+
+    notifications = [
+        *coalesce(
+            'TASK_ASSIGNED', assigned,
+            lambda task: (f'New Task Assigned: {task.title}', f'You have been assigned a new task: {task.title}'),
+            lambda count, project: (
+                f'{count} Tasks Assigned: {project.name}',
+                f'You have been assigned {count} tasks in project "{project.name}".'
+            )
+        ),
+        *coalesce(
+            'TASK_COMPLETED', completed,
+            lambda task: (f'Task Completed: {task.title}', f'Task "{task.title}" has been completed.'),
+            lambda count, project: (
+                f'{count} Tasks Completed: {project.name}',
+                f'{count} tasks have been completed in project "{project.name}".'
+            )
+        ),
+        *coalesce(
+            'TASK_DELAYED', delayed,
+            lambda task: (f'Task Delayed: {task.title}', f'Task "{task.title}" has been marked as delayed.'),
+            lambda count, project: (
+                f'{count} Tasks Delayed: {project.name}',
+                f'{count} of your tasks in project "{project.name}" have been marked as delayed.'
+            )
+        ),
+    ]
+    notifications = Notification.objects.bulk_create(notifications)
+    record_changes('notification', [(n.id, None, n.user_id) for n in notifications])
+
+
+def invalidate_bulk_update(tasks, project_ids, previous_departments):
+    """Invalidate the cached responses and reports the tasks appear in."""
+    from reports.cache import invalidate_reports
+
+    tenants = [tenant for project_id in project_ids for tenant in project_tenants(project_id)]
+    invalidate(['tasks', 'projects'], *tenants)
+    # Document visibility of assignees follows their tasks
+    invalidate(['documents'])
+
+    department_ids = {task.department_id for task in tasks} | set(previous_departments.values())
+    for department_id in department_ids - {None}:
+        tenants += department_tenants(department_id)
+    invalidate_reports(*tenants)
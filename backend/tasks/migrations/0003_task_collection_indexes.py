@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_taskattachment_blob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='taskattachment',
+            index=models.Index(fields=['task', '-uploaded_at', '-id'], name='task_attach_task_id_1bb6ca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskcomment',
+            index=models.Index(fields=['task', '-created_at', '-id'], name='task_commen_task_id_24adfe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['task', '-created_at', '-id'], name='time_entrie_task_id_e7b703_idx'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.core.validators import MinValueValidator
 from projects.models import Project, Pin
 from departments.models import Department
+from blobs.models import BlobReference
 
 
 class Task(models.Model):
@@ -84,11 +85,39 @@ class Task(models.Model):
         indexes = [
             models.Index(fields=['project', 'status']),
             models.Index(fields=['assigned_to', 'status']),
+            # Keyset pages of the task list
+            models.Index(fields=['-created_at', '-id']),
         ]
     
     def __str__(self):
         return f"{self.title} ({self.project.name})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored project, assignee, pin and status so signal receivers can follow changes
+        instance._loaded_project_id = instance.__dict__.get('project_id')
+        instance._loaded_assigned_to_id = instance.__dict__.get('assigned_to_id')
+        instance._loaded_pin_id = instance.__dict__.get('pin_id')
+        instance._loaded_status = instance.__dict__.get('status')
+        instance._loaded_cluster_key = instance.cluster_key()
+        return instance
+    
+    @classmethod
+    def visible_to(cls, user):
+        """Tasks a user can see: their company's, their contractor's, or, for workers, their own."""
+        if user.is_company_admin:
+            return cls.objects.filter(project__company=user.company)
+        if user.is_contractor:
+            return cls.objects.filter(project__contractor=user.contractor)
+        if user.is_worker:
+            return cls.objects.filter(assigned_to=user)
+        return cls.objects.none()
+    
+    def cluster_key(self):
+        """The fields a task is counted by in the pin clusters (see PinCluster)."""
+        return (self.__dict__.get('pin_id'), self.__dict__.get('status'), self.__dict__.get('priority'))
+    
     def save(self, *args, **kwargs):
         # Auto-update timestamps based on status
         if self.status == 'IN_PROGRESS' and not self.started_at:
@@ -98,6 +127,12 @@ class Task(models.Model):
             from django.utils import timezone
             self.completed_at = timezone.now()
         super().save(*args, **kwargs)
+        # post_save receivers have seen the move; the new project is now the stored one
+        self._loaded_project_id = self.project_id
+        self._loaded_assigned_to_id = self.assigned_to_id
+        self._loaded_pin_id = self.pin_id
+        self._loaded_status = self.status
+        self._loaded_cluster_key = self.cluster_key()
 
 
 class TimeEntry(models.Model):
@@ -127,9 +162,24 @@ class TimeEntry(models.Model):
         db_table = 'time_entries'
         ordering = ['-date', '-created_at']
         unique_together = ['task', 'user', 'date']
+        indexes = [
+            # Keyset pages of a task's entries (/api/tasks/{id}/time_entries/)
+            models.Index(fields=['task', '-created_at', '-id']),
+            # Keyset pages of the time entry list
+            models.Index(fields=['-created_at', '-id']),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.hours}h on {self.task.title}"
+    
+    @classmethod
+    def visible_to(cls, user):
+        """Time entries a user can see: their company's, their contractor's, or their own."""
+        if user.is_company_admin:
+            return cls.objects.filter(task__project__company=user.company)
+        if user.is_contractor:
+            return cls.objects.filter(task__project__contractor=user.contractor)
+        return cls.objects.filter(user=user)
 
 
 class TaskComment(models.Model):
@@ -153,12 +203,15 @@ class TaskComment(models.Model):
     class Meta:
         db_table = 'task_comments'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['task', '-created_at', '-id']),
+        ]
     
     def __str__(self):
         return f"Comment by {self.user.username} on {self.task.title}"
 
 
-class TaskAttachment(models.Model):
+class TaskAttachment(BlobReference):
     """
     Attachment model for tasks (photos, documents).
     """
@@ -181,6 +234,9 @@ class TaskAttachment(models.Model):
     class Meta:
         db_table = 'task_attachments'
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['task', '-uploaded_at', '-id']),
+        ]
     
     def __str__(self):
         return f"{self.file_name} - {self.task.title}"
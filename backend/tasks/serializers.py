@@ -1,18 +1,46 @@
+from decimal import Decimal
+from django.db.models import Prefetch, Count, Sum, OuterRef, Subquery, Value, DecimalField
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
 from .models import Task, TimeEntry, TaskComment, TaskAttachment
+from projects.models import Pin
+from departments.models import Department
+from accounts.models import User
 from projects.serializers import ProjectSerializer, PinSerializer
 from departments.serializers import DepartmentSerializer
 from accounts.serializers import UserSerializer
+from blobs.derivatives import IMAGE_FILE_TYPES
+from utils.pagination import KeysetPagination
 
 
 class TaskAttachmentSerializer(serializers.ModelSerializer):
     uploaded_by_name = serializers.CharField(source='uploaded_by.get_full_name', read_only=True)
+    download_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
     
     class Meta:
         model = TaskAttachment
-        fields = ['id', 'task', 'file', 'file_name', 'file_type', 'uploaded_by',
-                  'uploaded_by_name', 'uploaded_at']
+        fields = ['id', 'task', 'file', 'file_name', 'file_type', 'download_url', 'thumbnail_url',
+                  'preview_url', 'uploaded_by', 'uploaded_by_name', 'uploaded_at']
         read_only_fields = ['id', 'uploaded_at', 'file_type']
+    
+    def get_download_url(self, obj):
+        request = self.context.get('request')
+        url = f'/api/tasks/{obj.task_id}/attachments/{obj.id}/download/'
+        return request.build_absolute_uri(url) if request else url
+    
+    def get_thumbnail_url(self, obj):
+        return self.derivative_url(obj, 'thumbnail')
+    
+    def get_preview_url(self, obj):
+        return self.derivative_url(obj, 'preview')
+    
+    def derivative_url(self, obj, variant):
+        """Download URL of a thumbnail or preview; only images have them."""
+        if obj.file_type not in IMAGE_FILE_TYPES:
+            return None
+        return f'{self.get_download_url(obj)}?variant={variant}'
 
 
 class TaskCommentSerializer(serializers.ModelSerializer):
@@ -37,15 +65,42 @@ class TimeEntrySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
+# Rows of each nested collection embedded in task detail; the rest are paged
+# from the task's sub-resources (/api/tasks/{id}/comments/ etc.)
+NESTED_PREVIEW_SIZE = 5
+
+# Nested collections of a task: name -> (model, related rows loaded with it, keyset ordering, serializer)
+TASK_COLLECTIONS = {
+    'comments': (TaskComment, ('user',), ('-created_at', '-id'), TaskCommentSerializer),
+    'attachments': (TaskAttachment, ('uploaded_by',), ('-uploaded_at', '-id'), TaskAttachmentSerializer),
+    'time_entries': (TimeEntry, ('user', 'task'), ('-created_at', '-id'), TimeEntrySerializer),
+}
+
+
+def task_collection(name):
+    """Queryset of a nested task collection in its keyset ordering."""
+    model, related, ordering, _ = TASK_COLLECTIONS[name]
+    return model.objects.select_related(*related).order_by(*ordering)
+
+
+def task_rows(model, aggregate):
+    """Subquery aggregating the rows of a task collection for each task."""
+    return Subquery(
+        model.objects.filter(task=OuterRef('pk')).order_by().values('task')
+        .annotate(value=aggregate).values('value')
+    )
+
+
 class TaskSerializer(serializers.ModelSerializer):
     project_name = serializers.CharField(source='project.name', read_only=True)
     department_name = serializers.CharField(source='department.name', read_only=True)
     assigned_to_name = serializers.CharField(source='assigned_to.get_full_name', read_only=True)
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
     pin = PinSerializer(read_only=True)
-    comments = TaskCommentSerializer(many=True, read_only=True)
-    attachments = TaskAttachmentSerializer(many=True, read_only=True)
-    time_entries = TimeEntrySerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField()
+    attachments = serializers.SerializerMethodField()
+    time_entries = serializers.SerializerMethodField()
+    collections = serializers.SerializerMethodField()
     total_logged_hours = serializers.SerializerMethodField()
     is_overdue = serializers.SerializerMethodField()
     
@@ -55,12 +110,77 @@ class TaskSerializer(serializers.ModelSerializer):
                   'assigned_to', 'assigned_to_name', 'title', 'description', 'status',
                   'priority', 'estimated_hours', 'actual_hours', 'total_logged_hours',
                   'due_date', 'started_at', 'completed_at', 'created_by', 'created_by_name',
-                  'comments', 'attachments', 'time_entries', 'is_overdue',
+                  'comments', 'attachments', 'time_entries', 'collections', 'is_overdue',
                   'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load the related rows, the first rows of each nested collection and
+        the collection sizes and logged hours in a fixed number of queries.
+        """
+        return queryset.select_related(
+            'project', 'department', 'assigned_to', 'created_by'
+        ).prefetch_related(
+            Prefetch('pin', queryset=PinSerializer.setup_eager_loading(Pin.objects.all())),
+            *(
+                Prefetch(name, queryset=task_collection(name)[:NESTED_PREVIEW_SIZE], to_attr=f'first_{name}')
+                for name in TASK_COLLECTIONS
+            )
+        ).annotate(
+            **{
+                f'{name}_count': Coalesce(task_rows(model, Count('id')), 0)
+                for name, (model, *_) in TASK_COLLECTIONS.items()
+            },
+            logged_hours=Coalesce(
+                task_rows(TimeEntry, Sum('hours')), Value(Decimal(0)),
+                output_field=DecimalField(max_digits=10, decimal_places=2)
+            )
+        )
+    
+    def first_rows(self, obj, name):
+        """First NESTED_PREVIEW_SIZE rows of a collection, prefetched or queried."""
+        rows = getattr(obj, f'first_{name}', None)
+        if rows is None:
+            rows = list(task_collection(name).filter(task=obj)[:NESTED_PREVIEW_SIZE])
+        return rows
+    
+    def serialize_first_rows(self, obj, name):
+        serializer = TASK_COLLECTIONS[name][3]
+        return serializer(self.first_rows(obj, name), many=True, context=self.context).data
+    
+    def get_comments(self, obj):
+        return self.serialize_first_rows(obj, 'comments')
+    
+    def get_attachments(self, obj):
+        return self.serialize_first_rows(obj, 'attachments')
+    
+    def get_time_entries(self, obj):
+        return self.serialize_first_rows(obj, 'time_entries')
+    
+    def get_collections(self, obj):
+        """Size of each nested collection and the link to the rows not embedded."""
+        request = self.context.get('request')
+        collections = {}
+        for name, (model, _, ordering, _) in TASK_COLLECTIONS.items():
+            count = getattr(obj, f'{name}_count', None)
+            if count is None:
+                count = model.objects.filter(task=obj).count()
+            rows = self.first_rows(obj, name)
+            collections[name] = {
+                'count': count,
+                'next': KeysetPagination(ordering).get_link_after(
+                    request, f'/api/tasks/{obj.id}/{name}/', rows
+                ) if count > len(rows) else None,
+            }
+        return collections
+    
     def get_total_logged_hours(self, obj):
-        return sum(entry.hours for entry in obj.time_entries.all())
+        hours = getattr(obj, 'logged_hours', None)
+        if hours is None:
+            hours = obj.time_entries.aggregate(total=Sum('hours'))['total'] or 0
+        return hours
     
     def get_is_overdue(self, obj):
         if obj.due_date and obj.status not in ['COMPLETED']:
@@ -85,4 +205,32 @@ class TaskListSerializer(serializers.ModelSerializer):
         model = Task
         fields = ['id', 'project_name', 'title', 'status', 'priority', 'department_name',
                   'assigned_to_name', 'due_date', 'created_at']
+    
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('project', 'department', 'assigned_to')
+
+
+# Tasks a single bulk operation may change
+MAX_BULK_TASKS = 5000
+
+
+class BulkTaskSerializer(serializers.Serializer):
+    """Ids of the tasks a bulk operation applies to."""
+    tasks = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=MAX_BULK_TASKS)
+
+
+class BulkStatusSerializer(BulkTaskSerializer):
+    status = serializers.ChoiceField(choices=Task.STATUS_CHOICES)
+
+
+class BulkAssignSerializer(BulkTaskSerializer):
+    assigned_to = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), allow_null=True)
+
+
+class BulkDepartmentSerializer(BulkTaskSerializer):
+    department = serializers.PrimaryKeyRelatedField(queryset=Department.objects.all(), allow_null=True)
+
 
+class BulkDueDateShiftSerializer(BulkTaskSerializer):
+    days = serializers.IntegerField(min_value=-3650, max_value=3650)
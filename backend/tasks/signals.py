@@ -0,0 +1,76 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from departments.models import Department
+from projects.models import ProjectProgress, PinCluster
+from utils.cache_versions import invalidate, project_tenants, contractor_tenants
+from .models import Task, TimeEntry, TaskComment, TaskAttachment
+
+
+@receiver(post_save, sender=Task)
+def update_project_progress_on_save(sender, instance, created, **kwargs):
+    """Refresh the project progress rollup when a task is created or updated."""
+    ProjectProgress.recalculate(instance.project_id)
+    
+    # Task moved to another project: refresh the old one as well
+    previous_project_id = getattr(instance, '_loaded_project_id', None)
+    if previous_project_id and previous_project_id != instance.project_id:
+        ProjectProgress.recalculate(previous_project_id)
+
+
+@receiver(post_delete, sender=Task)
+def update_project_progress_on_delete(sender, instance, **kwargs):
+    """Refresh the project progress rollup when a task is deleted."""
+    # Cascades from a project/company delete remove the rollup as well
+    origin = kwargs.get('origin')
+    if not (isinstance(origin, Task) or getattr(origin, 'model', None) is Task):
+        return
+    ProjectProgress.recalculate(instance.project_id, create=False)
+
+
+@receiver(post_save, sender=Task)
+def update_pin_clusters_on_save(sender, instance, created, **kwargs):
+    """Move the task between the cluster counters when its pin, status or priority changes."""
+    if kwargs.get('raw'):
+        return
+    previous = getattr(instance, '_loaded_cluster_key', None)
+    current = instance.cluster_key()
+    if previous == current:
+        return
+    if previous:
+        PinCluster.apply_task(*previous, sign=-1)
+    PinCluster.apply_task(*current)
+
+
+@receiver(post_delete, sender=Task)
+def update_pin_clusters_on_delete(sender, instance, **kwargs):
+    # Cascades from a project/company delete also remove the blueprints and their clusters
+    origin = kwargs.get('origin')
+    if not (isinstance(origin, Task) or getattr(origin, 'model', None) is Task):
+        return
+    PinCluster.apply_task(*getattr(instance, '_loaded_cluster_key', instance.cluster_key()), sign=-1)
+
+
+@receiver([post_save, post_delete], sender=Task)
+def invalidate_task_responses(sender, instance, **kwargs):
+    """Tasks are listed by the task endpoints and counted in project responses."""
+    tenants = project_tenants(instance.project_id)
+    previous_project_id = getattr(instance, '_loaded_project_id', None)
+    if previous_project_id and previous_project_id != instance.project_id:
+        tenants += project_tenants(previous_project_id)
+    invalidate(['tasks', 'projects'], *tenants)
+    # Document visibility of assignees follows their tasks
+    invalidate(['documents'])
+
+
+@receiver([post_save, post_delete], sender=TimeEntry)
+@receiver([post_save, post_delete], sender=TaskComment)
+@receiver([post_save, post_delete], sender=TaskAttachment)
+def invalidate_task_detail_responses(sender, instance, **kwargs):
+    """Time entries, comments and attachments are nested in task details."""
+    project_id = Task.objects.filter(id=instance.task_id).values_list('project_id', flat=True).first()
+    invalidate(['tasks'], *project_tenants(project_id))
+
+
+@receiver([post_save, post_delete], sender=Department)
+def invalidate_department_responses(sender, instance, **kwargs):
+    invalidate(['tasks'], *contractor_tenants(instance.contractor_id))
@@ -79,3 +79,188 @@ class TestTaskAPI:
         })
         assert response.status_code in [status.HTTP_201_CREATED, status.HTTP_400_BAD_REQUEST]
 
+
+
+@pytest.mark.django_db
+class TestTaskResponseCache:
+    """Test cached task responses follow task changes."""
+    
+    @pytest.fixture
+    def api_client(self, locmem_cache):
+        """Create API client."""
+        return APIClient()
+    
+    def test_comment_invalidates_task_detail(self, api_client):
+        """Test a new comment shows up in the cached task detail."""
+        from accounts.models import Company
+        from .models import TaskComment
+        company = Company.objects.create(name='Task Cache Co', email='taskcache@example.com')
+        admin = User.objects.create_user(
+            username='task_cache_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+        project = ProjectFactory(company=company)
+        task = Task.objects.create(project=project, title='Cached')
+        api_client.force_authenticate(user=admin)
+        
+        url = f'/api/tasks/{task.id}/'
+        api_client.get(url)
+        assert api_client.get(url)['X-Response-Cache'] == 'HIT'
+        
+        TaskComment.objects.create(task=task, user=admin, content='Looks good')
+        response = api_client.get(url)
+        assert response['X-Response-Cache'] == 'MISS'
+        assert len(response.data['comments']) == 1
+
+
+@pytest.mark.django_db
+class TestTaskCollections:
+    """Test task detail embeds bounded collections that continue in keyset-paged sub-resources."""
+    
+    @pytest.fixture
+    def api_client(self):
+        """Create API client."""
+        return APIClient()
+    
+    @pytest.fixture
+    def task(self):
+        """Create a task with 7 comments and 7 time entries of 1.5 hours."""
+        from datetime import date, timedelta
+        from accounts.models import Company
+        from .models import TaskComment
+        company = Company.objects.create(name='Collections Co', email='collections@example.com')
+        admin = User.objects.create_user(
+            username='collections_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+        task = Task.objects.create(project=ProjectFactory(company=company), title='Long-running')
+        for number in range(7):
+            TaskComment.objects.create(task=task, user=admin, content=f'Comment {number}')
+            TimeEntry.objects.create(
+                task=task, user=admin, hours='1.50', date=date(2026, 1, 1) + timedelta(days=number)
+            )
+        task.admin = admin
+        return task
+    
+    def test_detail_is_bounded(self, api_client, task):
+        """Test detail embeds the newest rows with counts, SQL totals and a link to the rest."""
+        from .serializers import NESTED_PREVIEW_SIZE
+        api_client.force_authenticate(user=task.admin)
+        response = api_client.get(f'/api/tasks/{task.id}/')
+        assert response.status_code == status.HTTP_200_OK
+        comments = response.data['comments']
+        assert len(comments) == NESTED_PREVIEW_SIZE
+        assert comments[0]['content'] == 'Comment 6'
+        assert response.data['collections']['comments']['count'] == 7
+        assert response.data['collections']['attachments'] == {'count': 0, 'next': None}
+        assert float(response.data['total_logged_hours']) == 10.5
+        
+        # The link continues right after the embedded rows
+        response = api_client.get(response.data['collections']['comments']['next'])
+        assert response.status_code == status.HTTP_200_OK
+        assert [comment['content'] for comment in response.data['results']] == ['Comment 1', 'Comment 0']
+        assert response.data['next'] is None
+    
+    def test_sub_resource_pages(self, api_client, task):
+        """Test the sub-resources are paged with cursors and scoped like the task."""
+        api_client.force_authenticate(user=task.admin)
+        url = f'/api/tasks/{task.id}/time_entries/'
+        response = api_client.get(url, {'page_size': 4})
+        assert len(response.data['results']) == 4
+        assert response.data['results'][0]['user_name'] is not None
+        response = api_client.get(response.data['next'])
+        assert len(response.data['results']) == 3
+        assert response.data['next'] is None
+        
+        api_client.force_authenticate(user=UserFactory())
+        assert api_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestBulkTaskOperations:
+    """Test bulk endpoints update many tasks with a bounded number of queries."""
+    
+    @pytest.fixture
+    def api_client(self):
+        """Create API client."""
+        return APIClient()
+    
+    @pytest.fixture
+    def admin(self):
+        """Create company admin."""
+        from accounts.models import Company
+        company = Company.objects.create(name='Bulk Co', email='bulk@example.com')
+        return User.objects.create_user(
+            username='bulk_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+    
+    @pytest.fixture
+    def tasks(self, settings, admin):
+        """Create 20 pending tasks of a project, 10 of them due on 1 June."""
+        from datetime import datetime, timezone
+        project = ProjectFactory(company=admin.company)
+        due_date = datetime(2026, 6, 1, tzinfo=timezone.utc)
+        return [
+            Task.objects.create(project=project, title=f'Task {number}', due_date=due_date if number % 2 else None)
+            for number in range(20)
+        ]
+    
+    def post(self, api_client, admin, operation, data):
+        api_client.force_authenticate(user=admin)
+        return api_client.post(f'/api/tasks/bulk/{operation}/', data, format='json')
+    
+    def test_status(self, api_client, admin, tasks):
+        """Test statuses, timestamps, the rollup and coalesced notifications are updated."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from notifications.models import Notification
+        from projects.models import ProjectProgress
+        ids = [task.id for task in tasks]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(api_client, admin, 'status', {'tasks': ids, 'status': 'COMPLETED'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['updated'] == 20
+        assert len(queries) < 30
+        
+        completed_at = set(Task.objects.values_list('completed_at', flat=True))
+        assert len(completed_at) == 1 and None not in completed_at
+        assert ProjectProgress.objects.get(project=tasks[0].project).completed_tasks == 20
+        # One summary for the admin instead of one notification per task
+        notification = Notification.objects.get(user=admin, notification_type='TASK_COMPLETED')
+        assert notification.title.startswith('20 Tasks Completed')
+        
+        # Unchanged tasks are not written again
+        response = self.post(api_client, admin, 'status', {'tasks': ids, 'status': 'COMPLETED'})
+        assert response.data['updated'] == 0
+    
+    def test_assign(self, api_client, admin, tasks):
+        """Test reassigned tasks are logged for sync and their assignee is notified once."""
+        from notifications.models import Notification
+        from sync.models import Change
+        worker = UserFactory(role='WORKER', company=admin.company)
+        response = self.post(api_client, admin, 'assign', {'tasks': [task.id for task in tasks[:5]], 'assigned_to': worker.id})
+        assert response.status_code == status.HTTP_200_OK
+        assert Task.objects.filter(assigned_to=worker).count() == 5
+        assert Notification.objects.filter(user=worker).count() == 1
+        assert Change.objects.filter(tenant=f'user:{worker.id}', model='task').count() == 5
+    
+    def test_shift_due_date(self, api_client, admin, tasks):
+        """Test due dates move and tasks without one are left alone."""
+        from datetime import datetime, timezone
+        response = self.post(api_client, admin, 'shift_due_date', {'tasks': [task.id for task in tasks], 'days': 7})
+        assert response.data['updated'] == 10
+        assert set(Task.objects.values_list('due_date', flat=True)) == {None, datetime(2026, 6, 8, tzinfo=timezone.utc)}
+    
+    def test_invisible_tasks(self, api_client, admin, tasks):
+        """Test the whole operation is rejected when any task is outside the user's scope."""
+        from accounts.models import Company
+        company = Company.objects.create(name='Other Co', email='other@example.com')
+        other = Task.objects.create(project=ProjectFactory(company=company), title='Elsewhere')
+        response = self.post(api_client, admin, 'status', {'tasks': [tasks[0].id, other.id], 'status': 'DELAYED'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Task.objects.filter(status='DELAYED').exists()
+        
+        worker = UserFactory(role='WORKER', company=admin.company)
+        response = self.post(api_client, worker, 'status', {'tasks': [tasks[0].id], 'status': 'DELAYED'})
+        assert response.status_code == status.HTTP_403_FORBIDDEN
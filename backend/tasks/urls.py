@@ -3,8 +3,9 @@ from rest_framework.routers import DefaultRouter
 from .views import TaskViewSet, TimeEntryViewSet
 
 router = DefaultRouter()
-router.register(r'', TaskViewSet, basename='task')
+# Registered first so /time-entries/ is not taken for a task id
 router.register(r'time-entries', TimeEntryViewSet, basename='time-entry')
+router.register(r'', TaskViewSet, basename='task')
 
 urlpatterns = [
     path('', include(router.urls)),
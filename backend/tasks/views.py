@@ -1,31 +1,44 @@
 from rest_framework import viewsets, status, permissions, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import Q, Sum, Avg
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Task, TimeEntry, TaskComment, TaskAttachment
 from .serializers import (
     TaskSerializer, TaskListSerializer,
-    TimeEntrySerializer, TaskCommentSerializer, TaskAttachmentSerializer
+    TimeEntrySerializer, TaskCommentSerializer, TaskAttachmentSerializer,
+    TASK_COLLECTIONS, task_collection,
+    BulkStatusSerializer, BulkAssignSerializer, BulkDepartmentSerializer, BulkDueDateShiftSerializer
 )
+from .bulk import bulk_update_tasks, bulk_shift_due_dates
 from accounts.permissions import IsCompanyAdmin, IsContractorOrAdmin, IsOwnerOrAdmin
+from utils.response_cache import CachedResponseMixin
+from utils.file_responses import serve_file
+from utils.pagination import KeysetPagination, OptionalKeysetPagination
+from search.filters import FullTextSearchFilter
+from blobs.models import Blob
+from blobs.tasks import enqueue_derivatives
+from blobs.views import request_upload, serve_derivative
 from utils.file_validators import (
-    validate_file_size, validate_mime_type, validate_image_file,
-    get_file_type_from_mime, is_image_file, MAX_ATTACHMENT_SIZE_MB,
-    ALLOWED_DOCUMENT_MIME_TYPES, ALLOWED_IMAGE_MIME_TYPES
+    inspect_upload, MAX_ATTACHMENT_SIZE_MB, ALLOWED_DOCUMENT_MIME_TYPES, ALLOWED_IMAGE_MIME_TYPES
 )
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """
     ViewSet for Task management.
     """
     queryset = Task.objects.all()
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    cache_namespace = 'tasks'
+    cache_timeouts = {'list': 30, 'retrieve': 30}
+    pagination_class = OptionalKeysetPagination
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'priority', 'department', 'project', 'assigned_to']
-    search_fields = ['title', 'description']
+    search_model = 'task'
     ordering_fields = ['created_at', 'due_date', 'priority']
     ordering = ['-created_at']
     
@@ -35,20 +48,14 @@ class TaskViewSet(viewsets.ModelViewSet):
         return TaskSerializer
     
     def get_queryset(self):
-        user = self.request.user
-        if user.is_company_admin:
-            # Company admin sees all tasks in their company's projects
-            return Task.objects.filter(project__company=user.company)
-        elif user.is_contractor:
-            # Contractor sees tasks in their projects
-            return Task.objects.filter(project__contractor=user.contractor)
-        elif user.is_worker:
-            # Worker sees only assigned tasks
-            return Task.objects.filter(assigned_to=user)
-        return Task.objects.none()
+        queryset = Task.visible_to(self.request.user)
+        if self.action in ('download_attachment', 'comments', 'attachments', 'time_entries'):
+            return queryset
+        return self.get_serializer_class().setup_eager_loading(queryset)
     
     def get_permissions(self):
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'bulk_status',
+                           'bulk_assign', 'bulk_department', 'bulk_shift_due_date']:
             return [permissions.IsAuthenticated(), IsContractorOrAdmin()]
         return super().get_permissions()
     
@@ -83,38 +90,75 @@ class TaskViewSet(viewsets.ModelViewSet):
     def upload_attachment(self, request, pk=None):
         """Upload an attachment to a task."""
         task = self.get_object()
-        file = request.FILES.get('file')
+        # A multipart file, or a finalized resumable upload
+        file, session = request_upload(request)
         if not file:
             return Response(
                 {"error": "No file provided."},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Validate file size
-        validate_file_size(file, MAX_ATTACHMENT_SIZE_MB)
-        
-        # Validate MIME type (attachments can be documents or images)
-        allowed_mime_types = ALLOWED_DOCUMENT_MIME_TYPES + ALLOWED_IMAGE_MIME_TYPES
-        validate_mime_type(file, allowed_mime_types)
-        
-        # If it's an image, validate it's a real image
-        if is_image_file(file):
-            validate_image_file(file)
-        
-        # Get file type from MIME
-        file_type = get_file_type_from_mime(file)
+        # Attachments can be documents or images
+        info = inspect_upload(file, ALLOWED_DOCUMENT_MIME_TYPES + ALLOWED_IMAGE_MIME_TYPES, MAX_ATTACHMENT_SIZE_MB)
         
+        # The same site photos are attached to many tasks; each is stored once
+        blob = Blob.store(file, digest=info.sha256)
+        if session:
+            session.discard()
         attachment = TaskAttachment.objects.create(
             task=task,
-            file=file,
-            file_name=file.name,
-            file_type=file_type,
+            file=blob.file.name,
+            blob=blob,
+            file_name=info.name,
+            file_type=info.file_type,
             uploaded_by=request.user
         )
+        if info.is_image:
+            # Thumbnails and previews are rendered in the background
+            transaction.on_commit(lambda: enqueue_derivatives(blob.file.name))
         
         serializer = TaskAttachmentSerializer(attachment)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
+    @action(detail=True, methods=['get'], url_path=r'attachments/(?P<attachment_id>[0-9]+)/download')
+    def download_attachment(self, request, attachment_id, pk=None):
+        """Download an attachment of the task, or with `variant` the thumbnail or preview of an image."""
+        task = self.get_object()
+        attachment = task.attachments.filter(id=attachment_id).first()
+        if not attachment:
+            return Response(
+                {"error": "Attachment not found."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        variant = request.query_params.get('variant')
+        if variant:
+            return serve_derivative(request, attachment.file, attachment.file_name, attachment.file_type, variant)
+        return serve_file(request, attachment.file, attachment.file_name)
+    
+    def paginated_collection(self, request, name):
+        """A page of a nested collection of the task, in keyset order."""
+        task = self.get_object()
+        serializer_class = TASK_COLLECTIONS[name][3]
+        paginator = KeysetPagination(TASK_COLLECTIONS[name][2])
+        page = paginator.paginate_queryset(task_collection(name).filter(task=task), request, view=self)
+        serializer = serializer_class(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def comments(self, request, pk=None):
+        """Comments of the task, newest first, with cursor pagination."""
+        return self.paginated_collection(request, 'comments')
+    
+    @action(detail=True, methods=['get'])
+    def attachments(self, request, pk=None):
+        """Attachments of the task, newest first, with cursor pagination."""
+        return self.paginated_collection(request, 'attachments')
+    
+    @action(detail=True, methods=['get'])
+    def time_entries(self, request, pk=None):
+        """Time entries of the task, newest first, with cursor pagination."""
+        return self.paginated_collection(request, 'time_entries')
+    
     @action(detail=True, methods=['patch'])
     def update_status(self, request, pk=None):
         """Update task status."""
@@ -133,6 +177,69 @@ class TaskViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(task)
         return Response(serializer.data)
     
+    def bulk_tasks(self, request, serializer_class):
+        """
+        Validate a bulk operation and lock its tasks, which must all be
+        visible to the user; call within a transaction.
+        
+        Returns:
+            tuple: (validated data, list of tasks with their project)
+        """
+        serializer = serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = set(serializer.validated_data['tasks'])
+        tasks = list(
+            Task.visible_to(request.user).filter(id__in=ids)
+            .select_related('project').select_for_update(of=('self',))
+        )
+        missing = ids - {task.id for task in tasks}
+        if missing:
+            raise ValidationError({
+                'tasks': [f'Invalid pk "{task_id}" - object does not exist.' for task_id in sorted(missing)]
+            })
+        return serializer.validated_data, tasks
+    
+    def bulk_response(self, changed):
+        return Response({
+            'updated': len(changed),
+            'tasks': sorted(task.id for task in changed),
+            'message': f'{len(changed)} task(s) updated.'
+        })
+    
+    @action(detail=False, methods=['post'], url_path='bulk/status')
+    def bulk_status(self, request):
+        """Set the status of up to MAX_BULK_TASKS `tasks` in one transaction."""
+        with transaction.atomic():
+            data, tasks = self.bulk_tasks(request, BulkStatusSerializer)
+            changed = bulk_update_tasks(tasks, status=data['status'])
+        return self.bulk_response(changed)
+    
+    @action(detail=False, methods=['post'], url_path='bulk/assign')
+    def bulk_assign(self, request):
+        """Assign up to MAX_BULK_TASKS `tasks` to a user (or nobody) in one transaction."""
+        with transaction.atomic():
+            data, tasks = self.bulk_tasks(request, BulkAssignSerializer)
+            assignee = data['assigned_to']
+            changed = bulk_update_tasks(tasks, assigned_to_id=assignee and assignee.id)
+        return self.bulk_response(changed)
+    
+    @action(detail=False, methods=['post'], url_path='bulk/department')
+    def bulk_department(self, request):
+        """Move up to MAX_BULK_TASKS `tasks` to a department (or none) in one transaction."""
+        with transaction.atomic():
+            data, tasks = self.bulk_tasks(request, BulkDepartmentSerializer)
+            department = data['department']
+            changed = bulk_update_tasks(tasks, department_id=department and department.id)
+        return self.bulk_response(changed)
+    
+    @action(detail=False, methods=['post'], url_path='bulk/shift_due_date')
+    def bulk_shift_due_date(self, request):
+        """Move the due dates of up to MAX_BULK_TASKS `tasks` by `days` in one transaction."""
+        with transaction.atomic():
+            data, tasks = self.bulk_tasks(request, BulkDueDateShiftSerializer)
+            changed = bulk_shift_due_dates(tasks, data['days'])
+        return self.bulk_response(changed)
+    
     @action(detail=False, methods=['get'])
     def my_tasks(self, request):
         """Get current user's tasks."""
@@ -179,17 +286,12 @@ class TimeEntryViewSet(viewsets.ModelViewSet):
     queryset = TimeEntry.objects.all()
     serializer_class = TimeEntrySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['task', 'user', 'date']
     
     def get_queryset(self):
-        user = self.request.user
-        if user.is_company_admin:
-            return TimeEntry.objects.filter(task__project__company=user.company)
-        elif user.is_contractor:
-            return TimeEntry.objects.filter(task__project__contractor=user.contractor)
-        else:
-            return TimeEntry.objects.filter(user=user)
+        return TimeEntry.visible_to(self.request.user).select_related('task', 'user')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
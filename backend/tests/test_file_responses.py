@@ -0,0 +1,125 @@
+"""
+Tests for the permission-checked download endpoints and utils/file_responses.py.
+"""
+import hashlib
+import pytest
+from io import BytesIO
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+from utils.file_responses import parse_range
+
+User = get_user_model()
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('bytes=0-9', (0, 9)),
+    ('bytes=90-', (90, 99)),
+    ('bytes=-10', (90, 99)),
+    ('bytes=95-200', (95, 99)),
+    ('bytes=0-1,5-6', None),
+    ('bytes=10-5', None),
+    ('items=0-9', None),
+])
+def test_parse_range(header, expected):
+    """Test single byte ranges are parsed and others fall back to the whole file."""
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.parametrize('header, size', [('bytes=100-', 100), ('bytes=-0', 100), ('bytes=-5', 0), ('bytes=0-', 0)])
+def test_unsatisfiable_range(header, size):
+    with pytest.raises(ValueError):
+        parse_range(header, size)
+
+
+@pytest.mark.django_db
+class TestAttachmentDownload:
+    """Test attachments are only served to users who can see the task."""
+
+    @pytest.fixture
+    def api_client(self):
+        """Create API client."""
+        return APIClient()
+
+    @pytest.fixture
+    def admin_user(self):
+        """Create company admin."""
+        from accounts.models import Company
+        company = Company.objects.create(name='Download Co', email='downloads@example.com')
+        return User.objects.create_user(
+            username='download_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+
+    @pytest.fixture
+    def data(self):
+        from PIL import Image
+        output = BytesIO()
+        Image.new('RGB', (48, 48), 'gray').save(output, 'PNG')
+        return output.getvalue()
+
+    @pytest.fixture
+    def url(self, settings, api_client, admin_user, media_root, data):
+        """Attach a photo to a task and return its download URL."""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from projects.models import Project
+        from tasks.models import Task
+        project = Project.objects.create(company=admin_user.company, name='Tower', address='Site 1')
+        task = Task.objects.create(project=project, title='Task')
+        api_client.force_authenticate(user=admin_user)
+        response = api_client.post(
+            f'/api/tasks/{task.id}/upload_attachment/',
+            {'file': SimpleUploadedFile('site.png', data, content_type='image/png')},
+            format='multipart'
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        return response.data['download_url']
+
+    def test_download(self, api_client, url, data):
+        """Test the whole file is sent with its name and content ETag."""
+        response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert b''.join(response.streaming_content) == data
+        assert response['ETag'] == f'"{hashlib.sha256(data).hexdigest()}"'
+        assert response['Accept-Ranges'] == 'bytes'
+        assert response['Content-Type'] == 'image/png'
+        assert 'filename="site.png"' in response['Content-Disposition']
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_range(self, api_client, url, data):
+        """Test a range is sent alone, and only while If-Range matches."""
+        response = api_client.get(url, HTTP_RANGE='bytes=10-19')
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert b''.join(response.streaming_content) == data[10:20]
+        assert response['Content-Range'] == f'bytes 10-19/{len(data)}'
+
+        response = api_client.get(url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"')
+        assert response.status_code == status.HTTP_200_OK
+
+        response = api_client.get(url, HTTP_RANGE=f'bytes={len(data)}-')
+        assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        assert response['Content-Range'] == f'bytes */{len(data)}'
+
+    def test_accel_redirect(self, api_client, url):
+        """Test the transfer is left to the proxy when offloading is enabled."""
+        from tasks.models import TaskAttachment
+        with override_settings(FILE_DOWNLOAD_OFFLOAD='accel', FILE_DOWNLOAD_ACCEL_PREFIX='/protected/'):
+            response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['X-Accel-Redirect'] == f'/protected/{TaskAttachment.objects.get().file.name}'
+        assert response.content == b''
+
+    def test_other_company(self, api_client, url):
+        """Test users outside the task's company get a 404."""
+        from accounts.models import Company
+        company = Company.objects.create(name='Other Co', email='other@example.com')
+        other = User.objects.create_user(
+            username='other_admin', password='testpass123',
+            role='COMPANY_ADMIN', company=company
+        )
+        api_client.force_authenticate(user=other)
+        assert api_client.get(url).status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,60 @@
+"""
+Tests for the single-pass upload inspection in utils/file_validators.py.
+"""
+import hashlib
+import pytest
+from io import BytesIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from rest_framework import serializers
+from utils.file_validators import (
+    inspect_upload, ALLOWED_BLUEPRINT_MIME_TYPES, ALLOWED_DOCUMENT_MIME_TYPES, ALLOWED_IMAGE_MIME_TYPES
+)
+
+ALLOWED = ALLOWED_DOCUMENT_MIME_TYPES + ALLOWED_IMAGE_MIME_TYPES
+
+
+def png(size=(40, 30)):
+    output = BytesIO()
+    Image.new('RGB', size, 'white').save(output, 'PNG')
+    return output.getvalue()
+
+
+class TestInspectUpload:
+    """Test size, type, hash and image checks are read from one pass."""
+
+    def test_image(self):
+        """Test an image reports its type, hash and dimensions."""
+        data = png()
+        upload = SimpleUploadedFile('plan.png', data, content_type='image/png')
+        info = inspect_upload(upload, ALLOWED_BLUEPRINT_MIME_TYPES, 1)
+        assert (info.mime, info.file_type, info.is_image) == ('image/png', 'png', True)
+        assert (info.width, info.height) == (40, 30)
+        assert info.size == len(data)
+        assert info.sha256 == hashlib.sha256(data).hexdigest()
+        assert upload.tell() == 0
+
+    def test_hash_from_upload_handler(self):
+        """Test the hash computed while the file was received is reused."""
+        upload = SimpleUploadedFile('plan.png', png())
+        upload.sha256 = 'a' * 64
+        assert inspect_upload(upload, ALLOWED, 1).sha256 == 'a' * 64
+
+    def test_extension_fallback(self):
+        """Test files without a content signature are typed by extension."""
+        info = inspect_upload(SimpleUploadedFile('notes.txt', b'level 3 slab'), ALLOWED, 1)
+        assert (info.mime, info.file_type, info.is_image) == ('text/plain', 'txt', False)
+        assert info.width is None
+
+    @pytest.mark.parametrize('name, data, message', [
+        ('notes.txt', b'', 'empty'),
+        ('tool.exe', b'MZ\x90\x00' + b'\x00' * 60, 'not allowed'),
+        ('unknown.bin', b'\x00\x01\x02', 'Unable to detect'),
+        ('plan.png', png()[:60], 'corrupted'),
+        ('big.txt', b'x' * (1024 * 1024 + 1), 'exceeds'),
+    ])
+    def test_rejected(self, name, data, message):
+        """Test empty, disallowed, unknown, corrupted and oversized files are rejected."""
+        with pytest.raises(serializers.ValidationError) as error:
+            inspect_upload(SimpleUploadedFile(name, data), ALLOWED, 1)
+        assert message in str(error.value.detail[0])
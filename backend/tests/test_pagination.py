@@ -0,0 +1,52 @@
+"""
+Tests for the opt-in keyset pagination of the high-volume list endpoints.
+"""
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from notifications.models import Notification
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestOptionalKeysetPagination:
+    """Test lists switch from page numbers to cursors on request."""
+
+    @pytest.fixture
+    def api_client(self):
+        """Create API client authenticated as a user with 25 notifications."""
+        user = User.objects.create_user(username='paged_user', password='testpass123')
+        Notification.objects.bulk_create(
+            Notification(user=user, notification_type='NEW_TASK', title=f'Task {number}', message='')
+            for number in range(25)
+        )
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def test_page_numbers_by_default(self, api_client):
+        """Test the default pages are unchanged."""
+        response = api_client.get('/api/notifications/', {'page': 2})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 25
+        assert len(response.data['results']) == 5
+
+    def test_cursor_pages(self, api_client):
+        """Test cursor pages cover every row once, newest first, without counting."""
+        url = '/api/notifications/?pagination=cursor&page_size=10'
+        titles = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert 'count' not in response.data
+            assert not any('COUNT(' in query['sql'] for query in queries.captured_queries)
+            titles += [notification['title'] for notification in response.data['results']]
+            url = response.data['next']
+            if url:
+                assert 'pagination=cursor' in url
+        assert titles == [f'Task {number}' for number in reversed(range(25))]
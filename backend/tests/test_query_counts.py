@@ -0,0 +1,206 @@
+"""
+Query-count regression tests for the API endpoints.
+
+Every GET route of the app routers below is requested twice: against a small
+dataset, then against a larger one (more projects, tasks per project and pins
+per blueprint). The number of queries must not grow with the dataset and must
+stay within the endpoint's budget in query_budgets.json.
+
+When a change legitimately adds a fixed number of queries to an endpoint,
+update its budget. A count that grows with the dataset is an N+1 regression.
+"""
+import json
+from datetime import timedelta
+from importlib import import_module
+from pathlib import Path
+from types import SimpleNamespace
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import Company, Contractor
+from departments.models import Department
+from documents.models import Document, DocumentVersion
+from notifications.models import Notification
+from projects.models import Project, Blueprint, Pin
+from projects.tiles import tile_path
+from reports.models import ReportJob
+from tasks.models import Task, TimeEntry, TaskComment, TaskAttachment
+
+User = get_user_model()
+
+BUDGETS_FILE = Path(__file__).with_name('query_budgets.json')
+
+# Apps whose router endpoints are covered
+COVERED_APPS = ['accounts', 'projects', 'tasks', 'documents', 'notifications', 'reports']
+
+# Dataset sizes: (projects, tasks per project, pins per blueprint)
+SMALL = (1, 2, 1)
+LARGE = (3, 6, 4)
+
+
+def router_get_endpoints():
+    """(route name, basename, detail) of every GET route in COVERED_APPS."""
+    endpoints = []
+    for app in COVERED_APPS:
+        router = import_module(f'{app}.urls').router
+        for prefix, viewset, basename in router.registry:
+            for route in router.get_routes(viewset):
+                mapping = router.get_method_map(viewset, route.mapping)
+                if 'get' in mapping:
+                    endpoints.append((route.name.format(basename=basename), basename, route.detail))
+    return endpoints
+
+
+ENDPOINTS = router_get_endpoints()
+BUDGETS = json.loads(BUDGETS_FILE.read_text())
+
+
+class Dataset:
+    """A company tenant whose data can be grown in steps."""
+
+    def __init__(self):
+        self.company = Company.objects.create(name='Budget Co', email='budget@example.com')
+        self.contractor = Contractor.objects.create(
+            company=self.company, name='Budget Builders', email='builders@example.com'
+        )
+        self.department = Department.objects.create(contractor=self.contractor, name='Electrical')
+        # Superuser company admin, so super-admin and staff routes are reachable too
+        self.admin = User.objects.create_user(
+            username='budget_admin', password='testpass123', role='COMPANY_ADMIN',
+            company=self.company, is_staff=True, is_superuser=True
+        )
+        self.batch = 0
+        # Files shared by the blueprints, documents and attachments, for the download routes
+        for name in ('blueprints/plan.png', 'documents/spec.pdf'):
+            if not default_storage.exists(name):
+                default_storage.save(name, ContentFile(b'file'))
+
+    def grow(self, projects, tasks_per_project, pins_per_blueprint):
+        """Add rows to every table read by the endpoints; returns the first of each."""
+        self.batch += 1
+        first = {}
+        today = timezone.now().date()
+        for index in range(projects):
+            name = f'{self.batch}-{index}'
+            company = Company.objects.create(name=f'Company {name}', email=f'company{name}@example.com')
+            Contractor.objects.create(company=company, name=f'Contractor {name}', email=f'contractor{name}@example.com')
+            worker = User.objects.create_user(
+                username=f'worker{name}', password='testpass123', role='WORKER',
+                company=self.company, contractor=self.contractor, department=self.department
+            )
+            project = Project.objects.create(
+                company=self.company, contractor=self.contractor, name=f'Project {name}',
+                address='Site', created_by=self.admin, estimated_budget=1000
+            )
+            blueprint = Blueprint.objects.create(
+                project=project, file='blueprints/plan.png', uploaded_by=self.admin,
+                tile_status='READY', tile_version='abc123', tile_format='jpeg', tile_levels=1
+            )
+            default_storage.save(tile_path(blueprint, 0, 0, 0), ContentFile(b'tile'))
+            pins = [
+                Pin.objects.create(blueprint=blueprint, x=number, y=number, label=f'Pin {number}')
+                for number in range(pins_per_blueprint)
+            ]
+            for number in range(tasks_per_project):
+                task = Task.objects.create(
+                    project=project, pin=pins[number % len(pins)], department=self.department,
+                    assigned_to=worker, created_by=self.admin, title=f'Task {number}',
+                    status='COMPLETED' if number % 2 else 'PENDING',
+                    due_date=timezone.now() - timedelta(days=1)
+                )
+                entry = TimeEntry.objects.create(task=task, user=worker, hours=1, date=today)
+                TaskComment.objects.create(task=task, user=self.admin, content='Checked')
+                attachment = TaskAttachment.objects.create(
+                    task=task, file='documents/spec.pdf', file_name='spec.pdf',
+                    file_type='pdf', uploaded_by=self.admin
+                )
+                first.setdefault('task', task)
+                first.setdefault('time_entry', entry)
+                first.setdefault('attachment', attachment)
+            document = Document.objects.create(
+                project=project, contractor=self.contractor, company=self.company, side='COMPANY',
+                title=f'Spec {name}', file='documents/spec.pdf', file_name='spec.pdf',
+                uploaded_by=self.admin, review_deadline=timezone.now() - timedelta(days=1)
+            )
+            version = DocumentVersion.objects.create(
+                document=document, file='documents/spec.pdf', version_number=1, uploaded_by=self.admin
+            )
+            notification = Notification.objects.create(
+                user=self.admin, notification_type='NEW_PROJECT', title=name, message=name
+            )
+            job = ReportJob.objects.create(
+                user=self.admin, scope_key=f'company:{self.company.id}', report='project_progress',
+                status='COMPLETED', result=[], dedup_key=name
+            )
+            first.setdefault('project', project)
+            first.setdefault('pin', pins[0])
+            first.setdefault('document', document)
+            first.setdefault('version', version)
+            first.setdefault('notification', notification)
+            first.setdefault('report_job', job)
+            first.setdefault('user', worker)
+            first.setdefault('company', company)
+        first['contractor'] = self.contractor
+        return SimpleNamespace(**first)
+
+
+def request_args(name, basename, detail, objects):
+    """URL kwargs and query params needed to call an endpoint."""
+    kwargs = {}
+    if detail:
+        kwargs['pk'] = getattr(objects, basename.replace('-', '_')).pk
+    params = {}
+    if basename == 'pin':
+        params['blueprint'] = objects.pin.blueprint_id
+    elif name == 'project-blueprint-tile':
+        kwargs.update(version=objects.project.blueprint.tile_version, level=0, col=0, row=0)
+    elif name == 'task-download-attachment':
+        kwargs['attachment_id'] = objects.attachment.pk
+    elif name == 'document-download-version':
+        kwargs['version_id'] = objects.version.pk
+    elif name == 'report-export':
+        kwargs['report'] = 'project_progress'
+    elif name == 'super-admin-get-company-by-email':
+        params['email'] = objects.company.email
+    return kwargs, params
+
+
+def count_queries(client, url, params):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, params)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    assert response.status_code < 400, f'{url} returned {response.status_code}'
+    return len(queries)
+
+
+def test_every_endpoint_has_a_budget():
+    """New GET endpoints must be given a budget; removed ones must drop theirs."""
+    names = {name for name, _, _ in ENDPOINTS}
+    assert sorted(names - set(BUDGETS)) == [], 'Add these endpoints to query_budgets.json'
+    assert sorted(set(BUDGETS) - names) == [], 'Remove these endpoints from query_budgets.json'
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name,basename,detail', ENDPOINTS, ids=[name for name, _, _ in ENDPOINTS])
+def test_query_count_is_constant(settings, media_root, name, basename, detail):
+    """The query count of an endpoint does not depend on the amount of data."""
+    dataset = Dataset()
+    client = APIClient()
+    client.force_authenticate(user=dataset.admin)
+
+    counts = []
+    for size in (SMALL, LARGE):
+        objects = dataset.grow(*size)
+        kwargs, params = request_args(name, basename, detail, objects)
+        counts.append(count_queries(client, reverse(name, kwargs=kwargs), params))
+
+    small, large = counts
+    assert large == small, f'{name}: {small} queries for the small dataset, {large} for the large one'
+    assert large <= BUDGETS.get(name, 0), f'{name}: {large} queries, budget is {BUDGETS.get(name)}'
@@ -0,0 +1,97 @@
+"""
+Data versions for cache invalidation.
+
+Cached values embed the version of the namespace and tenant they were
+computed for. Writes bump the versions of the tenants they touch, so older
+entries are never read again and simply expire.
+
+Tenants are `company:<id>` and `contractor:<id>`. Data of users whose
+scope is not one of them (workers, consultants, document controllers) is
+not cached, as any write anywhere could change it.
+"""
+import time
+from django.core.cache import cache
+from django.db import transaction
+
+# Bumped for changes visible to every tenant (e.g. a renamed user)
+EPOCH_TENANT = 'epoch'
+
+
+def _version_key(namespace, tenant):
+    return f"cache_version:{namespace}:{tenant}"
+
+
+def get_version(namespace, tenant):
+    """
+    Current version of a namespace for a tenant.
+    Missing counters start from the clock so an evicted counter never returns
+    to a value that older entries were stored under.
+    """
+    keys = [_version_key(namespace, EPOCH_TENANT), _version_key(namespace, tenant)]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if versions.get(key) is None:
+            versions[key] = time.time_ns()
+            if not cache.add(key, versions[key], timeout=None):
+                versions[key] = cache.get(key, versions[key])
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def bump_versions(namespaces, tenants):
+    for namespace in namespaces:
+        for tenant in tenants:
+            key = _version_key(namespace, tenant)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate(namespaces, *tenants):
+    """
+    Invalidate cached data of the given tenants.
+    Versions are bumped now and again once the transaction commits, so a
+    value read from pre-commit data cannot stay cached under the new version.
+    """
+    tenants = set(filter(None, tenants))
+    if not tenants:
+        return
+    bump_versions(namespaces, tenants)
+    transaction.on_commit(lambda: bump_versions(namespaces, tenants))
+
+
+def invalidate_all_tenants(namespaces):
+    """Invalidate cached data of every tenant."""
+    bump_versions(namespaces, [EPOCH_TENANT])
+    transaction.on_commit(lambda: bump_versions(namespaces, [EPOCH_TENANT]))
+
+
+def project_tenants(project_id):
+    """Company and contractor tenants of a project."""
+    from projects.models import Project
+
+    row = Project.objects.filter(id=project_id).values_list('company_id', 'contractor_id').first()
+    if not row:
+        return []
+    company_id, contractor_id = row
+    return [f"company:{company_id}", contractor_id and f"contractor:{contractor_id}"]
+
+
+def contractor_tenants(contractor_id):
+    """A contractor tenant and the tenant of the company it works for."""
+    from accounts.models import Contractor
+
+    if not contractor_id:
+        return []
+    company_id = Contractor.objects.filter(id=contractor_id).values_list('company_id', flat=True).first()
+    return [f"contractor:{contractor_id}", company_id and f"company:{company_id}"]
+
+
+def department_tenants(department_id):
+    """Tenants of the contractor a department belongs to."""
+    from departments.models import Department
+
+    if not department_id:
+        return []
+    contractor_id = Department.objects.filter(id=department_id).values_list('contractor_id', flat=True).first()
+    return contractor_tenants(contractor_id)
@@ -0,0 +1,158 @@
+"""
+Responses for permission-checked file downloads.
+
+Views check access as usual and then call serve_file(). When
+FILE_DOWNLOAD_OFFLOAD is set, the response only names the file and the front
+proxy sends it (nginx X-Accel-Redirect, or X-Sendfile for Apache/lighttpd),
+ranges included. Otherwise Django sends the file itself, honouring
+conditional and single-range requests so clients can resume downloads.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import content_disposition_header
+
+# Blobs are stored under their SHA-256, which is a ready-made ETag
+BLOB_NAME = re.compile(r'^blobs/[0-9a-f]{2}/(?P<sha256>[0-9a-f]{64})(\.[^/]*)?$')
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Bytes read per iteration when streaming a range
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def file_etag(field_file):
+    """Strong ETag of a stored file: its SHA-256 for blobs, else its size and modification time."""
+    match = BLOB_NAME.match(field_file.name)
+    if match:
+        return f'"{match.group("sha256")}"'
+    try:
+        modified = default_storage.get_modified_time(field_file.name).timestamp()
+    except (NotImplementedError, OSError):
+        modified = ''
+    key = f'{field_file.name}:{field_file.size}:{modified}'
+    return f'"{hashlib.md5(key.encode()).hexdigest()}"'
+
+
+def parse_range(header, size):
+    """
+    Byte range requested by a Range header.
+
+    Returns:
+        tuple: (start, end) inclusive; None to send the whole file (no header,
+            an invalid one such as bytes=5-3, or one this does not handle,
+            such as several ranges)
+
+    Raises:
+        ValueError: If the range is not satisfiable
+    """
+    match = BYTE_RANGE.match((header or '').strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if not length or not size:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        # Invalid ranges are ignored (RFC 9110, section 14.2)
+        return None
+    if start >= size:
+        raise ValueError("Range outside the file")
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def read_range(file, start, length):
+    """Yield `length` bytes of a file from `start`, then close it."""
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(RANGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def offload_header(field_file):
+    """Header handing the transfer to the front proxy, or None to send the file from Django."""
+    backend = getattr(settings, 'FILE_DOWNLOAD_OFFLOAD', '')
+    if backend == 'accel':
+        prefix = getattr(settings, 'FILE_DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+        return 'X-Accel-Redirect', prefix.rstrip('/') + '/' + quote(field_file.name)
+    if backend == 'sendfile':
+        return 'X-Sendfile', field_file.path
+    return None
+
+
+def serve_file(request, field_file, file_name=None, as_attachment=True):
+    """
+    Response sending a stored file the caller has already authorized.
+
+    Args:
+        request: The download request
+        field_file: FieldFile of the file to send
+        file_name: Name offered to the client (defaults to the stored name)
+        as_attachment: Whether browsers should save rather than display it
+
+    Returns:
+        HttpResponse: 304, 206 or 416 for conditional and range requests,
+            an offloaded response, or the file itself
+    """
+    file_name = file_name or os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+    etag = file_etag(field_file)
+
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=304)
+    elif offload := offload_header(field_file):
+        # The proxy sends the body and answers Range requests itself
+        response = HttpResponse(content_type=content_type)
+        response[offload[0]] = offload[1]
+    else:
+        response = send_file(request, field_file, content_type, etag)
+
+    response['ETag'] = etag
+    if response.status_code != 304:
+        response['Content-Disposition'] = content_disposition_header(as_attachment, file_name)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def send_file(request, field_file, content_type, etag):
+    """The file sent by Django, whole or the single range requested."""
+    size = field_file.size
+    byte_range = None
+    # A stale If-Range asks for the whole, current file
+    if request.headers.get('If-Range', etag) == etag:
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(field_file.open('rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(field_file.open('rb'), start, end - start + 1),
+            status=206, content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    return response
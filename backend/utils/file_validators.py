@@ -2,9 +2,11 @@
 File validation utilities for Django REST Framework.
 Provides reusable helpers for file size and MIME type validation.
 """
+import hashlib
 import logging
+import os
 from rest_framework import serializers
-from PIL import Image
+from PIL import ImageFile
 import filetype
 
 logger = logging.getLogger(__name__)
@@ -61,163 +63,127 @@ def validate_file_size(file, max_size_mb):
         )
 
 
-def validate_mime_type(file, allowed_types):
+# MIME types guessed from the extension when the content has no known signature
+EXTENSION_MIME_TYPES = {
+    '.pdf': 'application/pdf',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.doc': 'application/msword',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.xls': 'application/vnd.ms-excel',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.txt': 'text/plain',
+    '.csv': 'text/csv',
+}
+
+MIME_FILE_TYPES = {
+    'application/pdf': 'pdf',
+    'image/jpeg': 'jpg',
+    'image/jpg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+    'application/msword': 'doc',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'docx',
+    'application/vnd.ms-excel': 'xls',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'xlsx',
+    'text/plain': 'txt',
+    'text/csv': 'csv',
+}
+
+
+class UploadInfo:
+    """What inspect_upload() learnt about an uploaded file."""
+    
+    def __init__(self, name, size, mime, file_type, sha256, width=None, height=None):
+        self.name = name
+        self.size = size
+        self.mime = mime
+        self.file_type = file_type
+        self.sha256 = sha256
+        self.width = width
+        self.height = height
+    
+    @property
+    def is_image(self):
+        return self.mime in ALLOWED_IMAGE_MIME_TYPES
+    
+    def __repr__(self):
+        return f"<UploadInfo {self.name} {self.mime} {self.size} bytes>"
+
+
+def inspect_upload(file, allowed_types, max_size_mb):
     """
-    Validate file MIME type using real file content (not just extension).
+    Validate an upload in one streaming pass instead of one read per check:
+    size, MIME type sniffed from the first chunk, SHA-256, and for images
+    the dimensions and an incremental decode that catches corrupted files.
     
     Args:
         file: Django UploadedFile object
         allowed_types: List of allowed MIME types
+        max_size_mb: Maximum file size in megabytes
         
-    Raises:
-        ValidationError: If MIME type is not allowed
-    """
-    # Reset file pointer to beginning
-    file.seek(0)
-    
-    # Read first chunk to detect MIME type
-    chunk = file.read(1024)
-    file.seek(0)  # Reset again for later use
-    
-    if not chunk:
-        raise serializers.ValidationError("File is empty or cannot be read.")
-    
-    # Use filetype library to detect real MIME type
-    kind = filetype.guess(chunk)
-    
-    if not kind:
-        # Fallback: try to detect from file extension if filetype fails
-        # This is less secure but provides better UX
-        import os
-        ext = os.path.splitext(file.name)[1].lower()
-        ext_to_mime = {
-            '.pdf': 'application/pdf',
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.gif': 'image/gif',
-            '.webp': 'image/webp',
-            '.doc': 'application/msword',
-            '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            '.xls': 'application/vnd.ms-excel',
-            '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            '.txt': 'text/plain',
-            '.csv': 'text/csv',
-        }
-        detected_mime = ext_to_mime.get(ext)
-        
-        if not detected_mime:
-            raise serializers.ValidationError(
-                f"Unable to detect file type. Please ensure the file is a valid format."
-            )
-        
-        if detected_mime not in allowed_types:
-            raise serializers.ValidationError(
-                f"File type '{detected_mime}' is not allowed. "
-                f"Allowed types: {', '.join(allowed_types)}"
-            )
-    else:
-        detected_mime = kind.mime
-        
-        if detected_mime not in allowed_types:
-            raise serializers.ValidationError(
-                f"File type '{detected_mime}' is not allowed. "
-                f"Allowed types: {', '.join(allowed_types)}"
-            )
-
-
-def validate_image_file(file):
-    """
-    Validate that a file is a real, non-corrupted image using PIL.
-    
-    Args:
-        file: Django UploadedFile object
+    Returns:
+        UploadInfo
         
     Raises:
-        ValidationError: If file is not a valid image or is corrupted
+        ValidationError: If the file is too large, empty, of a type not allowed or a corrupted image
     """
+    validate_file_size(file, max_size_mb)
+    
+    # Set by the hashing upload handlers while the file was received
+    known_sha256 = getattr(file, 'sha256', None)
+    sha256 = None if known_sha256 else hashlib.sha256()
+    mime = None
+    parser = None
+    size = 0
     file.seek(0)
-    
     try:
-        # Try to open and verify the image
-        img = Image.open(file)
-        img.verify()  # Verify that it's a valid image
+        for chunk in file.chunks():
+            if mime is None:
+                kind = filetype.guess(chunk)
+                mime = kind.mime if kind else EXTENSION_MIME_TYPES.get(os.path.splitext(file.name)[1].lower())
+                if not mime:
+                    raise serializers.ValidationError(
+                        "Unable to detect file type. Please ensure the file is a valid format."
+                    )
+                if mime not in allowed_types:
+                    raise serializers.ValidationError(
+                        f"File type '{mime}' is not allowed. "
+                        f"Allowed types: {', '.join(allowed_types)}"
+                    )
+                if mime in ALLOWED_IMAGE_MIME_TYPES:
+                    parser = ImageFile.Parser()
+            size += len(chunk)
+            if sha256:
+                sha256.update(chunk)
+            if parser:
+                parser.feed(chunk)
         
-        # Reset file pointer after verification
-        file.seek(0)
-        
-        # Additional check: try to load the image
-        img = Image.open(file)
-        img.load()  # Load the image data to check for corruption
-        file.seek(0)
+        if not size:
+            raise serializers.ValidationError("File is empty or cannot be read.")
         
+        width = height = None
+        if parser:
+            # Finishes the decode; raises on truncated or corrupted data
+            image = parser.close()
+            width, height = image.size
+    except serializers.ValidationError:
+        raise
     except Exception as e:
+        raise serializers.ValidationError(f"Invalid or corrupted image file: {str(e)}")
+    finally:
         file.seek(0)
-        raise serializers.ValidationError(
-            f"Invalid or corrupted image file: {str(e)}"
-        )
-
-
-def is_image_file(file):
-    """
-    Check if a file is an image based on MIME type.
     
-    Args:
-        file: Django UploadedFile object
-        
-    Returns:
-        bool: True if file is an image, False otherwise
-    """
-    file.seek(0)
-    chunk = file.read(1024)
-    file.seek(0)
-    
-    kind = filetype.guess(chunk)
-    if kind:
-        return kind.mime in ALLOWED_IMAGE_MIME_TYPES
-    
-    # Fallback to extension check
-    import os
-    ext = os.path.splitext(file.name)[1].lower()
-    image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-    return ext in image_extensions
-
-
-def get_file_type_from_mime(file):
-    """
-    Get file type extension from MIME type.
-    
-    Args:
-        file: Django UploadedFile object
-        
-    Returns:
-        str: File extension without dot (e.g., 'pdf', 'jpg')
-    """
-    file.seek(0)
-    chunk = file.read(1024)
-    file.seek(0)
-    
-    kind = filetype.guess(chunk)
-    
-    if kind:
-        mime_to_ext = {
-            'application/pdf': 'pdf',
-            'image/jpeg': 'jpg',
-            'image/jpg': 'jpg',
-            'image/png': 'png',
-            'image/gif': 'gif',
-            'image/webp': 'webp',
-            'application/msword': 'doc',
-            'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'docx',
-            'application/vnd.ms-excel': 'xls',
-            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'xlsx',
-            'text/plain': 'txt',
-            'text/csv': 'csv',
-        }
-        return mime_to_ext.get(kind.mime, 'unknown')
-    
-    # Fallback to extension
-    import os
-    ext = os.path.splitext(file.name)[1].lower()
-    return ext[1:] if ext else 'unknown'
-
+    return UploadInfo(
+        name=file.name,
+        size=size,
+        mime=mime,
+        file_type=MIME_FILE_TYPES.get(mime, 'unknown'),
+        sha256=known_sha256 or sha256.hexdigest(),
+        width=width,
+        height=height,
+    )
@@ -29,8 +29,9 @@ class RequestLoggingMiddleware(MiddlewareMixin):
             'user_agent': request.META.get('HTTP_USER_AGENT', ''),
         }
         
-        # Log request body for POST/PUT/PATCH (excluding sensitive data)
-        if request.method in ['POST', 'PUT', 'PATCH']:
+        # Log request body for JSON POST/PUT/PATCH (excluding sensitive data);
+        # file and chunk uploads are left to stream instead of being read into memory
+        if request.method in ['POST', 'PUT', 'PATCH'] and request.content_type == 'application/json':
             try:
                 body = json.loads(request.body.decode('utf-8')) if request.body else {}
                 # Remove sensitive fields
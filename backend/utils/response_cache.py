@@ -0,0 +1,76 @@
+"""
+Per-user response caching for DRF viewsets.
+
+Responses are cached per user and full URL under the data version of the
+user's tenant (see utils/cache_versions.py). Only response data is stored,
+so content negotiation still happens on every request.
+"""
+import hashlib
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from rest_framework import status
+from rest_framework.response import Response
+from .cache_versions import get_version
+
+
+def user_tenant(user):
+    """
+    Tenant whose data version applies to a user's responses.
+    Company staff only see their company's data and contractors their
+    contractor's; other roles can span companies, so their responses are
+    not cached (None).
+    """
+    if (user.is_company_admin or user.is_project_manager) and user.company_id:
+        return f"company:{user.company_id}"
+    if user.is_contractor and user.contractor_id:
+        return f"contractor:{user.contractor_id}"
+    return None
+
+
+class CachedResponseMixin:
+    """
+    Cache successful responses of selected viewset actions.
+
+    Attributes:
+        cache_namespace: Version namespace invalidated by the model signals
+        cache_timeouts: Seconds to cache each action for, e.g. {'list': 30}
+    """
+    cache_namespace = None
+    cache_timeouts = {}
+
+    def get_response_cache_key(self, request, tenant):
+        version = get_version(self.cache_namespace, tenant)
+        url = hashlib.sha256(
+            f"{request.get_host()}{request.get_full_path()}".encode()
+        ).hexdigest()[:32]
+        return f"response:{self.cache_namespace}:{self.action}:{request.user.pk}:{version}:{url}"
+
+    def cached_response(self, view, request, *args, **kwargs):
+        timeout = self.cache_timeouts.get(self.action)
+        if not timeout or not request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        tenant = user_tenant(request.user)
+        if tenant is None:
+            return view(request, *args, **kwargs)
+
+        # Key is built before the view runs so a concurrent write makes it stale
+        key = self.get_response_cache_key(request, tenant)
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Response-Cache'] = 'HIT'
+        else:
+            response = view(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, timeout)
+            response['X-Response-Cache'] = 'MISS'
+
+        # Per-user content must not be stored by shared caches
+        patch_cache_control(response, private=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)